@@ -5,26 +5,35 @@ TimeoutThreadingHTTPserver, but can be used with any http class.
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
-import json
+import queue
 import socket
+import ssl
 import struct
-from http import server, cookies
+from http import HTTPStatus, client, server, cookies
 import hashlib
 import gzip
 import threading
 import base64
 import time
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Tuple
 import mimetypes
 from urllib.parse import parse_qs
 from pathlib import Path
 import uuid
+from collections import deque
 
+import utils.fastjson as fastjson
+from utils.PingScheduler import PingScheduler
 from utils.constants import COMPRESSION_CACHE, ICONS_DIRECTORY, MAX_POST_SIZE
 from utils.exceptions import (
     WebSocketError,
     LengthException,
-    DecodeException,
+    HandlerException,
+    ProcessingError,
+    KIND_LENGTH,
+    KIND_DECODE,
+    KIND_NODATA,
+    KIND_HANDLER,
 )
 
 
@@ -46,6 +55,171 @@ def read_exactly(rfile, n):
     return data
 
 
+def send_buffers(sock: socket.socket, buffers) -> None:
+    """
+    Send several buffers with scatter/gather writes instead of joining them.
+
+    sendmsg() hands the kernel every buffer in one call, so coalesced
+    frames are never copied into a combined bytes object first. Partial
+    sends are resumed from a memoryview of the first unsent buffer; fully
+    sent buffers leave from the front of a deque in O(1).
+
+    Args:
+        sock: Plain (non-TLS) connected socket
+        buffers: Sequence of bytes-like objects, sent in order
+    """
+    views = deque(memoryview(b) for b in buffers)
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= views[0].nbytes:
+            sent -= views[0].nbytes
+            views.popleft()
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def build_frame(opcode: int, payload: bytes) -> bytes:
+    """
+    Build one unmasked, final WebSocket frame (server to client).
+
+    Args:
+        opcode: Frame opcode (text, binary, close, ping, pong)
+        payload: Frame payload
+
+    Returns:
+        bytes: Header plus payload, ready for sendall
+    """
+    length = len(payload)
+    if length <= 125:
+        header = struct.pack(">BB", 0x80 | opcode, length)
+    elif length <= 65535:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+    return header + bytes(payload)
+
+
+def text_frame(message: str | bytes) -> bytes:
+    """
+    Build a complete WebSocket text frame once, for send_prebuilt_frame().
+
+    Broadcasts and constant messages are framed a single time and the same
+    bytes are handed to every recipient.
+
+    Args:
+        message: Text (str) or UTF-8 encoded bytes
+
+    Returns:
+        bytes: Framed message
+    """
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    return build_frame(0x1, message)
+
+
+def parse_content_length(headers) -> Optional[int]:
+    """
+    Read the Content-Length header as a non-negative integer.
+
+    Missing or malformed headers are an expected condition for a public
+    server, so they are reported by return value rather than by raising.
+
+    Args:
+        headers: Request headers (RequestHeaders or email.message.Message)
+
+    Returns:
+        int: Declared body length, or None if missing or not a valid number
+    """
+    length = headers.get("Content-Length")
+    # isdigit() alone accepts non-ASCII digits such as "\xb2", which int()
+    # then rejects
+    if not length or not (length.isascii() and length.isdigit()):
+        return None
+    return int(length)
+
+
+def try_decode_json(raw: str) -> Tuple[bool, Any]:
+    """
+    Decode a JSON document without letting decode errors escape.
+
+    Args:
+        raw: JSON text
+
+    Returns:
+        (True, value) on success, (False, None) if raw is not valid JSON
+    """
+    try:
+        return True, fastjson.loads(raw)
+    except fastjson.JSONDecodeError:
+        return False, None
+
+
+# Same limits http.client applies to request headers
+_MAX_HEADER_LINE = 65536
+_MAX_HEADERS = 100
+
+
+class RequestHeaders(dict):
+    """
+    Request headers keyed by lower-cased name.
+
+    Stands in for the email.message.Message that http.server normally
+    builds: get(), [] and "in" are case-insensitive, a missing header reads
+    as None, and a repeated header keeps its first value.
+    """
+
+    __slots__ = ()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return dict.get(self, name.lower(), default)
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return dict.get(self, name.lower())
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and dict.__contains__(self, name.lower())
+
+
+def read_headers(rfile) -> RequestHeaders:
+    """
+    Read header lines up to the blank line that ends them.
+
+    A plain split per line replaces http.client.parse_headers, which
+    re-parses the whole block through the email package on every request.
+
+    Args:
+        rfile: Buffered request stream positioned after the request line
+
+    Returns:
+        RequestHeaders: Parsed headers
+
+    Raises:
+        http.client.LineTooLong: A header line exceeds _MAX_HEADER_LINE
+        http.client.HTTPException: More than _MAX_HEADERS headers
+    """
+    headers = RequestHeaders()
+    name = None
+    for _ in range(_MAX_HEADERS + 1):
+        line = rfile.readline(_MAX_HEADER_LINE + 1)
+        if len(line) > _MAX_HEADER_LINE:
+            raise client.LineTooLong("header line")
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        text = line.decode("iso-8859-1")
+        if text[0] in " \t":
+            # Obsolete line folding continues the previous header
+            if name is not None and dict.__contains__(headers, name):
+                dict.__setitem__(
+                    headers, name, headers[name] + " " + text.strip()
+                )
+            continue
+        name, _, value = text.partition(":")
+        name = name.strip().lower()
+        if name not in headers:
+            dict.__setitem__(headers, name, value.strip())
+    raise client.HTTPException(f"got more than {_MAX_HEADERS} headers")
+
+
 class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
     """HTTP request handler with WebSocket support."""
 
@@ -59,9 +233,144 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
 
     mutex = threading.Lock()
 
+    # WebSocket state; out_queue and its writer thread exist per connection
+    connected = False
+    out_queue: Optional[queue.SimpleQueue] = None
+
+    # Keep-alive pings for every open WebSocket come from one shared thread
+    _ping_frame = text_frame('{"type":"ping"}')
+    ping_scheduler = PingScheduler(interval=30.0)
+
+    # Upper bounds on queued frames coalesced into one send; the frame
+    # count stays well below the kernel's iovec limit for sendmsg
+    _ws_batch_bytes = 16384
+    _ws_batch_frames = 256
+
+    # StreamRequestHandler builds rfile/wfile from these. A buffered wfile
+    # collects the status line, headers and body of a response and sends
+    # them in one go when handle_one_request flushes; responses are small,
+    # so this is usually a single send. TCP_NODELAY keeps that send (and
+    # WebSocket frames) from waiting on Nagle's algorithm.
+    rbufsize = 65536
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    # Files that never change at runtime, loaded once by preload_files():
+    # path -> (bytes, content type)
+    _file_cache: Dict[Path, Tuple[bytes, str]] = {}
+
+    # 404 for unknown paths and missing files, after the protocol version
+    _not_found_head = (
+        b" 404 Not Found\r\n"
+        b"Content-Type: text/plain\r\n"
+        b"Content-Length: 9\r\n\r\n"
+    )
+    _not_found_body = b"Not Found"
+
+    # Complete cacheable responses built by preload_responses():
+    # request path -> status line + headers + body
+    _response_cache: Dict[str, bytes] = {}
+
     def do_HEAD(self):
         self.do_GET()
 
+    def parse_request(self) -> bool:
+        """
+        Parse the request line and headers into command, path and headers.
+
+        Follows BaseHTTPRequestHandler.parse_request (same checks, error
+        responses and keep-alive handling) but reads headers with
+        read_headers instead of the email parser.
+
+        Returns:
+            bool: False if an error response was already sent
+        """
+        self.command = None
+        self.request_version = version = self.default_request_version
+        self.close_connection = True
+        requestline = str(self.raw_requestline, "iso-8859-1").rstrip("\r\n")
+        self.requestline = requestline
+        words = requestline.split()
+        if not words:
+            return False
+
+        if len(words) >= 3:
+            version = words[-1]
+            try:
+                if not version.startswith("HTTP/"):
+                    raise ValueError
+                base_version_number = version.split("/", 1)[1]
+                major, minor = base_version_number.split(".")
+                if not (major.isdigit() and minor.isdigit()):
+                    raise ValueError
+                if len(major) > 10 or len(minor) > 10:
+                    raise ValueError
+                version_number = int(major), int(minor)
+            except (ValueError, IndexError):
+                self.send_error(
+                    HTTPStatus.BAD_REQUEST, "Bad request version (%r)" % version
+                )
+                return False
+            if version_number >= (1, 1) and self.protocol_version >= "HTTP/1.1":
+                self.close_connection = False
+            if version_number >= (2, 0):
+                self.send_error(
+                    HTTPStatus.HTTP_VERSION_NOT_SUPPORTED,
+                    "Invalid HTTP version (%s)" % base_version_number,
+                )
+                return False
+            self.request_version = version
+
+        if not 2 <= len(words) <= 3:
+            self.send_error(
+                HTTPStatus.BAD_REQUEST, "Bad request syntax (%r)" % requestline
+            )
+            return False
+        command, path = words[:2]
+        if len(words) == 2:
+            self.close_connection = True
+            if command != "GET":
+                self.send_error(
+                    HTTPStatus.BAD_REQUEST, "Bad HTTP/0.9 request type (%r)" % command
+                )
+                return False
+        self.command, self.path = command, path
+
+        # Collapse a leading // so the path cannot act as a scheme-relative
+        # URL in redirects
+        if path.startswith("//"):
+            self.path = "/" + path.lstrip("/")
+
+        try:
+            self.headers = read_headers(self.rfile)
+        except client.LineTooLong as err:
+            self.send_error(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Line too long", str(err)
+            )
+            return False
+        except client.HTTPException as err:
+            self.send_error(
+                HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                "Too many headers",
+                str(err),
+            )
+            return False
+
+        conntype = self.headers.get("Connection", "").lower()
+        if conntype == "close":
+            self.close_connection = True
+        elif conntype == "keep-alive" and self.protocol_version >= "HTTP/1.1":
+            self.close_connection = False
+        expect = self.headers.get("Expect", "")
+        if (
+            expect.lower() == "100-continue"
+            and self.protocol_version >= "HTTP/1.1"
+            and self.request_version >= "HTTP/1.1"
+        ):
+            if not self.handle_expect_100():
+                return False
+        return True
+
     def _body_allowed(self) -> bool:
         return self.command != "HEAD"
 
@@ -91,47 +400,120 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
         self.log_message("Player disconnected from %s", self.address_string())
 
     def send_message(self, message):
+        """
+        Queue a text message for this WebSocket's writer thread.
+
+        Safe to call from any thread; frames are written in call order.
+
+        Args:
+            message: Text (str) or UTF-8 encoded bytes
+        """
         if isinstance(message, str):
             message = message.encode("utf-8")
         self._send_message(self._opcode_text, message)
 
+    def send_prebuilt_frame(self, frame: bytes) -> None:
+        """
+        Queue an already framed message (see text_frame) without re-encoding.
+
+        Args:
+            frame: Complete WebSocket frame
+        """
+        if self.out_queue is not None:
+            self.out_queue.put(frame)
+        else:
+            try:
+                self.request.sendall(frame)
+            except socket.error as e:
+                self.log_error("SND: Close connection: Socket Error %s", e.args)
+                self._ws_close()
+
     def finish(self):
         # needed when wfile is used
         try:
             super().finish()
         except (socket.error, TypeError) as err:
             self.log_error(
-                f"finish(): Exception: in BaseHTTPRequestHandler.finish(): {err.args}"
+                "finish(): Exception: in BaseHTTPRequestHandler.finish(): %s", err.args
             )
 
     def _handle_websocket(self):
+        # All outbound frames go through one writer thread, so frames sent
+        # from several threads never interleave and bursts share one send
+        self.out_queue = queue.SimpleQueue()
+        writer = threading.Thread(target=self._ws_writer, daemon=True)
+        writer.start()
+
         self._handshake()
 
-        sender = threading.Thread(target=self._periodic_sender, daemon=True)
-        sender.start()
+        if self.connected:
+            self.ping_scheduler.register(self)
         try:
             self._read_messages()
         finally:
             self._ws_close()
+            # Let the writer flush the close frame before the socket closes
+            self.out_queue.put(None)
+            writer.join(timeout=5)
 
-    def _periodic_sender(self):
-        while self.connected:
-            self.send_message("Hello from server every 5 seconds")
-            time.sleep(5)
+    def _ws_writer(self):
+        """
+        Writer thread: send queued frames, coalescing whatever is waiting.
+
+        A None entry stops the thread once everything before it was sent.
+        """
+        out_queue = self.out_queue
+        sock = self.request
+        # TLS sockets have no sendmsg; their batches are joined instead
+        scatter = hasattr(sock, "sendmsg") and not isinstance(sock, ssl.SSLSocket)
+        while True:
+            frame = out_queue.get()
+            if frame is None:
+                return
+            batch = [frame]
+            size = len(frame)
+            stop = False
+            while size < self._ws_batch_bytes and len(batch) < self._ws_batch_frames:
+                try:
+                    frame = out_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if frame is None:
+                    stop = True
+                    break
+                batch.append(frame)
+                size += len(frame)
+            try:
+                if len(batch) == 1:
+                    sock.sendall(batch[0])
+                elif scatter:
+                    send_buffers(sock, batch)
+                else:
+                    sock.sendall(b"".join(batch))
+            except OSError as e:
+                self.log_error("SND: Close connection: Socket Error %s", e.args)
+                self._ws_close()
+                return
+            if stop:
+                return
+
+    def send_ping(self) -> None:
+        """Queue the prebuilt keep-alive frame; called by ping_scheduler."""
+        self.send_prebuilt_frame(self._ping_frame)
 
     def _read_messages(self):
         """Read and process WebSocket messages."""
         while self.connected:
             if self.server and self.server.last_activity_time:
-                self.server.last_activity_time = time.time()
+                self.server.last_activity_time = time.monotonic()
             try:
                 self._read_next_message()
             except (socket.error, WebSocketError) as e:
                 # websocket content error, time-out or disconnect.
-                self.log_error(f"RCV: Close connection: Socket Error {e.args}")
+                self.log_error("RCV: Close connection: Socket Error %s", e.args)
             except Exception as err:
                 # unexpected error in websocket connection.
-                self.log_error(f"RCV: Exception: in _read_messages: {err.args}")
+                self.log_error("RCV: Exception: in _read_messages: %s", err.args)
 
     def _read_next_message(self):
         """Read the next WebSocket message from the client."""
@@ -187,27 +569,19 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
 
     def _send_message(self, opcode, message):
         try:
-            frame = bytearray()
-            frame.append(0x80 | opcode)  # FIN + opcode
-
-            length = len(message)
-            if length <= 125:
-                frame.append(length)
-            elif length <= 65535:
-                frame.append(126)
-                frame.extend(struct.pack(">H", length))
-            else:
-                frame.append(127)
-                frame.extend(struct.pack(">Q", length))
+            frame = build_frame(opcode, message)
 
-            frame.extend(message)
+            # Hand off to the writer thread when there is one
+            if self.out_queue is not None:
+                self.out_queue.put(frame)
+                return
 
             self.request.sendall(frame)
         except socket.error as e:
-            self.log_error(f"SND: Close connection: Socket Error {e.args}")
+            self.log_error("SND: Close connection: Socket Error %s", e.args)
             self._ws_close()
         except Exception as err:
-            self.log_error(f"SND: Exception: in _send_message: {err.args}")
+            self.log_error("SND: Exception: in _send_message: %s", err.args)
             self._ws_close()
 
     def _handshake(self):
@@ -232,6 +606,8 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
         self.send_header("Connection", "Upgrade")
         self.send_header("Sec-WebSocket-Accept", accept)
         super().end_headers()
+        # Frames bypass wfile, so the buffered 101 response must go first
+        self.wfile.flush()
 
         self.connected = True
         self.on_ws_connected()
@@ -247,13 +623,13 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
         except socket.error:
             pass
         except Exception as err:
-            self.log_error(f"_ws_close(): Exception: {err.args}")
+            self.log_error("_ws_close(): Exception: %s", err.args)
 
     def _on_message(self, message):
         try:
             self.on_ws_message(message)
         except Exception as e:
-            self.log_error(f"on_ws_message(): Exception: {e}")
+            self.log_error("on_ws_message(): Exception: %s", e)
 
     def write(self, data: bytes) -> None:
         """
@@ -301,6 +677,90 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
             "geolocation=(), microphone=(), camera=()",
         )
 
+    @classmethod
+    def preload_files(cls, paths) -> None:
+        """
+        Read files into memory so serve_file() never touches the disk for them.
+
+        Only use this for files that do not change while the server runs,
+        such as the HTML pages and icons. Missing files are skipped and are
+        then served (or 404'd) from disk as before.
+
+        Args:
+            paths: Iterable of Path objects, keyed exactly as later passed
+                to serve_file()
+        """
+        for path in paths:
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            content_type, _ = mimetypes.guess_type(str(path))
+            cls._file_cache[path] = (data, content_type or "application/octet-stream")
+
+    @classmethod
+    def preload_responses(cls, routes: Dict[str, Path]) -> None:
+        """
+        Build the full 200 response for files served at fixed request paths.
+
+        The responses carry the long-lived cache header, so only use this
+        for immutable files such as icons. Missing files are skipped and
+        keep going through serve_file().
+
+        Args:
+            routes: Request path -> file to serve for it
+        """
+        for request_path, path in routes.items():
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            content_type, _ = mimetypes.guess_type(str(path))
+            cls._response_cache[request_path] = (
+                b"%s 200 OK\r\n"
+                b"Content-Type: %s\r\n"
+                b"Content-Length: %d\r\n"
+                b"Cache-Control: public, max-age=31536000, immutable\r\n\r\n%s"
+                % (
+                    cls.protocol_version.encode("ascii"),
+                    (content_type or "application/octet-stream").encode("ascii"),
+                    len(data),
+                    data,
+                )
+            )
+
+    def serve_cached_response(self) -> bool:
+        """
+        Write the prebuilt response for self.path, if there is one.
+
+        HEAD requests are left to the normal path, which omits the body.
+
+        Returns:
+            bool: True if the response was sent
+        """
+        response = self._response_cache.get(self.path)
+        if response is None or not self._body_allowed():
+            return False
+        self.log_request(200)
+        self.write(response)
+        return True
+
+    def send_not_found(self) -> None:
+        """
+        Send a fixed plain-text 404 in a single write.
+
+        Unlike send_error this builds no HTML page and does not echo the
+        requested path back to the client.
+        """
+        self.log_request(404)
+        response = self.protocol_version.encode("ascii") + self._not_found_head
+        if self._body_allowed():
+            response += self._not_found_body
+        try:
+            self.wfile.write(response)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            pass
+
     def serve_file(
         self,
         file: Path | bytes,
@@ -314,11 +774,16 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
             file_path: Path | None = None
 
             # Read data
-            if isinstance(file, Path):
+            cached = self._file_cache.get(file) if isinstance(file, Path) else None
+            if cached is not None:
+                file_path = file
+                data, cached_type = cached
+                content_type = content_type or cached_type
+            elif isinstance(file, Path):
                 file_path = file.resolve()
 
                 if not file_path.exists() or not file_path.is_file():
-                    self.send_error(404, "File not found")
+                    self.send_not_found()
                     return
 
                 data = file_path.read_bytes()
@@ -454,21 +919,51 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
         Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
         """
         try:
-            json_data = json.dumps(data).encode("utf-8")
+            json_data = fastjson.dumps(data)
+        except Exception as e:
+            self.log_error("Error sending json response: %s", e)
+            self.send_error(500, "Internal server error")
+            return
+        self.json_bytes_response(json_data, response_code, compress)
 
-            self.send_response(response_code)
-            self.send_header("Content-Type", "application/json")
+    def json_bytes_response(
+        self, json_data: bytes, response_code: int = 200, compress: bool = False
+    ) -> None:
+        """
+        Sends an already encoded JSON body with optional compression.
+
+        The status line, headers and body are joined into one bytes object
+        and written once, like send_processing_error.
+
+        Args:
+            json_data: Encoded JSON body
+            response_code: HTTP status code (default: 200)
+            compress: Gzip the body if the client accepts it
+        """
+        try:
+            encoding = b""
 
             if compress and "gzip" in self.headers.get("Accept-Encoding", ""):
                 # Fast compression (level 1) for real-time JSON responses
                 json_data = gzip.compress(json_data, compresslevel=1)
-                self.send_header("Content-Encoding", "gzip")
-
-            self.send_header("Content-Length", str(len(json_data)))
-            super().end_headers()
-            self.wfile.write(json_data)
+                encoding = b"Content-Encoding: gzip\r\n"
+
+            self.log_request(response_code)
+            self.write(
+                b"%s %d %s\r\n"
+                b"Content-Type: application/json\r\n"
+                b"%sContent-Length: %d\r\n\r\n%s"
+                % (
+                    self.protocol_version.encode("ascii"),
+                    response_code,
+                    self.responses.get(response_code, ("",))[0].encode("latin-1"),
+                    encoding,
+                    len(json_data),
+                    json_data,
+                )
+            )
         except Exception as e:
-            self.log_error(f"Error sending json response: {e}")
+            self.log_error("Error sending json response: %s", e)
             self.send_error(500, "Internal server error")
 
     def json_error(self, message: str, code: int = 400) -> None:
@@ -481,9 +976,53 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
 
         Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
         """
-        self.log_error(f"{message}: {code}")
+        self.log_error("%s: %d", message, code)
         self.json_response({"success": False, "message": message}, code)
 
+    def send_processing_error(self, error: ProcessingError) -> None:
+        """
+        Sends the JSON error response carried by a ProcessingError.
+
+        The status line and body were encoded when the error was built, so
+        the whole response goes out in a single write.
+
+        Args:
+            error: Client-facing error to report
+        """
+        self.log_error("[%d] %s", error.code, error.message)
+        self.log_request(error.code)
+        self.write(
+            b"%s %s\r\n"
+            b"Content-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n%s"
+            % (
+                self.protocol_version.encode("ascii"),
+                error.status_line,
+                len(error.body),
+                error.body,
+            )
+        )
+
+    # HTTP status for each HandlerException kind
+    _handler_error_status = {
+        KIND_LENGTH: 411,
+        KIND_DECODE: 400,
+        KIND_NODATA: 500,
+        KIND_HANDLER: 400,
+    }
+
+    def send_handler_error(self, error: HandlerException) -> None:
+        """
+        Sends a JSON error for any HandlerException subclass.
+
+        The status is looked up by error.kind, so callers need a single
+        except clause for the whole family.
+
+        Args:
+            error: Handler-level error to report
+        """
+        self.json_error(str(error), self._handler_error_status[error.kind])
+
     def json_success(
         self, data: Optional[Dict[str, Any]] = None, message: Optional[str] = None
     ) -> None:
@@ -520,49 +1059,54 @@ class ThreadedHandlerWithSockets(server.SimpleHTTPRequestHandler):
         cookie = cookies_bin.get(cookie_name)
         return cookie.value if cookie else None
 
-    def read_post_request(self) -> Optional[dict]:
+    def read_post_request(self, max_size: int = MAX_POST_SIZE) -> Optional[dict]:
         """
         Reads the wanted post request and returns a python object of it.
         Checks that the size is correct. And check that the size isnt exceeding
         the max or larger than the header specified
 
+        Args:
+            max_size: Largest accepted body in bytes; larger requests get a
+                413 before any of the body is read
+
         Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
         """
-        try:
-            length = self.headers.get("Content-Length")
-            if not length:
-                raise LengthException("Missing Content-Length header")
+        # Expected client mistakes are checked with plain branches; only
+        # socket and decoding failures go through the exception handler
+        length = parse_content_length(self.headers)
+        if length is None:
+            self.send_error(411, "ErrLen", "Missing Content-Length header")
+            return None
 
-            length = int(length)
+        if length > max_size:
+            self.send_error(413, "ErrLen", "Post request too large")
+            return None
 
-            if length > MAX_POST_SIZE:
-                raise LengthException("Post request too large")
+        content_type = self.headers.get("Content-Type", "")
+        is_json = content_type.startswith("application/json")
+        is_form = content_type.startswith("application/x-www-form-urlencoded")
 
+        try:
             raw = read_exactly(self.rfile, length).decode("utf-8")
-
-            content_type = self.headers.get("Content-Type", "")
-
-            # JSON
-            if content_type.startswith("application/json"):
-                data = json.loads(raw)
-                return {
-                    k: v.strip() if isinstance(v, str) else v for k, v in data.items()
-                }
-
-            # Form encoded
-            if content_type.startswith("application/x-www-form-urlencoded"):
-                parsed = parse_qs(raw, keep_blank_values=True)
-                return {k: v[0].strip() for k, v in parsed.items()}
-
-            raise DecodeException("Unsupported Content-Type", 415)
-
-        except json.JSONDecodeError:
-            self.send_error(400, "ErrJSON", "Invalid JSON payload")
-        except LengthException as e:
-            self.send_error(411, "ErrLen", str(e))
-        except DecodeException as e:
-            self.send_error(400, "ErrDecode", f"{e}")
         except Exception as e:
             self.send_error(400, "ErrRead", f"Failed to read POST data: {e}")
+            return None
 
+        # JSON
+        if is_json:
+            ok, data = try_decode_json(raw)
+            if not ok:
+                self.send_error(400, "ErrJSON", "Invalid JSON payload")
+                return None
+            if not isinstance(data, dict):
+                self.send_error(400, "ErrDecode", "Expected a JSON object")
+                return None
+            return {k: v.strip() if isinstance(v, str) else v for k, v in data.items()}
+
+        # Form encoded
+        if is_form:
+            parsed = parse_qs(raw, keep_blank_values=True)
+            return {k: v[0].strip() for k, v in parsed.items()}
+
+        self.send_error(415, "ErrDecode", "Unsupported Content-Type")
         return None
@@ -12,6 +12,7 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
 from http.server import ThreadingHTTPServer
+import socket
 import threading
 import time
 import ssl
@@ -29,7 +30,7 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
         inactivity_timeout (int): Seconds of inactivity before shutdown
         stopping (bool): Flag indicating shutdown in progress
         timeout (bool): Flag indicating shutdown was triggered by timeout
-        last_activity_time (float): Timestamp of last request processed
+        last_activity_time (float): time.monotonic() of last request processed
 
     Example:
         >>> server = TimeoutThreadingHTTPServer(
@@ -49,6 +50,11 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
         "_check_interval",
     )
 
+    # listen() backlog. socketserver defaults to 5, so a burst of clients
+    # connecting at once (page load, game start) gets refused or retried
+    # by the kernel before the accept loop can hand them to threads.
+    request_queue_size = socket.SOMAXCONN
+
     def __init__(self, server_address, handler_class, timeout_seconds, **kwargs):
         """
         Initialize the timeout HTTP server.
@@ -67,7 +73,7 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
             self.stopping = False
             self.timeout = False
             self.inactivity_timeout = timeout_seconds
-            self.last_activity_time = time.time()
+            self.last_activity_time = time.monotonic()
 
             # Pre-calculate check interval to avoid repeated computation
             # Cap at 60 seconds to ensure responsive shutdown
@@ -93,7 +99,7 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
         """
         try:
             super().server_activate()
-            self.last_activity_time = time.time()
+            self.last_activity_time = time.monotonic()
             # Daemon thread ensures clean shutdown even if monitoring fails
             threading.Thread(target=self._monitor_inactivity, daemon=True).start()
         except Exception as e:
@@ -118,7 +124,7 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
         """
         try:
             # Update activity time before processing to prevent race conditions
-            self.last_activity_time = time.time()
+            self.last_activity_time = time.monotonic()
             super().process_request(request, client_address)
         except Exception as e:
             print(f"Error processing request from {client_address}: {e}")
@@ -140,7 +146,7 @@ class TimeoutThreadingHTTPServer(ThreadingHTTPServer):
         """
         try:
             while not self._stop_event.is_set():
-                idle_time = time.time() - self.last_activity_time
+                idle_time = time.monotonic() - self.last_activity_time
 
                 if idle_time > self.inactivity_timeout:
                     print(
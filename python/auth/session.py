@@ -6,7 +6,6 @@ This module provides background session cleanup functionality.
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
-import time
 import utils.constants as c
 
 
@@ -32,4 +31,4 @@ def cleanup_sessions_loop() -> None:
                 break
         except Exception as e:
             print(f"Session cleanup error: {e}")
-            time.sleep(1)
+            c.SERVER_STATE.wait_for_shutdown(timeout=1)
@@ -2,11 +2,14 @@
 Database package for chess server.
 """
 
-from .connection import init_database
+from .connection import init_database, close_database, checkpoint_database
 from .user_operations import (
     create_new_user,
     get_username_and_pass,
+    get_creds_by_id,
+    get_username_by_id,
     get_user_stats_by_id,
+    get_pair_stats_by_id,
     update_username,
     update_password,
     delete_user_account,
@@ -17,13 +20,19 @@ from .game_operations import (
     update_player_elo,
     record_game_win,
     record_game_draw,
+    finalize_game_result,
 )
 
 __all__ = [
     "init_database",
+    "close_database",
+    "checkpoint_database",
     "create_new_user",
     "get_username_and_pass",
+    "get_creds_by_id",
+    "get_username_by_id",
     "get_user_stats_by_id",
+    "get_pair_stats_by_id",
     "update_username",
     "update_password",
     "delete_user_account",
@@ -32,4 +41,5 @@ __all__ = [
     "update_player_elo",
     "record_game_win",
     "record_game_draw",
+    "finalize_game_result",
 ]
@@ -7,19 +7,49 @@ validation and error handling.
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
+import datetime
 import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
 
 import utils.constants as c
 
 from utils.config import resolve_path
+from utils.exceptions import wrap_db
+from utils.logger import log
+from utils.SqlitePool import SqlitePool
 from utils.SanitizeOrValidate import valid_input, is_valid_length
 
+# (second, ISO timestamp for that second), replaced as one tuple so readers
+# on other threads never see a mismatched pair
+_iso_now_cache: Tuple[int, str] = (0, "")
+
+
+def iso_now() -> str:
+    """
+    Current local time as an ISO 8601 string at one-second resolution.
+
+    Formatted once per second and cached, so bursts of writes (several
+    games ending together, bulk updates) share one isoformat() call.
+
+    Returns:
+        str: e.g. "2025-01-31T14:05:09"
+    """
+    global _iso_now_cache
+    second = int(time.time())
+    cached = _iso_now_cache
+    if cached[0] != second:
+        cached = (second, datetime.datetime.fromtimestamp(second).isoformat())
+        _iso_now_cache = cached
+    return cached[1]
+
 
 def init_database(db_name: str) -> None:
     """
     Initialize database with validation.
 
-    Creates the main database connection and sets up the users table
+    Creates the main database connection pool and sets up the users table
     with proper schema including ELO ratings, win/loss records, and
     timestamps.
 
@@ -40,20 +70,11 @@ def init_database(db_name: str) -> None:
     db_path = resolve_path(c.SCRIPT_DIR, db_name)
 
     try:
-        # Create connection with thread-safe settings
-        connection = sqlite3.connect(
-            db_path,
-            check_same_thread=False,
-            isolation_level=None,  # Auto-commit mode
-        )
-        cursor = connection.cursor()
-
-        # Update global references
-        c.DB_CONNECTION = connection
-        c.DB_CURSOR = cursor
+        # Reader pool plus a single writer, all in WAL mode
+        pool = SqlitePool(db_path)
 
         # Create users table with proper schema
-        with c.DB_LOCK:
+        with pool.write() as cursor:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
                     user_id INTEGER PRIMARY KEY,
@@ -69,7 +90,71 @@ def init_database(db_name: str) -> None:
                 )
             """)
 
-        print(f"✓ Database initialized: {db_path}")
+        # Update global reference
+        c.DB_POOL = pool
+
+        log(f"✓ Database initialized: {db_path}")
 
     except Exception as e:
         c.SERVER_STATE.signal_error(f"Database initialization failed: {e}")
+
+
+@contextmanager
+def db_transaction() -> Iterator[sqlite3.Cursor]:
+    """
+    Run a with-block as one write transaction on the main database.
+
+    Statements inside the block run without their own try/except. Any
+    sqlite3.Error rolls the whole transaction back and is re-raised once,
+    here, wrapped in a DBException.
+
+    Yields:
+        sqlite3.Cursor: Cursor on the writer connection
+
+    Raises:
+        DBException: If any statement in the block fails
+
+    Example:
+        >>> with db_transaction() as cur:
+        ...     cur.execute("UPDATE users SET wins = wins + 1 WHERE user_id = ?", (1,))
+        ...     cur.execute("UPDATE users SET losses = losses + 1 WHERE user_id = ?", (2,))
+    """
+    try:
+        with c.DB_POOL.write() as cur:
+            yield cur
+    except sqlite3.Error as e:
+        raise wrap_db(e)
+
+
+def checkpoint_database() -> None:
+    """
+    Checkpoint and truncate the main database's WAL.
+
+    Called periodically by the cleanup thread so bursts of game-end writes
+    do not leave a large WAL for every reader to search. Errors are logged
+    and ignored; the next checkpoint retries.
+
+    Returns:
+        None
+    """
+    if not c.DB_POOL:
+        return
+
+    try:
+        busy, _, _ = c.DB_POOL.checkpoint("TRUNCATE")
+        if busy:
+            print("WAL checkpoint incomplete: database busy")
+    except sqlite3.Error as e:
+        print(f"WAL checkpoint error: {e}")
+
+
+def close_database() -> None:
+    """
+    Close the main database pool if it was initialized.
+
+    Returns:
+        None
+    """
+    if c.DB_POOL:
+        c.DB_POOL.close()
+        c.DB_POOL = None
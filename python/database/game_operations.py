@@ -2,17 +2,48 @@
 Game database operations.
 
 This module handles ELO calculations, ELO updates, and game result recording
-(wins, losses, draws).
+(wins, losses, draws). finalize_game_result writes a whole game end in one
+transaction; the single-purpose helpers remain for other callers.
 
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
-import sqlite3
-import datetime
-
 import utils.constants as c
 from utils.exceptions import DBException
 from utils.SanitizeOrValidate import valid_integer
+from .connection import db_transaction, iso_now
+
+# Statements are module constants so each call passes the same str object
+# and hits the connection's prepared-statement cache directly
+SQL_UPDATE_ELO = "UPDATE users SET elo = ? WHERE user_id = ?"
+SQL_RECORD_WIN_WINNER = (
+    "UPDATE users SET wins = wins + 1, last_game = ? WHERE user_id = ?"
+)
+SQL_RECORD_WIN_LOSER = (
+    "UPDATE users SET losses = losses + 1, last_game = ? WHERE user_id = ?"
+)
+SQL_RECORD_DRAW = (
+    "UPDATE users SET draws = draws + 1, last_game = ? WHERE user_id = ?"
+)
+SQL_FINALIZE_WINNER = (
+    "UPDATE users SET elo = ?, wins = wins + 1, last_game = ? WHERE user_id = ?"
+)
+SQL_FINALIZE_LOSER = (
+    "UPDATE users SET elo = ?, losses = losses + 1, last_game = ? WHERE user_id = ?"
+)
+SQL_FINALIZE_DRAW = (
+    "UPDATE users SET elo = ?, draws = draws + 1, last_game = ? WHERE user_id = ?"
+)
+
+
+# Expected score for every rating difference (loser - winner) within
+# +/-ELO_DIFF_LIMIT, so a rating update is a lookup instead of a float pow.
+# Beyond the limit the expected score is within 0.001 of 0 or 1.
+ELO_DIFF_LIMIT = 1200
+_EXPECTED_SCORE = tuple(
+    1 / (1 + 10 ** (diff / 400))
+    for diff in range(-ELO_DIFF_LIMIT, ELO_DIFF_LIMIT + 1)
+)
 
 
 def elo_delta(winner_elo: int, loser_elo: int, score: float, k: int = 32) -> int:
@@ -21,7 +52,8 @@ def elo_delta(winner_elo: int, loser_elo: int, score: float, k: int = 32) -> int
 
     The ELO system is a method for calculating the relative skill levels of
     players in zero-sum games. This implementation uses the standard formula
-    with configurable K-factor.
+    with configurable K-factor; the expected score comes from a table
+    precomputed at import.
 
     Args:
         winner_elo: Winner's current ELO rating
@@ -29,8 +61,12 @@ def elo_delta(winner_elo: int, loser_elo: int, score: float, k: int = 32) -> int
         score: Game score (1.0 for win, 0.5 for draw, 0.0 for loss)
         k: K-factor controlling rating volatility (default 32)
     """
-    expected = 1 / (1 + 10 ** ((loser_elo - winner_elo) / 400))
-    return int(k * (score - expected))
+    diff = int(loser_elo - winner_elo)
+    if diff > ELO_DIFF_LIMIT:
+        diff = ELO_DIFF_LIMIT
+    elif diff < -ELO_DIFF_LIMIT:
+        diff = -ELO_DIFF_LIMIT
+    return int(k * (score - _EXPECTED_SCORE[diff + ELO_DIFF_LIMIT]))
 
 
 def update_player_elo(user_id: int, new_elo: int) -> bool:
@@ -45,7 +81,7 @@ def update_player_elo(user_id: int, new_elo: int) -> bool:
         True if successful, False otherwise
     """
 
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
@@ -57,17 +93,10 @@ def update_player_elo(user_id: int, new_elo: int) -> bool:
         if not valid_integer(new_elo, min_val=0, max_val=10000):
             raise DBException("Invalid ELO value")
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute(
-                "UPDATE users SET elo = ? WHERE user_id = ?",
-                (new_elo, user_id),
-            )
-            c.DB_CONNECTION.commit()
+        with db_transaction() as cur:
+            cur.execute(SQL_UPDATE_ELO, (new_elo, user_id))
         return True
     except DBException as e:
-        print(f"Validation error in update_player_elo: {e}")
-        return False
-    except sqlite3.Error as e:
         print(f"Error updating ELO: {e}")
         return False
 
@@ -86,12 +115,12 @@ def record_game_win(winner_id: int, loser_id: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
     try:
-        now = datetime.datetime.now().isoformat()
+        now = iso_now()
 
         # Validate IDs
         if not (
@@ -99,23 +128,11 @@ def record_game_win(winner_id: int, loser_id: int) -> bool:
         ):
             raise DBException("Invalid user IDs")
 
-        with c.DB_LOCK:
-            # Update winner
-            c.DB_CURSOR.execute(
-                "UPDATE users SET wins = wins + 1, last_game = ? WHERE user_id = ?",
-                (now, winner_id),
-            )
-            # Update loser
-            c.DB_CURSOR.execute(
-                "UPDATE users SET losses = losses + 1, last_game = ? WHERE user_id = ?",
-                (now, loser_id),
-            )
-            c.DB_CONNECTION.commit()
+        with db_transaction() as cur:
+            cur.execute(SQL_RECORD_WIN_WINNER, (now, winner_id))
+            cur.execute(SQL_RECORD_WIN_LOSER, (now, loser_id))
         return True
     except DBException as e:
-        print(f"Validation error in record_game_win: {e}")
-        return False
-    except sqlite3.Error as e:
         print(f"Error recording game: {e}")
         return False
 
@@ -133,12 +150,12 @@ def record_game_draw(player1_id: int, player2_id: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
     try:
-        now = datetime.datetime.now().isoformat()
+        now = iso_now()
 
         # Validate IDs
         if not (
@@ -147,21 +164,67 @@ def record_game_draw(player1_id: int, player2_id: int) -> bool:
         ):
             raise DBException("Invalid user IDs")
 
-        with c.DB_LOCK:
-            # Update both players
-            c.DB_CURSOR.execute(
-                "UPDATE users SET draws = draws + 1, last_game = ? WHERE user_id = ?",
-                (now, player1_id),
-            )
-            c.DB_CURSOR.execute(
-                "UPDATE users SET draws = draws + 1, last_game = ? WHERE user_id = ?",
-                (now, player2_id),
-            )
-            c.DB_CONNECTION.commit()
+        with db_transaction() as cur:
+            # One statement, bound once per player
+            cur.executemany(SQL_RECORD_DRAW, ((now, player1_id), (now, player2_id)))
         return True
     except DBException as e:
-        print(f"Validation error in record_game_draw: {e}")
-        return False
-    except sqlite3.Error as e:
         print(f"Error recording draw: {e}")
         return False
+
+
+def finalize_game_result(
+    winner_id: int,
+    loser_id: int,
+    winner_new_elo: int,
+    loser_new_elo: int,
+    draw: bool = False,
+) -> bool:
+    """
+    Record a finished game's ELO and result for both players at once.
+
+    Both players' rows are updated in a single transaction, so a game end
+    costs one commit instead of one per ELO update and result count.
+
+    Args:
+        winner_id: Winner's user ID (first player for a draw)
+        loser_id: Loser's user ID (second player for a draw)
+        winner_new_elo: New ELO rating for winner_id
+        loser_new_elo: New ELO rating for loser_id
+        draw: Count the game as a draw for both players
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not c.DB_POOL:
+        c.SERVER_STATE.signal_error("DB not initialized")
+        return False
+
+    try:
+        now = iso_now()
+
+        # Validate inputs
+        if not (
+            valid_integer(winner_id, min_val=1) and valid_integer(loser_id, min_val=1)
+        ):
+            raise DBException("Invalid user IDs")
+
+        if not (
+            valid_integer(winner_new_elo, min_val=0, max_val=10000)
+            and valid_integer(loser_new_elo, min_val=0, max_val=10000)
+        ):
+            raise DBException("Invalid ELO value")
+
+        with db_transaction() as cur:
+            if draw:
+                cur.executemany(
+                    SQL_FINALIZE_DRAW,
+                    ((winner_new_elo, now, winner_id), (loser_new_elo, now, loser_id)),
+                )
+            else:
+                cur.execute(SQL_FINALIZE_WINNER, (winner_new_elo, now, winner_id))
+                cur.execute(SQL_FINALIZE_LOSER, (loser_new_elo, now, loser_id))
+        return True
+    except DBException as e:
+        print(f"Error finalizing game result: {e}")
+        return False
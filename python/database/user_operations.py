@@ -8,10 +8,10 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
 import os
+import hmac
 import hashlib
 import sqlite3
-import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 
 from utils.SanitizeOrValidate import (
     valid_input,
@@ -21,7 +21,32 @@ from utils.SanitizeOrValidate import (
 )
 
 import utils.constants as c
-from utils.exceptions import DBException, ProcessingError
+from utils.exceptions import DBException, conflict
+from .connection import db_transaction, iso_now
+
+# scrypt cost parameters (~16 MB and tens of milliseconds per hash)
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 64
+SCRYPT_PREFIX = "scrypt$"
+
+# Read statements used on every login, session check and stats request
+SQL_SELECT_CREDS = (
+    "SELECT user_id, password_hash, salt FROM users WHERE username = ?"
+)
+SQL_SELECT_CREDS_BY_ID = (
+    "SELECT user_id, password_hash, salt FROM users WHERE user_id = ?"
+)
+SQL_SELECT_USERNAME_BY_ID = "SELECT username FROM users WHERE user_id = ?"
+SQL_SELECT_STATS_BY_ID = (
+    "SELECT elo, wins, draws, losses, join_date, last_game "
+    "FROM users WHERE user_id = ?"
+)
+SQL_SELECT_PAIR_STATS = (
+    "SELECT elo, wins, draws, losses, join_date, last_game, user_id "
+    "FROM users WHERE user_id IN (?, ?)"
+)
 
 
 def get_username_and_pass(username: str) -> Optional[Dict]:
@@ -34,7 +59,7 @@ def get_username_and_pass(username: str) -> Optional[Dict]:
     Returns:
         Dict with user_id, password_hash, and salt if found, None otherwise
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return None
 
@@ -46,12 +71,9 @@ def get_username_and_pass(username: str) -> Optional[Dict]:
         if not valid_username(username):
             raise DBException("Username format invalid")
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute(
-                "SELECT user_id, password_hash, salt FROM users WHERE username = ?",
-                (username,),
-            )
-            row = c.DB_CURSOR.fetchone()
+        with c.DB_POOL.read() as cur:
+            cur.execute(SQL_SELECT_CREDS, (username,))
+            row = cur.fetchone()
 
         if not row:
             return None
@@ -65,6 +87,88 @@ def get_username_and_pass(username: str) -> Optional[Dict]:
         return None
 
 
+def get_creds_by_id(user_id: int) -> Optional[Dict]:
+    """
+    Get user credentials from database by user_id.
+
+    Used when the caller is already authenticated, so the lookup does not
+    depend on a username that may have changed since the session started.
+
+    Args:
+        user_id: User's ID
+
+    Returns:
+        Dict with user_id, password_hash, and salt if found, None otherwise
+    """
+    if not c.DB_POOL:
+        c.SERVER_STATE.signal_error("DB not initialized")
+        return None
+
+    try:
+        # Validate user_id
+        if not valid_integer(user_id, min_val=1):
+            raise DBException("Invalid user_id")
+
+        with c.DB_POOL.read() as cur:
+            cur.execute(SQL_SELECT_CREDS_BY_ID, (user_id,))
+            row = cur.fetchone()
+
+        if not row:
+            return None
+
+        return {"user_id": row[0], "password_hash": row[1], "salt": row[2]}
+    except DBException as e:
+        print(f"Validation error in get_creds_by_id: {e}")
+        return None
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+        return None
+
+
+def get_username_by_id(user_id: int) -> Optional[str]:
+    """
+    Get a user's current username from the database by user_id.
+
+    Args:
+        user_id: User's ID
+
+    Returns:
+        Username if found, None otherwise
+    """
+    if not c.DB_POOL:
+        c.SERVER_STATE.signal_error("DB not initialized")
+        return None
+
+    try:
+        # Validate user_id
+        if not valid_integer(user_id, min_val=1):
+            raise DBException("Invalid user_id")
+
+        with c.DB_POOL.read() as cur:
+            cur.execute(SQL_SELECT_USERNAME_BY_ID, (user_id,))
+            row = cur.fetchone()
+
+        return row[0] if row else None
+    except DBException as e:
+        print(f"Validation error in get_username_by_id: {e}")
+        return None
+    except sqlite3.Error as e:
+        print(f"Error: {e}")
+        return None
+
+
+def _stats_from_row(row: tuple) -> Dict:
+    """Build a stats dict from a row led by the SQL_SELECT_STATS_BY_ID columns."""
+    return {
+        "elo": row[0],
+        "wins": row[1],
+        "draws": row[2],
+        "losses": row[3],
+        "join_date": row[4],
+        "last_game": row[5],
+    }
+
+
 def get_user_stats_by_id(user_id: int) -> Dict:
     """
     Get user statistics from database by user_id with validation.
@@ -75,7 +179,7 @@ def get_user_stats_by_id(user_id: int) -> Dict:
     Returns:
         Dict with user stats or empty dict if not found
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return {}
 
@@ -84,21 +188,14 @@ def get_user_stats_by_id(user_id: int) -> Dict:
         if not valid_integer(user_id, min_val=1):
             raise DBException("Invalid user_id")
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
-            user_data = c.DB_CURSOR.fetchone()
+        with c.DB_POOL.read() as cur:
+            cur.execute(SQL_SELECT_STATS_BY_ID, (user_id,))
+            user_data = cur.fetchone()
 
         if not user_data:
             return {}
 
-        return {
-            "elo": user_data[4],
-            "wins": user_data[5],
-            "draws": user_data[6],
-            "losses": user_data[7],
-            "join_date": user_data[8],
-            "last_game": user_data[9],
-        }
+        return _stats_from_row(user_data)
     except DBException as e:
         print(f"Validation error in get_user_stats_by_id: {e}")
         return {}
@@ -107,6 +204,45 @@ def get_user_stats_by_id(user_id: int) -> Dict:
         return {}
 
 
+def get_pair_stats_by_id(user_id1: int, user_id2: int) -> Tuple[Dict, Dict]:
+    """
+    Get both players' statistics with a single query.
+
+    Game creation needs the stats of two users; one SELECT ... IN (?, ?)
+    on one borrowed reader replaces two get_user_stats_by_id round trips.
+
+    Args:
+        user_id1: First user's ID
+        user_id2: Second user's ID
+
+    Returns:
+        Tuple of stats dicts in argument order; a user that is not found
+        (or any error) gives an empty dict in that position
+    """
+    if not c.DB_POOL:
+        c.SERVER_STATE.signal_error("DB not initialized")
+        return {}, {}
+
+    try:
+        if not (
+            valid_integer(user_id1, min_val=1) and valid_integer(user_id2, min_val=1)
+        ):
+            raise DBException("Invalid user IDs")
+
+        with c.DB_POOL.read() as cur:
+            cur.execute(SQL_SELECT_PAIR_STATS, (user_id1, user_id2))
+            rows = cur.fetchall()
+
+        by_id = {row[6]: _stats_from_row(row) for row in rows}
+        return by_id.get(user_id1, {}), by_id.get(user_id2, {})
+    except DBException as e:
+        print(f"Validation error in get_pair_stats_by_id: {e}")
+        return {}, {}
+    except sqlite3.Error as e:
+        print(f"Error: {e}")
+        return {}, {}
+
+
 def create_new_user(username: str, password: str) -> Optional[int]:
     """
     Insert a new user into the database with validation.
@@ -119,7 +255,7 @@ def create_new_user(username: str, password: str) -> Optional[int]:
         The new user's user_id if successful, None otherwise
     """
 
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return None
 
@@ -141,15 +277,15 @@ def create_new_user(username: str, password: str) -> Optional[int]:
 
         password_hash, salt = generate_password_hash(password)
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute(
+        with db_transaction() as cur:
+            cur.execute(
                 "SELECT user_id FROM users WHERE username = ?",
                 (username,),
             )
-            if c.DB_CURSOR.fetchone():
-                raise ProcessingError("Username already exists", 409)
+            if cur.fetchone():
+                conflict("Username already exists")
 
-            c.DB_CURSOR.execute(
+            cur.execute(
                 """
                 INSERT INTO users (username, password_hash, salt, elo, wins, draws, losses, join_date, last_game)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -162,42 +298,57 @@ def create_new_user(username: str, password: str) -> Optional[int]:
                     0,
                     0,
                     0,
-                    datetime.datetime.now().isoformat(),
+                    iso_now(),
                     None,
                 ),
             )
-            c.DB_CONNECTION.commit()
-            user_id = c.DB_CURSOR.lastrowid
+            user_id = cur.lastrowid
         print(f"User {username} added successfully!")
         return user_id
     except DBException as e:
-        print(f"Validation error in create_new_user : {username} - {e}")
-        return None
-    except sqlite3.IntegrityError:
+        print(f"Error in create_new_user : {username} - {e}")
         return None
 
 
+def _scrypt(password: str, salt: bytes) -> bytes:
+    """Derive the raw scrypt key for password and salt."""
+    return hashlib.scrypt(
+        password.encode(),
+        salt=salt,
+        n=SCRYPT_N,
+        r=SCRYPT_R,
+        p=SCRYPT_P,
+        dklen=SCRYPT_DKLEN,
+    )
+
+
 def generate_password_hash(password: str, salt: Optional[bytes] = None) -> tuple:
     """
-    Generate a SHA512 hash of the given password and an optional salt.
+    Derive a scrypt hash of the given password and an optional salt.
+
+    The hash is stored with a "scrypt$" prefix so compare_password can tell
+    it apart from legacy single-round SHA512 hashes of the same length.
 
     Args:
         password: Plain text password
         salt: Optional salt bytes (generated if not provided)
 
     Returns:
-        tuple: (hashed_password_hex, salt_hex)
+        tuple: (prefixed_hash_hex, salt_hex)
     """
     if not salt:
         salt = os.urandom(16)
-    hash_obj = hashlib.sha512(salt + password.encode())
-    hashed_password = hash_obj.hexdigest()
-    return hashed_password, salt.hex()
+    return SCRYPT_PREFIX + _scrypt(password, salt).hex(), salt.hex()
 
 
 def compare_password(password: str, hashed_password: str, salt: str) -> bool:
     """
-    Verify a password against a hash.
+    Verify a password against a hash in constant time.
+
+    The stored hex is decoded once and compared against the raw derived
+    key, so verification never hex-encodes the new digest. Hashes without
+    the scrypt prefix were written before the switch to scrypt and are
+    checked as SHA512(salt + password).
 
     Args:
         password: Plain text password to verify
@@ -207,7 +358,18 @@ def compare_password(password: str, hashed_password: str, salt: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return generate_password_hash(password, bytes.fromhex(salt))[0] == hashed_password
+    try:
+        salt_bytes = bytes.fromhex(salt)
+        if hashed_password.startswith(SCRYPT_PREFIX):
+            stored = bytes.fromhex(hashed_password[len(SCRYPT_PREFIX) :])
+            candidate = _scrypt(password, salt_bytes)
+        else:
+            stored = bytes.fromhex(hashed_password)
+            candidate = hashlib.sha512(salt_bytes + password.encode()).digest()
+    except ValueError:
+        # Corrupt stored hash or salt never matches
+        return False
+    return hmac.compare_digest(candidate, stored)
 
 
 def update_username(user_id: int, new_username: str) -> bool:
@@ -222,7 +384,7 @@ def update_username(user_id: int, new_username: str) -> bool:
         True if successful, False if username already exists or error occurs
     """
 
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
@@ -240,29 +402,25 @@ def update_username(user_id: int, new_username: str) -> bool:
         if not is_valid_length(new_username, 3, 20):
             raise DBException("New username length invalid")
 
-        with c.DB_LOCK:
+        with db_transaction() as cur:
             # Check if new username already exists
-            c.DB_CURSOR.execute(
+            cur.execute(
                 "SELECT user_id FROM users WHERE username = ?",
                 (new_username,),
             )
-            if c.DB_CURSOR.fetchone():
+            if cur.fetchone():
                 return False
 
             # Update username
-            c.DB_CURSOR.execute(
+            cur.execute(
                 "UPDATE users SET username = ? WHERE user_id = ?",
                 (new_username, user_id),
             )
-            c.DB_CONNECTION.commit()
 
         print(f"Username updated for user_id {user_id} -> {new_username}")
         return True
     except DBException as e:
-        print(f"Validation error in update_username : {new_username} - {e}")
-        return False
-    except sqlite3.Error as e:
-        print(f"Error updating username: {e}")
+        print(f"Error updating username to {new_username}: {e}")
         return False
 
 
@@ -277,7 +435,7 @@ def update_password(user_id: int, new_password: str) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
@@ -295,19 +453,15 @@ def update_password(user_id: int, new_password: str) -> bool:
 
         password_hash, salt = generate_password_hash(new_password)
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute(
+        with db_transaction() as cur:
+            cur.execute(
                 "UPDATE users SET password_hash = ?, salt = ? WHERE user_id = ?",
                 (password_hash, salt, user_id),
             )
-            c.DB_CONNECTION.commit()
 
         print(f"Password updated for user_id: {user_id}")
         return True
     except DBException as e:
-        print(f"Validation error in update_password: {e}")
-        return False
-    except sqlite3.Error as e:
         print(f"Error updating password: {e}")
         return False
 
@@ -322,7 +476,7 @@ def delete_user_account(user_id: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    if not (c.DB_CONNECTION and c.DB_CURSOR):
+    if not c.DB_POOL:
         c.SERVER_STATE.signal_error("DB not initialized")
         return False
 
@@ -331,18 +485,14 @@ def delete_user_account(user_id: int) -> bool:
         if not valid_integer(user_id, min_val=1):
             raise DBException("Invalid user_id")
 
-        with c.DB_LOCK:
-            c.DB_CURSOR.execute(
+        with db_transaction() as cur:
+            cur.execute(
                 "DELETE FROM users WHERE user_id = ?",
                 (user_id,),
             )
-            c.DB_CONNECTION.commit()
 
         print(f"Account deleted: {user_id}")
         return True
     except DBException as e:
-        print(f"Validation error in delete_user_account: {e}")
-        return False
-    except sqlite3.Error as e:
         print(f"Error deleting account: {e}")
         return False
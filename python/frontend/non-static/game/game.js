@@ -519,6 +519,27 @@ function handleGameStart(message) {
       : "Opponent's turn",
     "info",
   );
+
+  // Moves made before this connection (e.g. after a reconnect)
+  loadMoveHistory();
+}
+
+async function loadMoveHistory() {
+  try {
+    const response = await fetch("/game/history", {
+      method: "POST",
+      credentials: "include",
+    });
+    if (!response.ok) return;
+
+    const data = await response.json();
+    if (data.success && Array.isArray(data.move_history)) {
+      gameState.moveHistory = data.move_history;
+      updateMoveHistory();
+    }
+  } catch (error) {
+    console.error("Failed to load move history:", error);
+  }
 }
 
 function handleMoveUpdate(message) {
@@ -526,12 +547,17 @@ function handleMoveUpdate(message) {
 
   // Update game state
   gameState.fen = message.fen;
-  gameState.currentTurn = message.turn || message.current_turn;
+  gameState.currentTurn =
+    message.next_turn || message.turn || message.current_turn;
   gameState.legalMoves = message.legal_moves || [];
 
-  // Add to move history
+  // Only the new move is sent; move_index places it in the history
   if (message.move) {
-    gameState.moveHistory.push(message.move);
+    if (typeof message.move_index === "number") {
+      gameState.moveHistory[message.move_index] = message.move;
+    } else {
+      gameState.moveHistory.push(message.move);
+    }
   }
 
   // Update board position with animation
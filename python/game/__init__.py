@@ -4,8 +4,13 @@ Game logic package for chess server.
 
 from .matchmaking import matchmaking_loop
 from .instance_handler import instance_thread_handler
+from .registry import add_game, remove_game, game_for_session, pop_idle_games
 
 __all__ = [
     "matchmaking_loop",
     "instance_thread_handler",
+    "add_game",
+    "remove_game",
+    "game_for_session",
+    "pop_idle_games",
 ]
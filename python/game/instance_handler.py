@@ -9,6 +9,8 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 import time
 import traceback
 import utils.constants as c
+from database.connection import checkpoint_database
+from .registry import pop_idle_games, remove_game
 
 
 def instance_thread_handler() -> None:
@@ -20,48 +22,54 @@ def instance_thread_handler() -> None:
     2. Cleans up finished or timed-out games
 
     Game cleanup criteria:
-    - Games with status "finished"
     - Games with no activity for 30 minutes (timeout)
 
-    Runs every 5 seconds and prints stats every 30 seconds.
+    Finished games are removed by the game-end handler itself.
+
+    Runs every 5 seconds, prints stats every 30 seconds and checkpoints
+    the database WAL every 60 seconds.
     """
 
+    stat_interval = 30.0  # seconds between pool stat prints
+    checkpoint_interval = 60.0  # seconds between WAL checkpoints
+    next_stat_print = time.monotonic() + stat_interval
+    next_checkpoint = time.monotonic() + checkpoint_interval
+
     while not c.SERVER_STATE.should_shutdown():
         try:
             # Auto-scale engine pool
             if c.ENGINE_POOL:
                 c.ENGINE_POOL.auto_scale()
 
-            # Clean up finished games
-            games_to_remove = []
-
-            for game_id, game_data in list(c.ACTIVE_GAMES.items()):
-                # Check for timeout (30 minutes of inactivity)
-                if time.time() - game_data.get("last_move_at", time.time()) > 1800:
-                    print(f"Game {game_id}: Timeout - no activity for 30 minutes")
-                    games_to_remove.append(game_id)
-                    continue
-
-                # Check if game is finished
-                if game_data.get("status") == "finished":
-                    games_to_remove.append(game_id)
-
-            # Clean up finished games
-            for game_id in games_to_remove:
-                if game_id in c.ACTIVE_GAMES:
-                    del c.ACTIVE_GAMES[game_id]
+            # Clean up timed-out games (30 minutes of inactivity); only
+            # games due on the deadline heap are looked at
+            for game_id in pop_idle_games(1800):
+                print(f"Game {game_id}: Timeout - no activity for 30 minutes")
+                if remove_game(game_id):
                     print(f"Cleaned up game {game_id}")
 
-            # Print stats every 30 seconds
-            if int(time.time()) % 30 == 0:
+            now = time.monotonic()
+
+            # Print stats every 30 seconds; a wall-clock modulo check
+            # could miss or repeat the tick depending on loop timing
+            if now >= next_stat_print:
+                next_stat_print = now + stat_interval
                 stats = c.ENGINE_POOL.get_stats() if c.ENGINE_POOL else {}
                 print(
-                    f"Pool stats: {stats.get('instance_count', 0)} instances, {len(c.ACTIVE_GAMES)} active games"
+                    f"Pool stats: {stats.get('instance_count', 0)} instances, "
+                    f"{stats.get('utilization', 0.0):.0%} busy, "
+                    f"{len(c.ACTIVE_GAMES)} active games"
                 )
 
-            time.sleep(5)  # Check every 5 seconds
+            # Keep the WAL from growing across bursts of game-end writes
+            if now >= next_checkpoint:
+                next_checkpoint = now + checkpoint_interval
+                checkpoint_database()
+
+            # Check every 5 seconds, waking immediately on shutdown
+            c.SERVER_STATE.wait_for_shutdown(timeout=5)
 
         except Exception as e:
             print(f"Instance handler error: {e}")
             traceback.print_exc()
-            time.sleep(5)
+            c.SERVER_STATE.wait_for_shutdown(timeout=5)
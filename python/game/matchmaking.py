@@ -8,136 +8,107 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 
 import time
 import random
-import queue
 import traceback
 
 import utils.constants as c
-from database.user_operations import get_user_stats_by_id
+from database.user_operations import get_pair_stats_by_id
+from utils.MatchmakingQueue import QueuedPlayer
+from utils.logger import log
+from .registry import add_game
 
 
 def matchmaking_loop() -> None:
     """
-    Continuously checks the matchmaking queue and creates games when two players are waiting.
+    Creates games as soon as two players are waiting in the matchmaking queue.
 
     This background thread:
-    1. Polls the matchmaking queue for new players
-    2. Removes stale players (waiting > 5 minutes)
-    3. Creates games when =>2 players are waiting
+    1. Sleeps on the queue until a pair of players is available
+    2. Creates a game for each pair
+    3. Removes stale players (waiting > 5 minutes) as they expire
+
+    The thread only wakes for a pair, for the oldest waiting player going
+    stale, or for shutdown (cleanup closes the queue), so an idle server
+    costs it no wakeups.
     """
 
     # Constants
     stale_player_threshold = 300  # 5 minutes
-    loop_delay = 0.5  # seconds
-
-    waiting_players = []
-    # Add user_ids to set to ensure we dont add the same player twice
-    waiting_player_ids = set()
 
     # Validate server initialization
     if not c.SERVER_STATE:
         print("ERROR: Server not initialized correctly")
         c.SERVER_STATE.should_shutdown()
 
-    if not c.MATCHMAKING_QUEUE:
+    if c.MATCHMAKING_QUEUE is None:
         print("ERROR: Matchmaking queue not initialized correctly")
         c.SERVER_STATE.should_shutdown()
 
     while not c.SERVER_STATE.should_shutdown():
         try:
-            # Poll queue for new players
-            _poll_queue(waiting_players, waiting_player_ids)
-
-            # Clean up stale entries
-            _remove_stale_players(
-                waiting_players, waiting_player_ids, stale_player_threshold
-            )
-
-            # Create games from waiting players
-            _create_games_from_queue(waiting_players, waiting_player_ids)
-
-            time.sleep(loop_delay)
+            # Sleep until the oldest player goes stale. With nobody waiting,
+            # anyone who joins goes stale no sooner than a full threshold
+            # from now, so that bounds the wait
+            oldest = c.MATCHMAKING_QUEUE.oldest_joined_at()
+            if oldest is None:
+                wait_timeout = stale_player_threshold
+            else:
+                wait_timeout = oldest + stale_player_threshold - time.monotonic()
+
+            # Woken by the queue as soon as two players are waiting
+            pair = c.MATCHMAKING_QUEUE.wait_for_pair(timeout=max(0.0, wait_timeout))
+            if pair:
+                _create_game_from_pair(*pair)
+            else:
+                _remove_stale_players(stale_player_threshold)
 
         except Exception as e:
             print(f"Matchmaking loop error: {e}")
             traceback.print_exc()
-            time.sleep(1)
-
-    print("Matchmaking loop shutting down")
-
-
-def _poll_queue(waiting_players: list, waiting_player_ids: set) -> None:
-    """Add new players from the queue to the waiting list."""
-
-    try:
-        player = c.MATCHMAKING_QUEUE.get(timeout=1)
+            c.SERVER_STATE.wait_for_shutdown(timeout=1)
 
-        user_id = player.get("user_id")
+    log("Matchmaking loop shutting down")
 
-        # Deduplicate by user_id (preferred)
-        if user_id in waiting_player_ids:
-            print(f"Skipping duplicate matchmaking entry for user_id={user_id}")
-            return
 
-        player["timestamp"] = time.time()
+def _remove_stale_players(threshold: int) -> None:
+    # Only the front of the queue can be stale. Players whose search ended
+    # early are removed by the search handler, and any left without a
+    # result slot are dropped when they are paired.
+    removed = c.MATCHMAKING_QUEUE.remove_older_than(time.monotonic() - threshold)
 
-        waiting_players.append(player)
-        waiting_player_ids.add(user_id)
+    if removed:
+        print(f"Removed {len(removed)} stale player(s) from queue")
 
-        print(f"Player {player.get('username', 'Unknown')} added to matchmaking queue")
 
-    except queue.Empty:
-        pass
+def _create_game_from_pair(player1: QueuedPlayer, player2: QueuedPlayer) -> None:
+    # A search that ended while queued leaves its partner waiting
+    waiting = [
+        p for p in (player1, player2) if p.session_id in c.MATCHMAKING_RESULTS
+    ]
+    if len(waiting) < 2:
+        for player in reversed(waiting):
+            c.MATCHMAKING_QUEUE.push_front(player)
+        return
 
+    if not _validate_player_sessions(player1, player2):
+        print("Skipping match - invalid session(s)")
+        return
 
-def _remove_stale_players(
-    waiting_players: list, waiting_player_ids: set, threshold: int
-) -> None:
-    current_time = time.time()
+    if not _create_game(player1, player2):
+        c.MATCHMAKING_QUEUE.push_front(player2)
+        c.MATCHMAKING_QUEUE.push_front(player1)
+        # Back off so a persistent failure does not spin
+        c.SERVER_STATE.wait_for_shutdown(timeout=1)
 
-    kept_players = []
-    for p in waiting_players:
-        if current_time - p["timestamp"] < threshold:
-            kept_players.append(p)
-        else:
-            waiting_player_ids.discard(p["user_id"])
 
-    removed_count = len(waiting_players) - len(kept_players)
-    waiting_players[:] = kept_players
-
-    if removed_count > 0:
-        print(f"Removed {removed_count} stale player(s) from queue")
-
-
-def _create_games_from_queue(waiting_players: list, waiting_player_ids: set) -> None:
-    while len(waiting_players) >= 2:
-        player1 = waiting_players.pop(0)
-        player2 = waiting_players.pop(0)
-
-        waiting_player_ids.discard(player1["user_id"])
-        waiting_player_ids.discard(player2["user_id"])
-
-        if not _validate_player_sessions(player1, player2):
-            print("Skipping match - invalid session(s)")
-            continue
-
-        success = _create_game(player1, player2)
-
-        if not success:
-            waiting_players.insert(0, player2)
-            waiting_players.insert(0, player1)
-            waiting_player_ids.add(player1["user_id"])
-            waiting_player_ids.add(player2["user_id"])
-
-
-def _validate_player_sessions(player1: dict, player2: dict) -> bool:
+def _validate_player_sessions(player1: QueuedPlayer, player2: QueuedPlayer) -> bool:
     """Verify both players have valid sessions."""
 
-    session1 = c.SESSION_MANAGER.get_session(player1["session_id"])
-    session2 = c.SESSION_MANAGER.get_session(player2["session_id"])
+    session1 = c.SESSION_MANAGER.get_session(player1.session_id)
+    session2 = c.SESSION_MANAGER.get_session(player2.session_id)
     return bool(session1 and session2)
 
 
-def _create_game(player1: dict, player2: dict) -> bool:
+def _create_game(player1: QueuedPlayer, player2: QueuedPlayer) -> bool:
     """
     Create a new game between two players and notify them.
 
@@ -147,9 +118,10 @@ def _create_game(player1: dict, player2: dict) -> bool:
     try:
         game_id = _generate_game_id()
 
-        # Fetch player statistics
-        player1_stats = get_user_stats_by_id(player1["user_id"])
-        player2_stats = get_user_stats_by_id(player2["user_id"])
+        # Fetch both players' statistics in one query
+        player1_stats, player2_stats = get_pair_stats_by_id(
+            player1.user_id, player2.user_id
+        )
 
         # Randomly assign colors
         colors = _assign_colors()
@@ -159,26 +131,24 @@ def _create_game(player1: dict, player2: dict) -> bool:
             game_id, player1, player2, player1_stats, player2_stats, colors
         )
 
-        # Store game
-        c.ACTIVE_GAMES[game_id] = game_state
+        # Store game and index both players' sessions
+        add_game(game_id, game_state)
 
         # Get initial legal moves
         _initialize_legal_moves(game_id, game_state)
 
-        # Notify both players by storing game_id for their long-polling requests
-        c.MATCHMAKING_RESULTS[player1["session_id"]] = {
-            "game_id": game_id,
-            "notified": False,
-        }
-        c.MATCHMAKING_RESULTS[player2["session_id"]] = {
-            "game_id": game_id,
-            "notified": False,
-        }
+        # Wake both players' long-polling search requests
+        for player in (player1, player2):
+            result = c.MATCHMAKING_RESULTS.get(player.session_id)
+            if result:
+                holder, event = result
+                holder[0] = game_id
+                event.set()
 
         # Log game creation
         print(f"✓ Game {game_id} created:")
-        print(f"  {player1['username']} ({player1_stats['elo']}) plays {colors[0]}")
-        print(f"  {player2['username']} ({player2_stats['elo']}) plays {colors[1]}")
+        print(f"  {player1.username} ({player1_stats['elo']}) plays {colors[0]}")
+        print(f"  {player2.username} ({player2_stats['elo']}) plays {colors[1]}")
 
         return True
 
@@ -190,46 +160,52 @@ def _create_game(player1: dict, player2: dict) -> bool:
 
 def _generate_game_id() -> str:
     """Generate a unique game identifier."""
-    return f"game_{int(time.time())}_{random.randint(1000, 9999)}"
+    # 1000-9999 from 14 random bits; the slight bias toward low values is
+    # irrelevant for a collision-avoiding suffix
+    return f"game_{int(time.time())}_{random.getrandbits(14) % 9000 + 1000}"
 
 
 def _assign_colors() -> tuple:
     """Randomly assign white and black colors to players."""
-    colors = ["white", "black"]
-    random.shuffle(colors)
-    return colors[0], colors[1]
+    # One random bit instead of shuffling a fresh list
+    if random.getrandbits(1):
+        return "white", "black"
+    return "black", "white"
 
 
 def _initialize_game_state(
     _game_id: str,
-    player1: dict,
-    player2: dict,
+    player1: QueuedPlayer,
+    player2: QueuedPlayer,
     player1_stats: dict,
     player2_stats: dict,
     colors: tuple,
 ) -> dict:
     """Create the initial game state dictionary."""
-    current_time = time.time()
+    # Only ever compared with each other, so use the monotonic clock
+    current_time = time.monotonic()
 
     return {
         "player1": {
-            "user_id": player1["user_id"],
-            "username": player1["username"],
-            "session_id": player1["session_id"],
+            "user_id": player1.user_id,
+            "username": player1.username,
+            "session_id": player1.session_id,
             "color": colors[0],
             "websocket": None,
             "elo": player1_stats["elo"],
         },
         "player2": {
-            "user_id": player2["user_id"],
-            "username": player2["username"],
-            "session_id": player2["session_id"],
+            "user_id": player2.user_id,
+            "username": player2.username,
+            "session_id": player2.session_id,
             "color": colors[1],
             "websocket": None,
             "elo": player2_stats["elo"],
         },
         "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
         "moves": [],
+        # (move count, encoded /game/history body), rebuilt when moves grows
+        "history_cache": None,
         "current_turn": "white",
         "legal_moves": [],
         "status": "ongoing",
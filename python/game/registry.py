@@ -0,0 +1,97 @@
+"""
+Active game registry.
+
+Keeps ACTIVE_GAMES and the SESSION_TO_GAME index in step, so a player's
+game can be found by session_id with one dict lookup instead of scanning
+every active game. GAME_DEADLINES orders the games by last activity, so
+the cleanup thread finds idle games without scanning them either.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import heapq
+import time
+from typing import List, Optional
+
+import utils.constants as c
+
+
+def add_game(game_id: str, game_state: dict) -> None:
+    """
+    Register a new game and index both players' sessions.
+
+    Args:
+        game_id: Unique game identifier
+        game_state: Game state dictionary (see matchmaking)
+    """
+    with c.GAMES_LOCK:
+        c.ACTIVE_GAMES[game_id] = game_state
+        c.SESSION_TO_GAME[game_state["player1"]["session_id"]] = game_id
+        c.SESSION_TO_GAME[game_state["player2"]["session_id"]] = game_id
+        heapq.heappush(c.GAME_DEADLINES, (game_state["last_move_at"], game_id))
+
+
+def remove_game(game_id: str) -> Optional[dict]:
+    """
+    Remove a game and its session index entries.
+
+    Args:
+        game_id: Game to remove
+
+    Returns:
+        Optional[dict]: Removed game state, or None if it was not active
+    """
+    with c.GAMES_LOCK:
+        game_state = c.ACTIVE_GAMES.pop(game_id, None)
+        if game_state:
+            for slot in ("player1", "player2"):
+                session_id = game_state[slot]["session_id"]
+                # Only drop the entry if it still points at this game
+                if c.SESSION_TO_GAME.get(session_id) == game_id:
+                    del c.SESSION_TO_GAME[session_id]
+        return game_state
+
+
+def pop_idle_games(max_idle: float) -> List[str]:
+    """
+    Take the games that have had no move for at least max_idle seconds.
+
+    Heap entries are not updated on every move. When an entry comes due,
+    a game that has moved since is pushed back with its current
+    last_move_at, and an entry for a game that was already removed is
+    dropped. A poll with nothing idle only looks at the top of the heap.
+
+    Args:
+        max_idle: Seconds of inactivity after which a game times out
+
+    Returns:
+        List[str]: Idle game_ids; they stay in ACTIVE_GAMES until removed
+    """
+    cutoff = time.monotonic() - max_idle
+    deadlines = c.GAME_DEADLINES
+    idle: List[str] = []
+    with c.GAMES_LOCK:
+        while deadlines and deadlines[0][0] <= cutoff:
+            _, game_id = heapq.heappop(deadlines)
+            game_state = c.ACTIVE_GAMES.get(game_id)
+            if game_state is None:
+                continue
+            last_move_at = game_state["last_move_at"]
+            if last_move_at > cutoff:
+                heapq.heappush(deadlines, (last_move_at, game_id))
+            else:
+                idle.append(game_id)
+    return idle
+
+
+def game_for_session(session_id: str) -> Optional[str]:
+    """
+    Find the active game a session is playing in.
+
+    Args:
+        session_id: Player's session ID
+
+    Returns:
+        Optional[str]: game_id, or None if the session has no active game
+    """
+    return c.SESSION_TO_GAME.get(session_id)
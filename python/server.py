@@ -6,29 +6,36 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
 # Thread/ program
+import os
 import signal
 import sys
 import threading
-import traceback
 import time
-from typing import Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import lru_cache, wraps
+from typing import Dict, Optional, Tuple
 
 import ssl
 
 # Game
 import json
-import queue
 
 # Config
 from utils.EngineHandler import EnginePool, InstanceInoperable
+from utils.MatchmakingQueue import QueuedPlayer
 from utils.SanitizeOrValidate import (
     sanitize_filename,
     valid_input,
     valid_username,
+    valid_session_id,
     is_valid_length,
     valid_utf8,
 )
 
+import utils.constants as c
+import utils.fastjson as fastjson
+from utils.logger import hold_output, log, release_output
+
 # Import constants and exceptions
 from utils.constants import (
     config,
@@ -38,6 +45,9 @@ from utils.constants import (
     SERVER_PORT,
     SERVER_TIMEOUT,
     GAME_HANDLER,
+    ENGINE_PREWARM,
+    HTTP_CORES,
+    ENGINE_CORES,
     ACTIVE_DB,
     SESSION_DB,
     SERVER_STATE,
@@ -45,7 +55,7 @@ from utils.constants import (
     COMPRESSION_CACHE,
     ACTIVE_GAMES,
     MATCHMAKING_QUEUE,
-    DB_CONNECTION,
+    MATCHMAKING_RESULTS,
     HTTPD,
     ENGINE_POOL,
     LOGIN_HTML,
@@ -65,19 +75,240 @@ from utils.exceptions import (
     MajorServerSideException,
     ProcessingError,
     NoDataException,
+    HandlerException,
+    bad_request,
+    unauthorized,
+    make_validator,
+    log_exception,
+    not_found,
+    conflict,
+    server_error,
 )
 
 from ThreadedHttpServer import TimeoutThreadingHTTPServer, SSLTimeoutThreadingServer
-from HttpSocketHandler import ThreadedHandlerWithSockets
+from HttpSocketHandler import ThreadedHandlerWithSockets, text_frame
 
 from auth import *
 from game import *
 from database import *
 
 
+# user_id -> current username; only successful lookups are stored
+_USERNAME_CACHE: Dict[int, str] = {}
+_USERNAME_CACHE_MAX = 1024
+_USERNAME_CACHE_LOCK = threading.Lock()
+# Bumped by _forget_username; a lookup that started before a bump must not
+# store the name it read, since the rename may have committed after its read
+_username_cache_gen = 0
+
+
+def _username_for(user_id: int) -> Optional[str]:
+    """
+    Resolve a user's current username, cached per user_id.
+
+    Sessions only store the immutable user_id, so the display name is looked
+    up here. A None result (unknown user or a failed read) is not cached, so
+    a transient database error does not lock the user out. Call
+    _forget_username() whenever a username changes or a user is deleted.
+
+    Args:
+        user_id: User's database ID
+
+    Returns:
+        Optional[str]: Username, or None if the user does not exist
+    """
+    username = _USERNAME_CACHE.get(user_id)
+    if username is not None:
+        return username
+
+    gen = _username_cache_gen
+    username = get_username_by_id(user_id)
+    if username is not None:
+        with _USERNAME_CACHE_LOCK:
+            if gen == _username_cache_gen:
+                if len(_USERNAME_CACHE) >= _USERNAME_CACHE_MAX:
+                    # Evict the oldest entry (dicts keep insertion order)
+                    del _USERNAME_CACHE[next(iter(_USERNAME_CACHE))]
+                _USERNAME_CACHE[user_id] = username
+    return username
+
+
+def _forget_username(user_id: int) -> None:
+    """
+    Drop a user's cached username after it changed or the user was deleted.
+
+    Args:
+        user_id: User's database ID
+    """
+    global _username_cache_gen
+    with _USERNAME_CACHE_LOCK:
+        _username_cache_gen += 1
+        _USERNAME_CACHE.pop(user_id, None)
+
+
+# Seconds between session re-checks on an open WebSocket
+_WS_SESSION_REFRESH = 30.0
+
+# GET pages served without a session
+_PUBLIC_PAGES = {"/login": LOGIN_HTML, "/register": REGISTER_HTML}
+
+# GET pages that need a session ("/game" also checks for an active game)
+_AUTH_PAGES = {"/stats": STATS_HTML, "/home": HOME_HTML, "/profile": PROFILE_HTML}
+
+# WebSocket messages that never change, framed once
+_HANDSHAKE_ACK_FRAME = text_frame(
+    json.dumps({"type": "handshake_ack", "message": "Server ready"})
+)
+_DRAW_ACCEPTED_FRAME = text_frame(
+    json.dumps({"type": "draw_accepted", "message": "Draw accepted"})
+)
+
+
+# Exact texts the game client sends for keep-alive and handshake messages,
+# mapped to their type so on_ws_message can skip validation and json.loads
+_WS_FAST_MESSAGES = {
+    '{"type":"pong"}': "pong",
+    '{"type":"handshake"}': "handshake",
+    '{"type":"handshake","message":"Client ready"}': "handshake",
+}
+
+
+@lru_cache(maxsize=64)
+def _ws_error_frame(message: str) -> bytes:
+    """
+    Framed WebSocket error message, built once per distinct message.
+
+    Only pass constant messages; engine-supplied errors go via send_message.
+
+    Args:
+        message: Error text shown to the client
+
+    Returns:
+        bytes: Complete text frame
+    """
+    return text_frame(json.dumps({"type": "error", "message": message}))
+
+
+# game_over fields that can be spliced into _GAME_OVER_TEMPLATE unescaped
+_GAME_OVER_COLORS = frozenset(("white", "black"))
+_GAME_OVER_RESULTS = _GAME_OVER_COLORS | {"draw"}
+_GAME_OVER_REASONS = frozenset(("checkmate", "resignation", "draw", "stalemate"))
+_GAME_OVER_TEMPLATE = (
+    b'{"type":"game_over","winner":"%s","reason":"%s",'
+    b'"elo_changes":{"%s":%d,"%s":%d}}'
+)
+
+
+def _game_over_frame(result: str, reason: str, elo_changes: dict) -> bytes:
+    """
+    Framed game_over message for both players.
+
+    Known results and reasons are filled into a byte template; anything
+    else (e.g. an unexpected engine reason) is encoded as JSON.
+
+    Args:
+        result: "white", "black" or "draw"
+        reason: Why the game ended
+        elo_changes: {color: delta} for both players
+
+    Returns:
+        bytes: Complete text frame
+    """
+    if (
+        result in _GAME_OVER_RESULTS
+        and reason in _GAME_OVER_REASONS
+        and elo_changes.keys() == _GAME_OVER_COLORS
+    ):
+        (color1, delta1), (color2, delta2) = elo_changes.items()
+        return text_frame(
+            _GAME_OVER_TEMPLATE
+            % (
+                result.encode(),
+                reason.encode(),
+                color1.encode(),
+                delta1,
+                color2.encode(),
+                delta2,
+            )
+        )
+    return text_frame(
+        fastjson.dumps(
+            {
+                "type": "game_over",
+                "winner": result,
+                "reason": reason,
+                "elo_changes": elo_changes,
+            }
+        )
+    )
+
+
+# Largest body accepted by the profile endpoints, checked before reading
+_PROFILE_POST_MAX = 4096
+
+_NOT_AUTHENTICATED = ProcessingError.cached("Not authenticated", 401)
+
+
+def requires_auth(handler):
+    """
+    Run check_auth before a POST handler and answer 401 if it fails.
+
+    The rejection happens before the handler reads the request body. On
+    success the handler is called as handler(self, session_id, username,
+    user_id).
+
+    Args:
+        handler: GameHandler method taking the three session values
+
+    Returns:
+        Callable: Route handler taking only self
+    """
+
+    @wraps(handler)
+    def wrapper(self):
+        is_auth, session_id, username, user_id = self.check_auth()
+        if not is_auth:
+            self.send_processing_error(_NOT_AUTHENTICATED)
+            return
+        handler(self, session_id, username, user_id)
+
+    return wrapper
+
+
+# Validation rules shared by the account handlers
+_check_login_username = make_validator(valid_username, "Invalid username format")
+_check_login_username_length = make_validator(
+    lambda v: is_valid_length(v, 1, 128),
+    "Username must be between 1 and 128 characters",
+)
+_check_login_password = make_validator(valid_input, "Invalid password format")
+_check_login_password_length = make_validator(
+    lambda v: is_valid_length(v, 1, 128), "Password length invalid"
+)
+_check_new_username = make_validator(
+    valid_username, "Username contains invalid characters"
+)
+_check_new_username_length = make_validator(
+    lambda v: is_valid_length(v, 3, 20),
+    "Username must be between 3 and 20 characters",
+)
+_check_new_password = make_validator(
+    valid_input, "Password contains invalid characters"
+)
+
+
 class GameHandler(ThreadedHandlerWithSockets):
     """HTTP/WebSocket handler with authentication and game logic."""
 
+    # Per-connection WebSocket state, set by on_ws_connected. The class-level
+    # defaults let later callbacks test "is not None" instead of hasattr.
+    user_id: Optional[int] = None
+    username: Optional[str] = None
+    session_id: Optional[str] = None
+    game_id: Optional[str] = None
+    player_slot: Optional[str] = None
+    opponent_slot: Optional[str] = None
+
     def check_auth(self) -> Tuple[bool, Optional[str], Optional[str], Optional[int]]:
         """
         Check if user is authenticated.
@@ -91,17 +322,22 @@ class GameHandler(ThreadedHandlerWithSockets):
             return False, None, None, None
 
         # Validate session_id format
-        if not valid_input(session_id) or not is_valid_length(session_id, 1, 128):
+        if not valid_session_id(session_id):
             return False, None, None, None
 
         session = SESSION_MANAGER.get_session(session_id)
         if not session:
             return False, None, None, None
 
+        user_id = session["user_id"]
+        username = _username_for(user_id)
+        if not username:
+            return False, None, None, None
+
         # Update activity
         SESSION_MANAGER.update_activity(session_id)
 
-        return True, session_id, session["username"], session["user_id"]
+        return True, session_id, username, user_id
 
     def do_GET(self) -> None:
         """Handle GET requests and WebSocket upgrades."""
@@ -109,6 +345,10 @@ class GameHandler(ThreadedHandlerWithSockets):
         if self.headers.get("Upgrade", "").lower() == "websocket":
             return self._handle_websocket()
 
+        # Icons are answered with a complete prebuilt response
+        if self.serve_cached_response():
+            return
+
         # Sanitize filenames to block directory traversal attacks
         sanitize_filename(self.path)
 
@@ -123,10 +363,9 @@ class GameHandler(ThreadedHandlerWithSockets):
         # If no path is given default to login
         if self.path == "/":
             return self.redirect("/login")
-        if self.path == "/login":
-            return self.serve_page(page=LOGIN_HTML)
-        if self.path == "/register":
-            return self.serve_page(page=REGISTER_HTML)
+        page = _PUBLIC_PAGES.get(self.path)
+        if page is not None:
+            return self.serve_page(page=page)
         if (self.path in ICON_FILES) or ("icons" in self.path):
             return self.serve_icons(ICONS_DIRECTORY)
 
@@ -135,8 +374,9 @@ class GameHandler(ThreadedHandlerWithSockets):
         if not is_auth:
             return self.redirect("/login")
         # Authenticated routes
-        if self.path == "/stats":
-            self.serve_page(page=STATS_HTML)
+        page = _AUTH_PAGES.get(self.path)
+        if page is not None:
+            self.serve_page(page=page)
         elif self.path == "/game":
             # Check if the player is in an active game, if no we redirect to the
             # home page
@@ -147,37 +387,16 @@ class GameHandler(ThreadedHandlerWithSockets):
                 ]:
                     return self.serve_page(page=GAME_HTML)
             return self.serve_page(page=HOME_HTML)
-        elif self.path == "/home":
-            self.serve_page(page=HOME_HTML)
-        elif self.path == "/profile":
-            self.serve_page(page=PROFILE_HTML)
         else:
-            self.send_error(404, "NotFound", f"Page not found: {self.path}")
+            self.send_not_found()
 
     def do_POST(self) -> None:
         """Handle all POST requests to the server."""
-        if self.path == "/login":
-            self.handle_login()
-        elif self.path == "/register":
-            self.handle_register()
-        elif self.path == "/session":
-            self.handle_session()
-        elif self.path == "/home/search":
-            self.handle_search()
-        elif self.path == "/home/cancel":
-            self.handle_cancel_search()
-        elif self.path == "/stats":
-            self.handle_stats()
-        elif self.path == "/profile/update-username":
-            self.handle_change_username()
-        elif self.path == "/profile/update-password":
-            self.handle_change_password()
-        elif self.path == "/profile/delete-account":
-            self.handle_delete_account()
-        elif self.path == "/logout":
-            self.handle_logout()
-        else:
-            self.send_error(404, "NotFound", f"Handler not found: {self.path}")
+        handler = self._post_routes.get(self.path)
+        if handler is None:
+            self.send_not_found()
+            return
+        handler(self)
 
     def handle_login(self) -> None:
         """Handle user login with comprehensive validation."""
@@ -191,42 +410,33 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             # Input validation
             if not username or not password:
-                raise ProcessingError("Missing credentials", 400)
-
-            # Validate username format
-            if not valid_username(username):
-                raise ProcessingError("Invalid username format", 400)
+                bad_request("Missing credentials")
 
-            # Validate username length
-            if not is_valid_length(username, 1, 128):
-                raise ProcessingError(
-                    "Username must be between 1 and 128 characters", 400
-                )
+            # Validate username format and length
+            _check_login_username(username)
+            _check_login_username_length(username)
 
             # Validate password
-            if not valid_input(password):
-                raise ProcessingError("Invalid password format", 400)
-
-            if not is_valid_length(password, 1, 128):
-                raise ProcessingError("Password length invalid", 400)
+            _check_login_password(password)
+            _check_login_password_length(password)
 
             # Get user data from database
             user_data = get_username_and_pass(username)
 
             if not user_data:
-                raise ProcessingError("Invalid username or password", 401)
+                unauthorized("Invalid username or password")
 
             # Verify password
             if not compare_password(
                 password, user_data["password_hash"], user_data["salt"]
             ):
-                raise ProcessingError("Invalid username or password", 401)
+                unauthorized("Invalid username or password")
 
-            self.session_login(user_id=user_data["user_id"], username=username)
+            self.session_login(user_id=user_data["user_id"])
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
-        except NoDataException as e:
-            self.json_error(f"No data to be read from request: {e}", 500)
+            self.send_processing_error(e)
+        except HandlerException as e:
+            self.send_handler_error(e)
         except Exception as e:
             self.json_error(f"Server error: {e}", 500)
 
@@ -235,7 +445,7 @@ class GameHandler(ThreadedHandlerWithSockets):
         try:
             data = self.read_post_request()
             if not data:
-                raise ProcessingError("No data received", 400)
+                bad_request("No data received")
 
             username = data.get("username", "")
             password = data.get("password", "")
@@ -243,48 +453,36 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             # Validation
             if not (username and password and confirm_password):
-                raise ProcessingError("Missing required fields", 400)
+                bad_request("Missing required fields")
 
             if password != confirm_password:
-                raise ProcessingError("Passwords do not match", 400)
-
-            if not valid_username(username):
-                raise ProcessingError("Username contains invalid characters", 400)
+                bad_request("Passwords do not match")
 
-            if not is_valid_length(username, 3, 20):
-                raise ProcessingError(
-                    "Username must be between 3 and 20 characters", 400
-                )
+            _check_new_username(username)
+            _check_new_username_length(username)
 
             if not is_valid_length(password, 12, 128):
-                raise ProcessingError("Password must be at least 12 characters", 400)
+                bad_request("Password must be at least 12 characters")
 
-            if not valid_input(password):
-                raise ProcessingError("Password contains invalid characters", 400)
+            _check_new_password(password)
 
             # Create user
             user_id = create_new_user(username, password)
             if not user_id:
-                raise ProcessingError("Could not create new username", 500)
-            self.session_login(user_id=user_id, username=username)
+                server_error("Could not create new username")
+            self.session_login(user_id=user_id)
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Registration error: {e}", 500)
 
-    def handle_session(self) -> None:
+    @requires_auth
+    def handle_session(self, _session_id, username, user_id) -> None:
         """Handle session validation and return current user info."""
         try:
-            is_auth, session_id, username, user_id = self.check_auth()
-
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-            if not (session_id and username and user_id):
-                raise ProcessingError("Could not retrieve user info", 500)
-
             stats = get_user_stats_by_id(user_id)
             if not stats:
-                raise ProcessingError("Stats not found", 404)
+                not_found("Stats not found")
 
             payload = {
                 "username": username,
@@ -293,28 +491,22 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             self.json_success(data=payload)
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Session error: {e}", 500)
 
     def handle_logout(self) -> None:
         """Handle user logout."""
         session_id = self.get_cookie("session_id")
-        if session_id and valid_input(session_id):
+        if session_id and valid_session_id(session_id):
             SESSION_MANAGER.delete_session(session_id)
         self.json_success(message="Logged out successfully")
 
-    def handle_change_username(self) -> None:
+    @requires_auth
+    def handle_change_username(self, session_id, _username, user_id) -> None:
         """Handle username change request with validation."""
         try:
-            is_auth, session_id, username, user_id = self.check_auth()
-
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-            if not (session_id and username and user_id):
-                raise ProcessingError("Could not retrieve user info", 500)
-
-            data = self.read_post_request()
+            data = self.read_post_request(max_size=_PROFILE_POST_MAX)
             if not data:
                 raise NoDataException("No data to be read")
 
@@ -323,61 +515,46 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             # Validation
             if not new_username or not password:
-                raise ProcessingError("Missing credentials", 400)
-
-            if not valid_username(new_username):
-                raise ProcessingError("Username contains invalid characters", 400)
+                bad_request("Missing credentials")
 
-            if not is_valid_length(new_username, 3, 20):
-                raise ProcessingError(
-                    "Username must be between 3 and 20 characters", 400
-                )
+            _check_new_username(new_username)
+            _check_new_username_length(new_username)
 
             if not valid_input(password):
-                raise ProcessingError("Invalid password", 400)
+                bad_request("Invalid password")
 
             # Verify existing credentials
-            user_data = get_username_and_pass(username)
+            user_data = get_creds_by_id(user_id)
             if not user_data:
-                raise ProcessingError("Invalid username or password", 401)
+                unauthorized("Invalid username or password")
             if not compare_password(
                 password, user_data["password_hash"], user_data["salt"]
             ):
-                raise ProcessingError("Invalid username or password", 401)
+                unauthorized("Invalid username or password")
 
             # Update username
             if not update_username(user_id, new_username):
-                raise ProcessingError("Username already exists", 409)
+                conflict("Username already exists")
 
-            SESSION_MANAGER.update_username_in_sessions(user_id, new_username)
+            _forget_username(user_id)
             SESSION_MANAGER.update_activity(session_id)
 
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-
-            response = json.dumps(
-                {"success": True, "message": "Username updated successfully"}
-            )
-            self.wfile.write(response.encode("utf-8"))
+            self.json_success(message="Username updated successfully")
 
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
+        except HandlerException as e:
+            self.send_handler_error(e)
         except Exception as e:
             self.json_error(f"Error updating username: {e}", 500)
 
-    def handle_change_password(self) -> None:
+    @requires_auth
+    def handle_change_password(self, session_id, _username, user_id) -> None:
         """Handle password change request with validation."""
         try:
-            is_auth, session_id, username, user_id = self.check_auth()
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-            if not (session_id and username and user_id):
-                raise ProcessingError("Could not retrieve user info", 500)
-
-            data = self.read_post_request()
+            data = self.read_post_request(max_size=_PROFILE_POST_MAX)
             if not data:
-                raise ProcessingError("No data received", 400)
+                bad_request("No data received")
 
             current_password = data.get("current_password", "")
             new_password = data.get("new_password", "")
@@ -385,30 +562,27 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             # Validation
             if not (current_password and new_password):
-                raise ProcessingError("Current and new passwords are required", 400)
+                bad_request("Current and new passwords are required")
 
             if new_password != confirm_password:
-                raise ProcessingError("Passwords don't match", 400)
+                bad_request("Passwords don't match")
 
             if not is_valid_length(new_password, 12, 128):
-                raise ProcessingError(
-                    "New password must be at least 12 characters", 400
-                )
+                bad_request("New password must be at least 12 characters")
 
-            if not valid_input(new_password):
-                raise ProcessingError("Password contains invalid characters", 400)
+            _check_new_password(new_password)
 
-            user_data = get_username_and_pass(username)
+            user_data = get_creds_by_id(user_id)
             if not user_data:
-                raise ProcessingError("User not found", 404)
+                not_found("User not found")
             if not compare_password(
                 current_password, user_data["password_hash"], user_data["salt"]
             ):
-                raise ProcessingError("Current password is incorrect", 401)
+                unauthorized("Current password is incorrect")
 
             # Update password and invalidate other sessions
             if not update_password(user_id, new_password):
-                raise ProcessingError("Failed to update password", 500)
+                server_error("Failed to update password")
 
             for sid in SESSION_MANAGER.get_user_sessions(user_id):
                 if sid != session_id:
@@ -416,155 +590,174 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             SESSION_MANAGER.update_activity(session_id)
 
-            self.send_response(200)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-
-            response = json.dumps(
-                {"success": True, "message": "Password updated successfully"}
-            )
-            self.wfile.write(response.encode("utf-8"))
+            self.json_success(message="Password updated successfully")
 
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Error updating password: {e}", 500)
 
-    def handle_delete_account(self) -> None:
+    @requires_auth
+    def handle_delete_account(self, _session_id, _username, user_id) -> None:
         """Handle account deletion request."""
         try:
-            # Check authentication
-            is_auth, session_id, username, user_id = self.check_auth()
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-            if not (session_id and username and user_id):
-                raise ProcessingError("Could not retrieve user info", 500)
-
             # Read request data
-            data = self.read_post_request()
+            data = self.read_post_request(max_size=_PROFILE_POST_MAX)
             if not data:
-                raise ProcessingError("No data received", 400)
+                bad_request("No data received")
 
             password = data.get("password", "")
 
             # Validate password
             if not password:
-                raise ProcessingError("Password is required for confirmation", 400)
+                bad_request("Password is required for confirmation")
 
             if not valid_input(password):
-                raise ProcessingError("Invalid password", 400)
+                bad_request("Invalid password")
 
             # Verify password
-            user_data = get_username_and_pass(username)
+            user_data = get_creds_by_id(user_id)
             if not user_data:
-                raise ProcessingError("User not found", 404)
+                not_found("User not found")
 
             if not compare_password(
                 password, user_data["password_hash"], user_data["salt"]
             ):
-                raise ProcessingError("Invalid password", 401)
+                unauthorized("Invalid password")
 
             # Delete user account
             if delete_user_account(user_id):
                 # Logout all sessions (using user_id)
                 SESSION_MANAGER.logout_all_user_sessions(user_id)
+                _forget_username(user_id)
 
                 self.json_success(message="Account deleted successfully")
             else:
-                raise ProcessingError("Failed to delete account", 500)
+                server_error("Failed to delete account")
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Error deleting account: {e}", 500)
 
-    def handle_search(self) -> None:
+    @requires_auth
+    def handle_search(self, session_id, username, user_id) -> None:
         """Handle matchmaking search request."""
         global MATCHMAKING_QUEUE, MATCHMAKING_RESULTS
 
-        try:
-            is_auth, session_id, username, user_id = self.check_auth()
-
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-            if not (session_id and username and user_id):
-                raise ProcessingError("Could not retrieve user info", 500)
+        # How long the long-polling request waits for an opponent
+        search_timeout = 30
 
+        try:
             # Check if player already has an active game
             for _, game_data in ACTIVE_GAMES.items():
                 if user_id in [
                     game_data["player1"]["user_id"],
                     game_data["player2"]["user_id"],
                 ]:
-                    raise ProcessingError("Already in an active game", 409)
+                    conflict("Already in an active game")
 
-            # Add to matchmaking queue
-            MATCHMAKING_QUEUE.put(
-                {
-                    "user_id": user_id,
-                    "username": username,
-                    "session_id": session_id,
-                }
-            )
+            # Register the result slot before queueing so the matchmaker can
+            # always find it
+            holder = [None]
+            event = threading.Event()
+            MATCHMAKING_RESULTS[session_id] = (holder, event)
 
-            self.json_success(message="Searching for opponent...")
+            # Add to matchmaking queue
+            if MATCHMAKING_QUEUE.put(QueuedPlayer(user_id, username, session_id)):
+                print(f"Player {username} added to matchmaking queue")
+            else:
+                print(f"Skipping duplicate matchmaking entry for user_id={user_id}")
+
+            # Block until matched, cancelled or timed out
+            event.wait(timeout=search_timeout)
+            current = MATCHMAKING_RESULTS.get(session_id)
+            if current and current[0] is holder:
+                del MATCHMAKING_RESULTS[session_id]
+            if not holder[0]:
+                MATCHMAKING_QUEUE.remove(session_id)
+
+            if holder[0]:
+                self.json_success(
+                    data={"matched": True, "game_id": holder[0]},
+                    message="Match found",
+                )
+            else:
+                self.json_success(
+                    data={"matched": False},
+                    message="No opponent found. Please try again.",
+                )
 
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Search error: {e}", 500)
 
-    def handle_cancel_search(self) -> None:
+    @requires_auth
+    def handle_cancel_search(self, session_id, _username, _user_id) -> None:
         """Handle matchmaking cancellation request."""
         global MATCHMAKING_QUEUE
 
         try:
-            is_auth, session_id, _, _ = self.check_auth()
-
-            if not is_auth:
-                raise ProcessingError("Not authenticated", 401)
-
-            # Remove from queue (rebuild queue without this player)
-            temp_queue = queue.Queue()
-            removed = False
-
-            while not MATCHMAKING_QUEUE.empty():
-                try:
-                    player = MATCHMAKING_QUEUE.get_nowait()
-                    if player.get("session_id") != session_id:
-                        temp_queue.put(player)
-                    else:
-                        removed = True
-                except queue.Empty:
-                    break
-
-            # Restore queue
-            while not temp_queue.empty():
-                MATCHMAKING_QUEUE.put(temp_queue.get())
-
-            if removed:
+            # Wake the pending search request and release its result slot;
+            # the matchmaker drops players without a slot
+            result = MATCHMAKING_RESULTS.pop(session_id, None)
+            if result:
+                result[1].set()
+
+            removed = MATCHMAKING_QUEUE.remove(session_id)
+
+            if removed or result:
                 self.json_success(message="Search cancelled")
             else:
-                raise ProcessingError("Not currently searching", 404)
+                not_found("Not currently searching")
 
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except Exception as e:
             self.json_error(f"Cancel error: {e}", 500)
 
-    def handle_stats(self) -> None:
-        """Handle stats retrieval request."""
+    @requires_auth
+    def handle_game_history(self, session_id, _username, _user_id) -> None:
+        """
+        Handle move history request for the caller's active game.
+
+        Moves are broadcast one at a time, so this is only needed when a
+        client (re)joins mid-game. The body is encoded once per new move and
+        reused until the next one.
+        """
         try:
-            is_auth, _, _, user_id = self.check_auth()
-            if not (is_auth and user_id):
-                raise ProcessingError("Not authenticated", 401)
+            game_id = game_for_session(session_id)
+            game = ACTIVE_GAMES.get(game_id) if game_id else None
+            if game is None:
+                not_found("No active game")
+
+            moves = game["moves"]
+            cached = game["history_cache"]
+            if cached is None or cached[0] != len(moves):
+                snapshot = list(moves)
+                cached = (
+                    len(snapshot),
+                    fastjson.dumps({"success": True, "move_history": snapshot}),
+                )
+                game["history_cache"] = cached
 
+            self.json_bytes_response(cached[1])
+        except ProcessingError as e:
+            self.send_processing_error(e)
+        except Exception as e:
+            self.json_error(f"History error: {e}", 500)
+
+    @requires_auth
+    def handle_stats(self, _session_id, _username, user_id) -> None:
+        """Handle stats retrieval request."""
+        try:
             stats = get_user_stats_by_id(user_id)
             if stats:
                 self.json_success(data=stats)
             else:
-                raise ProcessingError("Stats not found", 404)
+                not_found("Stats not found")
         except ProcessingError as e:
-            self.json_error(e.message, e.code)
+            self.send_processing_error(e)
         except KeyError as e:
             self.json_error("Data read incorrectly from dictionary/ database", 500)
             raise KeyError("Data read incorrectly from dictionary") from e
@@ -578,76 +771,58 @@ class GameHandler(ThreadedHandlerWithSockets):
             # Get session from cookie
             session_id = self.get_cookie("session_id")
             if not session_id:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Not authenticated"})
-                )
+                self.send_prebuilt_frame(_ws_error_frame("Not authenticated"))
                 self._ws_close()
                 return
 
             # Validate session_id format
-            if not valid_input(session_id) or not is_valid_length(session_id, 1, 128):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid session"})
-                )
+            if not valid_session_id(session_id):
+                self.send_prebuilt_frame(_ws_error_frame("Invalid session"))
                 self._ws_close()
                 return
 
             # Validate session
             session = SESSION_MANAGER.get_session(session_id)
             if not session:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid session"})
-                )
+                self.send_prebuilt_frame(_ws_error_frame("Invalid session"))
                 self._ws_close()
                 return
 
-            username = session["username"]
             user_id = session["user_id"]
+            username = _username_for(user_id)
 
-            # Store user info for later use
+            # Store user info for later use; messages on this connection
+            # reuse it instead of re-reading the cookie and session
             self.user_id = user_id
             self.username = username
             self.session_id = session_id
+            self.session_checked_at = time.monotonic()
 
             # Find the game this player is in
-            player_game_id = None
-            for game_id, game_data in ACTIVE_GAMES.items():
-                if session_id in [
-                    game_data["player1"]["session_id"],
-                    game_data["player2"]["session_id"],
-                ]:
-                    player_game_id = game_id
-                    break
+            player_game_id = game_for_session(session_id)
+            game = ACTIVE_GAMES.get(player_game_id) if player_game_id else None
 
-            if not player_game_id:
-                self.send_message(
-                    json.dumps(
-                        {
-                            "type": "error",
-                            "message": "No active game found. Please start matchmaking.",
-                        }
-                    )
-                )
+            if not game:
+                self.send_prebuilt_frame(_ws_error_frame("No active game found. Please start matchmaking."))
                 self._ws_close()
                 return
 
-            # Store WebSocket connection and game_id
+            # Store WebSocket connection, game_id and this player's slot so
+            # message handlers never have to compare session ids again
             self.game_id = player_game_id
-            game = ACTIVE_GAMES[player_game_id]
-
-            # Register WebSocket to correct player
             if game["player1"]["session_id"] == session_id:
-                game["player1"]["websocket"] = self
-                your_color = game["player1"]["color"]
-                opponent_username = game["player2"]["username"]
+                self.player_slot, self.opponent_slot = "player1", "player2"
             else:
-                game["player2"]["websocket"] = self
-                your_color = game["player2"]["color"]
-                opponent_username = game["player1"]["username"]
+                self.player_slot, self.opponent_slot = "player2", "player1"
+
+            # Register WebSocket to correct player
+            game[self.player_slot]["websocket"] = self
+            your_color = game[self.player_slot]["color"]
+            opponent_username = game[self.opponent_slot]["username"]
 
             # Send game start message (matches client expectations)
             self.send_message(
-                json.dumps(
+                fastjson.dumps(
                     {
                         "type": "game_start",
                         "game_id": player_game_id,
@@ -663,12 +838,9 @@ class GameHandler(ThreadedHandlerWithSockets):
 
             print(f"WebSocket connected for {username} in game {player_game_id}")
 
-        except Exception as e:
-            print(f"WebSocket connection error: {e}")
-            traceback.print_exc()
-            self.send_message(
-                json.dumps({"type": "error", "message": "Connection error"})
-            )
+        except Exception:
+            log_exception("WebSocket connection error")
+            self.send_prebuilt_frame(_ws_error_frame("Connection error"))
             self._ws_close()
 
     def on_ws_message(self, message):
@@ -676,64 +848,48 @@ class GameHandler(ThreadedHandlerWithSockets):
         global ACTIVE_GAMES
 
         try:
-            # Validate message format and length
-            if not message or not isinstance(message, str):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid message format"})
-                )
-                return
-
-            # Limit message size to prevent DoS
-            if not is_valid_length(message, 1, 10000):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Message too large"})
-                )
-                return
-
-            # Validate UTF-8
-            if not valid_utf8(message):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid message encoding"})
-                )
-                return
+            # Keep-alive and handshake texts are known exactly; no parsing
+            msg_type = _WS_FAST_MESSAGES.get(message)
+            if msg_type is None:
+                # Validate message format and length
+                if not message or not isinstance(message, str):
+                    self.send_prebuilt_frame(_ws_error_frame("Invalid message format"))
+                    return
 
-            data = json.loads(message)
-            msg_type = data.get("type")
+                # Limit message size to prevent DoS
+                if not is_valid_length(message, 1, 10000):
+                    self.send_prebuilt_frame(_ws_error_frame("Message too large"))
+                    return
 
-            # Validate message type
-            if not msg_type or not isinstance(msg_type, str):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Missing message type"})
-                )
-                return
+                # Validate UTF-8
+                if not valid_utf8(message):
+                    self.send_prebuilt_frame(
+                        _ws_error_frame("Invalid message encoding")
+                    )
+                    return
 
-            # Get and validate session
-            session_id = self.get_cookie("session_id")
-            if not session_id:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Not authenticated"})
-                )
-                return
+                data = fastjson.loads(message)
+                msg_type = data.get("type")
 
-            if not valid_input(session_id):
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid session"})
-                )
-                return
+                # Validate message type
+                if not msg_type or not isinstance(msg_type, str):
+                    self.send_prebuilt_frame(_ws_error_frame("Missing message type"))
+                    return
 
-            session = SESSION_MANAGER.get_session(session_id)
-            if not session:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid session"})
-                )
-                return
+            # Identity was authenticated in on_ws_connected; only re-check
+            # the session (and refresh its activity) every few seconds
+            now = time.monotonic()
+            if now - self.session_checked_at >= _WS_SESSION_REFRESH:
+                if not SESSION_MANAGER.get_session(self.session_id):
+                    self.send_prebuilt_frame(_ws_error_frame("Invalid session"))
+                    return
+                SESSION_MANAGER.update_activity(self.session_id)
+                self.session_checked_at = now
 
-            username = session["username"]
+            username = self.username
 
             if not self.game_id or self.game_id not in ACTIVE_GAMES:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "No active game"})
-                )
+                self.send_prebuilt_frame(_ws_error_frame("No active game"))
                 return
 
             game = ACTIVE_GAMES[self.game_id]
@@ -741,84 +897,62 @@ class GameHandler(ThreadedHandlerWithSockets):
             # Handle different message types
             if msg_type == "handshake":
                 # Client handshake - acknowledge
-                self.send_message(
-                    json.dumps({"type": "handshake_ack", "message": "Server ready"})
-                )
+                self.send_prebuilt_frame(_HANDSHAKE_ACK_FRAME)
 
             elif msg_type == "move":
                 move_str = data.get("move")
 
                 # Validate move string
                 if not move_str or not isinstance(move_str, str):
-                    self.send_message(
-                        json.dumps({"type": "error", "message": "Invalid move format"})
-                    )
+                    self.send_prebuilt_frame(_ws_error_frame("Invalid move format"))
                     return
 
                 # Chess moves should be short (e.g., "e2e4", max ~10 chars)
                 if not is_valid_length(move_str, 1, 20):
-                    self.send_message(
-                        json.dumps({"type": "error", "message": "Invalid move format"})
-                    )
+                    self.send_prebuilt_frame(_ws_error_frame("Invalid move format"))
                     return
 
                 # Validate move contains only safe characters
                 if not valid_input(move_str):
-                    self.send_message(
-                        json.dumps({"type": "error", "message": "Invalid move format"})
-                    )
+                    self.send_prebuilt_frame(_ws_error_frame("Invalid move format"))
                     return
 
-                self.handle_ws_move(game, username, session_id, move_str)
+                self.handle_ws_move(game, move_str)
             elif msg_type == "resign":
-                self.handle_ws_resign(game, session_id)
+                self.handle_ws_resign(game)
             elif msg_type == "offer_draw":
-                self.handle_ws_draw_offer(game, username, session_id)
+                self.handle_ws_draw_offer(game, username)
             elif msg_type == "accept_draw":
                 self.handle_ws_draw_accept(game)
             elif msg_type == "decline_draw":
-                self.handle_ws_draw_decline(game, session_id)
+                self.handle_ws_draw_decline(game)
             elif msg_type == "cancel_draw_offer":
-                self.handle_ws_draw_cancel(game, session_id)
+                self.handle_ws_draw_cancel(game)
             elif msg_type == "pong":
                 # Keep-alive response
                 pass
             else:
                 print(f"Unknown message type: {msg_type}")
 
-        except json.JSONDecodeError:
-            self.send_message(
-                json.dumps({"type": "error", "message": "Invalid message format"})
-            )
-        except Exception as e:
-            print(f"WebSocket message error: {e}")
-            traceback.print_exc()
-            self.send_message(
-                json.dumps({"type": "error", "message": "Message processing error"})
-            )
+        except fastjson.JSONDecodeError:
+            self.send_prebuilt_frame(_ws_error_frame("Invalid message format"))
+        except Exception:
+            log_exception("WebSocket message error")
+            self.send_prebuilt_frame(_ws_error_frame("Message processing error"))
 
-    def handle_ws_move(self, game, _username, session_id, move):
+    def handle_ws_move(self, game, move):
         """Process a move from WebSocket."""
         if not ENGINE_POOL:
             raise MajorServerSideException("Engine pool not initiated")
         try:
             # Verify it's player's turn
-            player_color = (
-                game["player1"]["color"]
-                if game["player1"]["session_id"] == session_id
-                else game["player2"]["color"]
-            )
-
-            if game["current_turn"] != player_color:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Not your turn"})
-                )
+            current_turn = game["current_turn"]
+            if current_turn != game[self.player_slot]["color"]:
+                self.send_prebuilt_frame(_ws_error_frame("Not your turn"))
                 return
 
             if not move:
-                self.send_message(
-                    json.dumps({"type": "error", "message": "Invalid move format"})
-                )
+                self.send_prebuilt_frame(_ws_error_frame("Invalid move format"))
                 return
 
             # Send to chess engine
@@ -833,17 +967,18 @@ class GameHandler(ThreadedHandlerWithSockets):
                 raise InstanceInoperable("Could not read from engine pool")
 
             if response.get("message") == "valid":
-                # Extract legal moves from response
-                new_legal_moves = response.get("possible_moves", [])
+                # Extract new state from response
+                fen = response["fen"]
+                legal_moves = response.get("possible_moves", [])
+                next_turn = "black" if current_turn == "white" else "white"
+                moves = game["moves"]
 
                 # Update game state
-                game["fen"] = response["fen"]
-                game["moves"].append(move)
-                game["legal_moves"] = new_legal_moves
-                game["current_turn"] = (
-                    "black" if game["current_turn"] == "white" else "white"
-                )
-                game["last_move_at"] = time.time()
+                game["fen"] = fen
+                moves.append(move)
+                game["legal_moves"] = legal_moves
+                game["current_turn"] = next_turn
+                game["last_move_at"] = time.monotonic()
 
                 # Check for game end
                 winner = response.get("winner")
@@ -854,25 +989,30 @@ class GameHandler(ThreadedHandlerWithSockets):
                     )
                     return
 
-                # Broadcast to both players
-                state_message = json.dumps(
-                    {
-                        "type": "move_update",
-                        "fen": game["fen"],
-                        "next_turn": game["current_turn"],
-                        "legal_moves": game["legal_moves"],
-                        "last_move": move,
-                        "move_history": game["moves"],
-                    }
+                # Broadcast only the new move to both players, encoded and
+                # framed once; the full list is served by /game/history
+                state_frame = text_frame(
+                    fastjson.dumps(
+                        {
+                            "type": "move_update",
+                            "move_index": len(moves) - 1,
+                            "move": move,
+                            "fen": fen,
+                            "next_turn": next_turn,
+                            "legal_moves": legal_moves,
+                        }
+                    )
                 )
 
-                if game["player1"]["websocket"]:
-                    game["player1"]["websocket"].send_message(state_message)
-                if game["player2"]["websocket"]:
-                    game["player2"]["websocket"].send_message(state_message)
+                ws1 = game["player1"]["websocket"]
+                ws2 = game["player2"]["websocket"]
+                if ws1:
+                    ws1.send_prebuilt_frame(state_frame)
+                if ws2:
+                    ws2.send_prebuilt_frame(state_frame)
             else:
                 self.send_message(
-                    json.dumps(
+                    fastjson.dumps(
                         {
                             "type": "error",
                             "message": response.get("error", "Invalid move"),
@@ -880,38 +1020,27 @@ class GameHandler(ThreadedHandlerWithSockets):
                     )
                 )
 
-        except Exception as e:
-            print(f"Move handling error: {e}")
-            traceback.print_exc()
-            self.send_message(
-                json.dumps({"type": "error", "message": "Move processing error"})
-            )
+        except Exception:
+            log_exception("Move handling error")
+            self.send_prebuilt_frame(_ws_error_frame("Move processing error"))
 
-    def handle_ws_resign(self, game, session_id):
+    def handle_ws_resign(self, game):
         """Handle resignation."""
         try:
-            player_color = (
-                game["player1"]["color"]
-                if game["player1"]["session_id"] == session_id
-                else game["player2"]["color"]
-            )
+            player_color = game[self.player_slot]["color"]
             winner_color = "black" if player_color == "white" else "white"
             self.handle_game_end(game, "resignation", winner_color)
         except Exception as e:
             print(f"Resignation error: {e}")
 
-    def handle_ws_draw_offer(self, game, username, session_id):
+    def handle_ws_draw_offer(self, game, username):
         """Handle draw offer."""
         try:
             # Notify opponent of draw offer
-            opponent = (
-                game["player2"]
-                if game["player1"]["session_id"] == session_id
-                else game["player1"]
-            )
-            if opponent["websocket"]:
-                opponent["websocket"].send_message(
-                    json.dumps(
+            opponent_ws = game[self.opponent_slot]["websocket"]
+            if opponent_ws:
+                opponent_ws.send_message(
+                    fastjson.dumps(
                         {"type": "draw_offered", "message": f"{username} offers a draw"}
                     )
                 )
@@ -925,48 +1054,38 @@ class GameHandler(ThreadedHandlerWithSockets):
             self.handle_game_end(game, "draw", None)
 
             # Notify both players
-            msg = json.dumps({"type": "draw_accepted", "message": "Draw accepted"})
-
-            if game["player1"]["websocket"]:
-                game["player1"]["websocket"].send_message(msg)
-            if game["player2"]["websocket"]:
-                game["player2"]["websocket"].send_message(msg)
+            ws1 = game["player1"]["websocket"]
+            ws2 = game["player2"]["websocket"]
+            if ws1:
+                ws1.send_prebuilt_frame(_DRAW_ACCEPTED_FRAME)
+            if ws2:
+                ws2.send_prebuilt_frame(_DRAW_ACCEPTED_FRAME)
 
         except Exception as e:
             print(f"Draw accept error: {e}")
 
-    def handle_ws_draw_decline(self, game, session_id):
+    def handle_ws_draw_decline(self, game):
         """Handle draw decline."""
         try:
             # Notify the player who offered the draw
-            opponent = (
-                game["player2"]
-                if game["player1"]["session_id"] == session_id
-                else game["player1"]
-            )
-
-            if opponent["websocket"]:
-                opponent["websocket"].send_message(
-                    json.dumps(
+            opponent_ws = game[self.opponent_slot]["websocket"]
+            if opponent_ws:
+                opponent_ws.send_message(
+                    fastjson.dumps(
                         {"type": "draw_declined", "message": "Draw offer declined"}
                     )
                 )
         except Exception as e:
             print(f"Draw decline error: {e}")
 
-    def handle_ws_draw_cancel(self, game, session_id):
+    def handle_ws_draw_cancel(self, game):
         """Handle draw offer cancellation by the sender."""
         try:
             # Notify opponent that draw offer was cancelled
-            opponent = (
-                game["player2"]
-                if game["player1"]["session_id"] == session_id
-                else game["player1"]
-            )
-
-            if opponent["websocket"]:
-                opponent["websocket"].send_message(
-                    json.dumps(
+            opponent_ws = game[self.opponent_slot]["websocket"]
+            if opponent_ws:
+                opponent_ws.send_message(
+                    fastjson.dumps(
                         {"type": "draw_cancelled", "message": "Draw offer cancelled"}
                     )
                 )
@@ -982,23 +1101,21 @@ class GameHandler(ThreadedHandlerWithSockets):
             p2 = game["player2"]
 
             def send_game_over(result, elo_changes):
-                msg = json.dumps(
-                    {
-                        "type": "game_over",
-                        "winner": result,
-                        "reason": reason,
-                        "elo_changes": elo_changes,
-                    }
-                )
-                if p1["websocket"]:
-                    p1["websocket"].send_message(msg)
-                if p2["websocket"]:
-                    p2["websocket"].send_message(msg)
+                frame = _game_over_frame(result, reason, elo_changes)
+                ws1 = p1["websocket"]
+                ws2 = p2["websocket"]
+                if ws1:
+                    ws1.send_prebuilt_frame(frame)
+                if ws2:
+                    ws2.send_prebuilt_frame(frame)
 
             # --- Determine result ---
             if reason in ("checkmate", "resignation"):
-                winner = p1 if p1["color"] == winner_color else p2
-                loser = p2 if winner is p1 else p1
+                # Pick slots by color; the player dicts are never compared
+                if p1["color"] == winner_color:
+                    winner, loser = p1, p2
+                else:
+                    winner, loser = p2, p1
 
                 winner_score = 1.0
                 result = winner_color
@@ -1023,76 +1140,71 @@ class GameHandler(ThreadedHandlerWithSockets):
                     loser["color"]: -delta,
                 }
 
-                if not (
-                    update_player_elo(winner["user_id"], winner["elo"] + delta)
-                    and update_player_elo(loser["user_id"], loser["elo"] - delta)
+                if not finalize_game_result(
+                    winner["user_id"],
+                    loser["user_id"],
+                    winner["elo"] + delta,
+                    loser["elo"] - delta,
                 ):
                     raise DBException(
-                        f"Could not update elo! Winner: {winner['user_id']} - Loser: {loser['user_id']} - Change: {delta}"
+                        f"Could not record result! Winner: {winner['user_id']} - Loser: {loser['user_id']} - Change: {delta}"
                     )
-                if not record_game_win(winner["user_id"], loser["user_id"]):
-                    raise DBException("Could not update wins!")
 
             else:
-                p1_delta = elo_delta(
-                    p1["elo"], p2["elo"], winner_score if winner_score else 0.5
-                )
+                # Read each player field once
+                p1_elo = p1["elo"]
+                p2_elo = p2["elo"]
+                # winner_score is always 0.5 on this branch
+                p1_delta = elo_delta(p1_elo, p2_elo, winner_score)
 
                 elo_changes = {
                     p1["color"]: p1_delta,
                     p2["color"]: -p1_delta,
                 }
 
-                update_player_elo(p1["user_id"], p1["elo"] + p1_delta)
-                update_player_elo(p2["user_id"], p2["elo"] - p1_delta)
-                record_game_draw(p1["user_id"], p2["user_id"])
+                finalize_game_result(
+                    p1["user_id"],
+                    p2["user_id"],
+                    p1_elo + p1_delta,
+                    p2_elo - p1_delta,
+                    draw=True,
+                )
 
             # --- Notify clients ---
             send_game_over(result, elo_changes)
 
             # --- Cleanup ---
-            ACTIVE_GAMES.pop(self.game_id, None)
+            remove_game(self.game_id)
             print(f"Game {self.game_id} ended: {result} - {reason}")
 
-        except Exception as e:
-            print(f"Game end handling error: {e}")
-            traceback.print_exc()
+        except Exception:
+            log_exception("Game end handling error")
 
     def on_ws_closed(self):
         """Called when WebSocket connection closes."""
         global ACTIVE_GAMES
 
         try:
-            if (
-                hasattr(self, "game_id")
-                and self.game_id
-                and self.game_id in ACTIVE_GAMES
-            ):
-                game = ACTIVE_GAMES[self.game_id]
-
-                # Clear the websocket reference
-                if (
-                    game["player1"].get("websocket") == self
-                    or game["player2"].get("websocket") == self
-                ):
-                    if game["player1"].get("websocket") == self:
-                        game["player1"]["websocket"] = None
-                    if game["player2"].get("websocket") == self:
-                        game["player2"]["websocket"] = None
+            # game_id defaults to None, which is never a key
+            game = ACTIVE_GAMES.get(self.game_id)
+            if game is not None:
+                # Clear the websocket reference; this connection only ever
+                # registered in its own slot, unless a reconnect replaced it
+                player = game[self.player_slot]
+                if player.get("websocket") is self:
+                    player["websocket"] = None
 
                     print(
-                        f"WebSocket disconnected for game {self.game_id} (username: {getattr(self, 'username', 'Unknown')})"
+                        f"WebSocket disconnected for game {self.game_id} (username: {self.username or 'Unknown'})"
                     )
 
-        except Exception as e:
-            print(f"WebSocket close error: {e}")
-            traceback.print_exc()
+        except Exception:
+            log_exception("WebSocket close error")
 
-    def session_login(self, user_id: int, username: str) -> None:
+    def session_login(self, user_id: int) -> None:
         """Create session and set cookie."""
         session_id = SESSION_MANAGER.create_session(
             user_id=user_id,
-            username=username,
             ip=self.client_address[0],
         )
 
@@ -1104,25 +1216,94 @@ class GameHandler(ThreadedHandlerWithSockets):
         )
         self.end_headers()
 
-        response = json.dumps(
+        response = fastjson.dumps(
             {
                 "success": True,
                 "message": "Login successful",
                 "redirect": "/home",
             }
         )
-        self.wfile.write(response.encode("utf-8"))
+        self.wfile.write(response)
+
+    # POST path -> handler, looked up once per request in do_POST
+    _post_routes = {
+        "/login": handle_login,
+        "/register": handle_register,
+        "/session": handle_session,
+        "/home/search": handle_search,
+        "/home/cancel": handle_cancel_search,
+        "/stats": handle_stats,
+        "/game/history": handle_game_history,
+        "/profile/update-username": handle_change_username,
+        "/profile/update-password": handle_change_password,
+        "/profile/delete-account": handle_delete_account,
+        "/logout": handle_logout,
+    }
+
+
+# Pages and icons do not change while the server runs; keep them in memory
+GameHandler.preload_files(
+    (LOGIN_HTML, REGISTER_HTML, GAME_HTML, STATS_HTML, HOME_HTML, PROFILE_HTML)
+)
+GameHandler.preload_files(ICONS_DIRECTORY / name[1:] for name in ICON_FILES)
+GameHandler.preload_responses({name: ICONS_DIRECTORY / name[1:] for name in ICON_FILES})
+
+# Long-running loops (HTTP server, instance handler, ...) by name; set in main
+BACKGROUND_POOL: Optional[ThreadPoolExecutor] = None
+BACKGROUND_TASKS: Dict[str, Future] = {}
+
+# Seconds cleanup waits for the background loops to notice the shutdown
+BACKGROUND_STOP_TIMEOUT = 5.0
+
+
+def run_background(name: str, target, *args) -> None:
+    """
+    Run one background loop on a pool worker, under the loop's own name.
+
+    The executor names its workers generically; renaming the worker keeps
+    thread dumps and error messages pointing at the loop. An exception
+    that ends the loop is logged here, since a future would otherwise
+    hold it silently until someone asked for the result.
+
+    Args:
+        name: Thread name for the loop, e.g. "Matchmaking"
+        target: Loop function to run until shutdown
+        *args: Positional arguments for target
+    """
+    threading.current_thread().name = name
+    try:
+        target(*args)
+    except Exception:
+        log_exception(f"{name} stopped")
+
+
+def stop_background_tasks() -> None:
+    """Stop the pool and wait (bounded) for the loops to return."""
+    if not BACKGROUND_POOL:
+        return
+    # Matchmaking sleeps on its queue rather than on the shutdown event
+    MATCHMAKING_QUEUE.close()
+    BACKGROUND_POOL.shutdown(wait=False, cancel_futures=True)
+    _, running = wait(BACKGROUND_TASKS.values(), timeout=BACKGROUND_STOP_TIMEOUT)
+    if running:
+        names = [n for n, f in BACKGROUND_TASKS.items() if f in running]
+        log(f"Background tasks still running: {', '.join(names)}")
+    else:
+        log("✓ Background tasks stopped")
 
 
 def monitor_server() -> None:
     """
     Monitor server health and handle shutdown.
+
+    Shutdown messages here and in cleanup_resources go through the queued
+    logger, as SERVER_STATE's do, so they are written in the order logged.
     """
 
     def signal_handler(signum, _frame):
         """Handle interrupt signals gracefully."""
         signal_name = signal.Signals(signum).name
-        print(f"\n{signal_name} received")
+        log(f"\n{signal_name} received")
         SERVER_STATE.signal_shutdown(f"{signal_name} received")
 
     # Register signal handlers
@@ -1135,75 +1316,79 @@ def monitor_server() -> None:
 
         # Check for timeout from HTTP server
         if HTTPD and HTTPD.timeout:
-            print("Server inactivity timeout")
+            log("Server inactivity timeout")
 
         # Check for errors
         if SERVER_STATE.has_error():
-            print(f"Server error: {SERVER_STATE.get_error_message()}")
+            log(f"Server error: {SERVER_STATE.get_error_message()}")
 
     except Exception as e:
-        print(f"Monitor error: {e}")
+        log(f"Monitor error: {e}")
     finally:
-        print("Initiating shutdown sequence...")
+        log("Initiating shutdown sequence...")
         cleanup_resources()
 
 
 def cleanup_resources() -> None:
     """Clean up all server resources."""
-    print("Cleaning up resources...")
+    log("Cleaning up resources...")
 
     # Stop HTTP server
     if HTTPD:
         try:
-            HTTPD.stopping = True
+            # shutdown() sets the stopping flag itself and is a no-op
+            # once it is set, so setting it first would leave
+            # serve_forever running
             HTTPD.shutdown()
             HTTPD.server_close()
-            print("✓ HTTP server stopped")
+            log("✓ HTTP server stopped")
         except Exception as e:
-            print(f"Error stopping HTTP server: {e}")
+            log(f"Error stopping HTTP server: {e}")
+
+    # The loops use the database and engine pool closed below
+    stop_background_tasks()
 
     # Close database
-    if DB_CONNECTION:
-        try:
-            DB_CONNECTION.close()
-            print("✓ Database closed")
-        except Exception as e:
-            print(f"Error closing database: {e}")
+    try:
+        close_database()
+        log("✓ Database closed")
+    except Exception as e:
+        log(f"Error closing database: {e}")
 
     # Close session manager
     if SESSION_MANAGER:
         try:
             SESSION_MANAGER.close()
-            print("✓ Session manager closed")
+            log("✓ Session manager closed")
         except Exception as e:
-            print(f"Error closing session manager: {e}")
+            log(f"Error closing session manager: {e}")
 
     if ENGINE_POOL:
         try:
             ENGINE_POOL.shutdown()
-            print("✓ Engine pool closed")
+            log("✓ Engine pool closed")
         except Exception as e:
-            print(f"Error closing Engine pool: {e}")
+            log(f"Error closing Engine pool: {e}")
 
     # Log compression statistics
-    print("\n")
+    log("\n")
     if COMPRESSION_CACHE:
         try:
             stats = COMPRESSION_CACHE.get_stats()
-            print("\nCompression Statistics:")
-            print(f"  Cache hits:   {stats['hits']}")
-            print(f"  Cache misses: {stats['misses']}")
-            print(f"  Hit rate:     {stats['hit_rate']}")
-            print(f"  Compressions: {stats['compressions']}")
-            print(
+            log("\nCompression Statistics:")
+            log(f"  Cache hits:   {stats['hits']}")
+            log(f"  Cache misses: {stats['misses']}")
+            log(f"  Hit rate:     {stats['hit_rate']}")
+            log(f"  Compressions: {stats['compressions']}")
+            log(
                 f"  Cache size:   {stats['cache_size']}/{stats.get('max_cache_size', 'N/A')}"
             )
             COMPRESSION_CACHE.clear_cache()
         except Exception as e:
-            print("Error reading/ closing compression pool: {e}")
-    print("\n")
+            log(f"Error reading/ closing compression pool: {e}")
+    log("\n")
 
-    print("Cleanup complete")
+    log("Cleanup complete")
 
 
 def run_http_server(
@@ -1230,14 +1415,19 @@ def run_http_server(
             timeout_seconds=timeout_seconds,
             ssl_context=ssl_context,
         )
-        print("✓ HTTPS server listening on https://localhost:5000")
+        log("✓ HTTPS server listening on https://localhost:5000")
     else:
         HTTPD = TimeoutThreadingHTTPServer(
             server_address=server_address,
             handler_class=handler_class,
             timeout_seconds=timeout_seconds,
         )
-        print("✓ HTTP server listening on http://localhost:5000")
+        log("✓ HTTP server listening on http://localhost:5000")
+
+    # Pin the accept loop before it starts request threads; they inherit
+    # the mask, so all request handling stays on the HTTP cores
+    if HTTP_CORES:
+        os.sched_setaffinity(0, HTTP_CORES)
 
     try:
         HTTPD.serve_forever()
@@ -1252,85 +1442,122 @@ def run_http_server(
 
 if __name__ == "__main__":
 
-    print("=" * 60)
-    print("Chess Server Starting (SECURITY HARDENED)")
-    print("=" * 60)
+    # Startup lines go through the queued logger: the main thread only
+    # enqueues them, and they are held until the server is ready so the
+    # logger thread writes them with one write (an early exit still
+    # writes them from the logger's atexit hook)
+    hold_output()
+    log("=" * 60)
+    log("Chess Server Starting (SECURITY HARDENED)")
+    log("=" * 60)
 
     start_time = time.time()
 
+    # Request threads, WebSocket writers and the background loops only run
+    # in parallel on a free-threaded build (3.13t+ with the GIL off)
+    if getattr(sys, "_is_gil_enabled", lambda: True)():
+        log("✓ Interpreter: GIL enabled (threads interleave)")
+    else:
+        log("✓ Interpreter: free-threaded, GIL disabled")
+
+    if HTTP_CORES or ENGINE_CORES:
+        log(
+            f"✓ CPU affinity: HTTP {sorted(HTTP_CORES) or 'any'}, "
+            f"engines {sorted(ENGINE_CORES) or 'any'}"
+        )
+
     # Verify game executable exists
     if GAME_HANDLER:
-        print(f"✓ Game executable: {GAME_HANDLER}")
+        log(f"✓ Game executable: {GAME_HANDLER}")
     else:
-        print("ERROR: No game handler setup")
+        log("ERROR: No game handler setup")
         sys.exit(1)
 
     # Setup directory structure
     if SCRIPT_DIR:
-        print(f"✓ Working directory: {SCRIPT_DIR}")
+        log(f"✓ Working directory: {SCRIPT_DIR}")
     else:
-        print("ERROR: Directory setup failed -> Could not locate Script Directory")
+        log("ERROR: Directory setup failed -> Could not locate Script Directory")
         sys.exit(1)
 
     if FRONTEND_DIR:
-        print(f"✓ Frontend directory: {FRONTEND_DIR}")
+        log(f"✓ Frontend directory: {FRONTEND_DIR}")
     else:
-        print("ERROR: Directory setup failed -> No Frontend set")
+        log("ERROR: Directory setup failed -> No Frontend set")
         sys.exit(1)
 
     # Initialize game database
     if ACTIVE_DB:
-        print(f"✓ Game DB Info exists: {ACTIVE_DB}")
+        log(f"✓ Game DB Info exists: {ACTIVE_DB}")
     else:
-        print("ERROR: Game DB failed to instantiate")
+        log("ERROR: Game DB failed to instantiate")
         sys.exit(1)
 
     # Initialize session manager
     if SESSION_DB:
-        print(f"✓ Session manager initialized: {SESSION_DB}")
+        log(f"✓ Session manager initialized: {SESSION_DB}")
     else:
-        print("ERROR: Session manager failed to instantiate")
+        log("ERROR: Session manager failed to instantiate")
         sys.exit(1)
 
-    try:
-        ENGINE_POOL = EnginePool(
+    # Spawning the engines and opening the database are independent and
+    # both mostly wait (on the engine handshake, on file I/O), so run them
+    # side by side; startup then takes the slower of the two, not the sum.
+    # Both finish before anything that uses them starts: a request or
+    # matchmaking pass that ran first would find no DB_POOL and signal a
+    # fatal error, and the first games would wait on a cold engine
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="Startup") as startup:
+        engine_pool_future = startup.submit(
+            EnginePool,
             GAME_HANDLER,
             SERVER_STATE,
-            min_instances=1,
+            min_instances=ENGINE_PREWARM,
             max_instances=10,
             queue_size=100,
+            cpu_cores=ENGINE_CORES,
         )
-        print("✓ Engine pool initialized")
-    except Exception as e:
-        print(f"ERROR: Failed to initialize engine pool: {e}")
+        init_database(config["database"]["main"])
+
+        try:
+            ENGINE_POOL = engine_pool_future.result()
+        except Exception as e:
+            log(f"ERROR: Failed to initialize engine pool: {e}")
+            sys.exit(1)
+
+    # Matchmaking and the instance handler read the pool from constants
+    c.ENGINE_POOL = ENGINE_POOL
+    log(f"✓ Engine pool initialized: {len(ENGINE_POOL.instances)} warm")
+
+    if SERVER_STATE.has_error():
+        log(f"ERROR: {SERVER_STATE.get_error_message()}")
         sys.exit(1)
 
-    # Start background threads
-    print("\nStarting background threads...")
+    # Start background threads; one pool worker per loop, so every loop
+    # starts at once and shutdown can wait for them before cleanup
+    log("\nStarting background threads...")
     threads = [
-        (
-            "HTTP Server",
-            run_http_server,
-            True,
-            [],
-        ),
-        ("Instance Handler", instance_thread_handler, True, []),
-        ("Session Cleanup", cleanup_sessions_loop, True, []),
-        ("Matchmaking", matchmaking_loop, True, []),
-        ("Init Database", init_database, False, [config["database"]["main"]]),
+        ("HTTP Server", run_http_server, []),
+        ("Instance Handler", instance_thread_handler, []),
+        ("Session Cleanup", cleanup_sessions_loop, []),
+        ("Matchmaking", matchmaking_loop, []),
     ]
 
-    for name, target, daemon, args in threads:
-        thread = threading.Thread(target=target, daemon=daemon, name=name, args=args)
-        thread.start()
-        print(f"✓ Started: {name}")
+    BACKGROUND_POOL = ThreadPoolExecutor(
+        max_workers=len(threads), thread_name_prefix="Background"
+    )
+    for name, target, args in threads:
+        BACKGROUND_TASKS[name] = BACKGROUND_POOL.submit(
+            run_background, name, target, *args
+        )
+        log(f"✓ Started: {name}")
 
     startup_time = time.time() - start_time
-    print(f"\n{'=' * 60}")
-    print(f"Server ready in {startup_time:.2f} seconds")
-    print(f"{'=' * 60}\n")
+    log(f"\n{'=' * 60}")
+    log(f"Server ready in {startup_time:.2f} seconds")
+    log(f"{'=' * 60}\n")
+    release_output()
 
     # Monitor server (blocks until shutdown)
     monitor_server()
 
-    print("\nServer shutdown complete")
+    log("\nServer shutdown complete")
@@ -18,7 +18,7 @@ import threading
 import subprocess
 from dataclasses import dataclass
 import time
-from typing import Dict, Optional
+from typing import Dict, FrozenSet, Optional, Tuple
 import select
 import json
 import traceback
@@ -26,6 +26,10 @@ import sys
 import os
 
 from .exceptions import MajorServerSideException, InstanceInoperable
+from .logger import log
+
+# Weight of the newest sample in the pool's utilization moving average
+_UTILIZATION_ALPHA = 0.5
 
 # Set environment for Rust engine (limits thread pool size)
 env = os.environ.copy()
@@ -38,17 +42,23 @@ class EngineTask:
     """
     Represents a task to send to an engine instance.
 
+    The worker stores its reply in result and then sets done; the caller
+    waits on done. One Event per task is all the hand-off needs, where a
+    response Queue would build a lock and three Conditions per request.
+
     Attributes:
         game_id: Unique identifier for the game
         message: JSON-serializable message to send to engine
-        response_queue: Queue to receive the engine's response
+        done: Set once result holds the engine's reply
         created_at: Unix timestamp when task was created
+        result: ("success", response) or ("error", message)
     """
 
     game_id: str
     message: dict
-    response_queue: queue.Queue
+    done: threading.Event
     created_at: float
+    result: Optional[Tuple[str, object]] = None
 
 
 @dataclass
@@ -58,19 +68,22 @@ class EngineInstance:
 
     Attributes:
         process: Subprocess handle for the engine
-        task_queue: Queue of tasks waiting for this instance
+        task_queue: Unbounded queue of tasks waiting for this instance;
+            submit_task enforces the pool's queue_size
         thread: Worker thread processing this instance's tasks
         created_at: Unix timestamp when instance was spawned
         last_used: Unix timestamp of last task completion
         tasks_processed: Total number of tasks completed by this instance
+        busy_time: Total seconds spent processing tasks
     """
 
     process: subprocess.Popen
-    task_queue: queue.Queue
+    task_queue: queue.SimpleQueue
     thread: threading.Thread
     created_at: float
     last_used: float
     tasks_processed: int = 0
+    busy_time: float = 0.0
 
 
 class EnginePool:
@@ -79,13 +92,14 @@ class EnginePool:
 
     This class provides intelligent load balancing and automatic scaling:
     - Distributes tasks to the instance with the shortest queue
-    - Spawns new instances when all queues are >90% full for >5 seconds
+    - Spawns new instances when the engines are saturated and tasks wait
     - Kills idle instances after 10 seconds of all queues being empty
     - Maintains minimum of min_instances (default: 1) at all times
 
     Auto-scaling thresholds:
-        Scale UP: All instance queues >90% full for >5 seconds
-        Scale DOWN: All queues empty for >10 seconds (and count > min_instances)
+        Scale UP: Utilization >75% with tasks waiting
+        Scale DOWN: Utilization <10% and all queues empty for >10 seconds
+            (and count > min_instances)
 
     Attributes:
         game_handler (str): Command to execute engine subprocess
@@ -93,7 +107,10 @@ class EnginePool:
         min_instances (int): Minimum instances to keep alive
         max_instances (int): Maximum instances to spawn
         queue_size (int): Maximum tasks per instance queue
+        cpu_cores (FrozenSet[int]): Cores engine processes are pinned to
+            (empty for no pinning)
         instances (Dict[int, EngineInstance]): Active engine instances
+        utilization (float): Smoothed share of time the instances are busy
     """
 
     __slots__ = (
@@ -102,13 +119,17 @@ class EnginePool:
         "min_instances",
         "max_instances",
         "queue_size",
+        "cpu_cores",
         "instances",
         "instance_counter",
+        "_spawning",
         "lock",
-        "queue_full_since",
         "queue_empty_since",
-        "_scale_threshold_full",
-        "_scale_threshold_empty",
+        "utilization",
+        "_last_scale_check",
+        "_last_busy_time",
+        "_scale_up_utilization",
+        "_scale_down_utilization",
     )
 
     def __init__(
@@ -118,6 +139,7 @@ class EnginePool:
         min_instances=1,
         max_instances=10,
         queue_size=100,
+        cpu_cores: FrozenSet[int] = frozenset(),
     ):
         """
         Initialize the engine pool.
@@ -128,117 +150,171 @@ class EnginePool:
             min_instances: Minimum instances to keep alive (default: 1)
             max_instances: Maximum instances to spawn (default: 10)
             queue_size: Maximum tasks per instance queue (default: 100)
+            cpu_cores: Cores to pin engine processes to (default: none)
         """
         self.game_handler = game_handler
         self.server_state = server_state
         self.min_instances = min_instances
         self.max_instances = max_instances
         self.queue_size = queue_size
+        self.cpu_cores = cpu_cores
 
         self.instances: Dict[int, EngineInstance] = {}
         self.instance_counter = 0
+        # Spawns in progress; they count against max_instances
+        self._spawning = 0
         self.lock = threading.Lock()
 
-        # Pre-calculate scaling thresholds (90% full, 0% full)
-        self._scale_threshold_full = queue_size * 0.9
-        self._scale_threshold_empty = 0
+        # Utilization thresholds for scaling up and down
+        self._scale_up_utilization = 0.75
+        self._scale_down_utilization = 0.10
 
         # Metrics for auto-scaling decisions
-        self.queue_full_since: Optional[float] = None
         self.queue_empty_since: Optional[float] = None
+        self.utilization = 0.0
+        self._last_scale_check = time.monotonic()
+        self._last_busy_time = 0.0
 
         # Start minimum instances immediately
-        for _ in range(min_instances):
-            self._spawn_instance()
+        self.prewarm(min_instances)
 
     def _spawn_instance(self) -> Optional[int]:
         """
         Spawn a new engine instance and initialize it.
 
         This method:
-        1. Checks if we're under max_instances limit
+        1. Reserves a slot under the max_instances limit
         2. Spawns subprocess with game_handler command
         3. Sends initialization message to verify it works
-        4. Creates worker thread to process tasks
-        5. Adds instance to the pool
+        4. Adds instance to the pool
+        5. Creates worker thread to process tasks
+
+        Steps 2 and 3 run outside the pool lock, so task submission is not
+        held up by a slow engine start and several spawns can overlap.
 
         Returns:
             int: Instance ID if successful
             None: If spawn failed or at max_instances
         """
         with self.lock:
-            if len(self.instances) >= self.max_instances:
+            if len(self.instances) + self._spawning >= self.max_instances:
                 return None
+            self._spawning += 1
 
-            try:
-                # Spawn subprocess with pipes for communication
-                process = subprocess.Popen(
-                    self.game_handler.split(),
-                    stdin=subprocess.PIPE,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    env=env,  # Include RAYON_MAX_THREADS setting
-                    text=True,  # Use text mode for easier JSON handling
-                    bufsize=1,  # Line buffered
+        process = None
+        try:
+            # Spawn subprocess with pipes for communication
+            process = subprocess.Popen(
+                self.game_handler.split(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,  # Include RAYON_MAX_THREADS setting
+                text=True,  # Use text mode for easier JSON handling
+                bufsize=1,  # Line buffered
+            )
+
+            if not (process.stdin and process.stdout):
+                raise InstanceInoperable("Engine pipes not available")
+
+            # Keep engine compute off the cores reserved for HTTP threads
+            if self.cpu_cores:
+                os.sched_setaffinity(process.pid, self.cpu_cores)
+
+            # Initialize the engine with starting position
+            init_message = {
+                "reason": "ping",
+            }
+            process.stdin.write(json.dumps(init_message) + "\n")
+            process.stdin.flush()
+
+            # Read initialization response to verify engine is working
+            response_line = process.stdout.readline()
+            if not response_line:
+                raise MajorServerSideException("Engine failed to initialize")
+
+            response = json.loads(response_line)
+            if response.get("message") != "valid":
+                raise MajorServerSideException(
+                    f"Engine initialization failed: {response}"
                 )
 
-                if not (process.stdin and process.stdout):
-                    raise InstanceInoperable("Engine pipes not available")
-
-                # Initialize the engine with starting position
-                init_message = {
-                    "reason": "ping",
-                }
-                process.stdin.write(json.dumps(init_message) + "\n")
-                process.stdin.flush()
-
-                # Read initialization response to verify engine is working
-                response_line = process.stdout.readline()
-                if not response_line:
-                    raise MajorServerSideException("Engine failed to initialize")
-
-                response = json.loads(response_line)
-                if response.get("message") != "valid":
-                    raise MajorServerSideException(
-                        f"Engine initialization failed: {response}"
-                    )
+            # SimpleQueue puts and gets are a single C call each; the
+            # bound is checked in submit_task and no task_done/join is used
+            task_queue = queue.SimpleQueue()
+            now = time.time()
+
+            # Create instance object first
+            instance = EngineInstance(
+                process=process,
+                task_queue=task_queue,
+                thread=None,  # Set immediately after
+                created_at=now,
+                last_used=now,
+            )
 
+            with self.lock:
                 # Create instance metadata
                 instance_id = self.instance_counter
                 self.instance_counter += 1
+                self.instances[instance_id] = instance
+                self._spawning -= 1
+                total = len(self.instances)
+
+            # Create and start worker thread for this instance
+            thread = threading.Thread(
+                target=self._instance_worker,
+                args=(instance_id, instance),
+                daemon=True,
+                name=f"EngineWorker-{instance_id}",
+            )
+            instance.thread = thread
+            thread.start()
 
-                task_queue = queue.Queue(maxsize=self.queue_size)
-                now = time.time()
+            log(f"✓ Spawned engine instance {instance_id} (total: {total})")
+            return instance_id
 
-                # Create instance object first
-                instance = EngineInstance(
-                    process=process,
-                    task_queue=task_queue,
-                    thread=None,  # Set immediately after
-                    created_at=now,
-                    last_used=now,
-                )
+        except Exception as e:
+            # Through the logger, so a failure during startup is written in
+            # order with the held startup output
+            log(
+                f"Failed to spawn engine instance: {e}\n"
+                f"{traceback.format_exc().rstrip()}"
+            )
+            if process is not None:
+                process.kill()
+            with self.lock:
+                self._spawning -= 1
+            return None
 
-                # Create and start worker thread for this instance
-                thread = threading.Thread(
-                    target=self._instance_worker,
-                    args=(instance_id, instance),
-                    daemon=True,
-                    name=f"EngineWorker-{instance_id}",
-                )
-                instance.thread = thread
-                thread.start()
+    def prewarm(self, count: int) -> int:
+        """
+        Start instances until count are running, initializing them in parallel.
 
-                self.instances[instance_id] = instance
-                print(
-                    f"✓ Spawned engine instance {instance_id} (total: {len(self.instances)})"
-                )
-                return instance_id
+        Called before the server accepts connections, so the first games
+        do not wait for an engine to start. The engine handshakes overlap,
+        so warming several instances takes about as long as one.
 
-            except Exception as e:
-                print(f"Failed to spawn engine instance: {e}")
-                traceback.print_exc()
-                return None
+        Args:
+            count: Number of instances wanted (capped at max_instances)
+
+        Returns:
+            int: Number of instances running afterwards
+        """
+        with self.lock:
+            missing = min(count, self.max_instances) - len(self.instances)
+
+        spawners = [
+            threading.Thread(target=self._spawn_instance, name=f"EngineSpawn-{i}")
+            for i in range(missing)
+        ]
+        for spawner in spawners:
+            spawner.start()
+        for spawner in spawners:
+            spawner.join()
+
+        with self.lock:
+            return len(self.instances)
 
     def _instance_worker(self, instance_id: int, instance: EngineInstance):
         """
@@ -306,6 +382,7 @@ class EnginePool:
                 # Update instance metrics
                 instance.last_used = time.time()
                 instance.tasks_processed += 1
+                started = time.monotonic()
 
                 # Process the task
                 try:
@@ -342,24 +419,26 @@ class EnginePool:
                     response = json.loads(response_line)
 
                     # Send successful response back to caller
-                    task.response_queue.put(("success", response))
+                    task.result = ("success", response)
 
                 except Exception as e:
                     print(f"Engine {instance_id} error processing task: {e}")
-                    task.response_queue.put(("error", str(e)))
+                    task.result = ("error", str(e))
 
                 finally:
-                    # Always mark task as done
-                    instance.task_queue.task_done()
+                    # Always wake the caller
+                    instance.busy_time += time.monotonic() - started
+                    task.done.set()
 
             except InstanceInoperable:
                 # Instance is dead - exit worker loop
                 break
             except Exception as e:
                 print(f"Engine worker {instance_id} loop error: {e}")
-                time.sleep(0.1)  # Brief pause to avoid tight error loop
+                # Brief pause to avoid tight error loop
+                self.server_state.wait_for_shutdown(timeout=0.1)
 
-        print(f"Engine worker {instance_id} shutting down")
+        log(f"Engine worker {instance_id} shutting down")
         self._close_instance(instance_id)
 
     def _close_instance(self, instance_id: int):
@@ -403,7 +482,7 @@ class EnginePool:
             except:
                 pass
 
-        print(f"✓ Closed engine instance {instance_id}")
+        log(f"✓ Closed engine instance {instance_id}")
 
     def submit_task(
         self, game_id: str, message: dict, timeout: float = 5.0
@@ -420,11 +499,10 @@ class EnginePool:
             dict: Engine response if successful
             None: If submission failed, queue full, or timeout
         """
-        response_queue = queue.Queue()
         task = EngineTask(
             game_id=game_id,
             message=message,
-            response_queue=response_queue,
+            done=threading.Event(),
             created_at=time.time(),
         )
 
@@ -440,22 +518,22 @@ class EnginePool:
 
         # Submit task outside lock to avoid blocking
         try:
-            best_instance.task_queue.put(task, timeout=0.5)
+            if best_instance.task_queue.qsize() >= self.queue_size:
+                print("Engine queue full!")
+                return None
+            best_instance.task_queue.put(task)
 
             # Wait for response
-            status, result = response_queue.get(timeout=timeout)
+            if not task.done.wait(timeout):
+                print(f"Engine task timed out after {timeout}s")
+                return None
 
+            status, result = task.result
             if status == "success":
                 return result
             print(f"Engine task failed: {result}")
             return None
 
-        except queue.Full:
-            print("Engine queue full!")
-            return None
-        except queue.Empty:
-            print(f"Engine task timed out after {timeout}s")
-            return None
         except Exception as e:
             print(f"Error submitting task: {e}")
             return None
@@ -464,58 +542,90 @@ class EnginePool:
         """
         Check if we need to spawn or kill instances based on load.
 
+        Load is the instances' utilization: busy seconds per instance-second
+        since the previous call, smoothed with an exponential moving average.
+        The engines block on their pipes while they work, so a saturated
+        pool shows up here long before its queues fill.
+
         Scaling logic:
-        - Scale UP: If all queues are >90% full for >5 seconds
-        - Scale DOWN: If all queues are empty for >10 seconds (and count > min)
+        - Scale UP: If utilization is >75% and tasks are waiting
+        - Scale DOWN: If utilization is <10% and all queues are empty for
+          >10 seconds (and count > min)
 
         This method should be called periodically (e.g., every 5 seconds)
-        from a monitoring thread.
+        from a monitoring thread. The decision is made under the lock and
+        acted on after it is released, since spawning and closing take it.
         """
+        spawn = False
+        close_id = None
+
         with self.lock:
             if not self.instances:
                 # No instances at all - spawn at least one
-                self._spawn_instance()
-                return
-
-            # Calculate aggregate queue metrics in single pass
-            total_queue_size = 0
-            queue_count = len(self.instances)
-
-            for inst in self.instances.values():
-                total_queue_size += inst.task_queue.qsize()
-
-            avg_queue_size = total_queue_size / queue_count if queue_count else 0
-            all_full = total_queue_size >= (queue_count * self._scale_threshold_full)
-            all_empty = total_queue_size == 0
-
-            now = time.time()
-
-            # Scale UP logic
-            if all_full:
-                if self.queue_full_since is None:
-                    self.queue_full_since = now
-                elif now - self.queue_full_since > 5.0:
-                    if len(self.instances) < self.max_instances:
-                        print(f"Scaling up: avg queue size {avg_queue_size:.1f}")
-                        self._spawn_instance()
-                    self.queue_full_since = None
+                spawn = True
             else:
-                self.queue_full_since = None
-
-            # Scale DOWN logic
-            if all_empty and len(self.instances) > self.min_instances:
-                if self.queue_empty_since is None:
-                    self.queue_empty_since = now
-                elif now - self.queue_empty_since > 10.0:
-                    # Kill oldest (least recently used) instance
-                    oldest_id = min(
-                        self.instances.keys(), key=lambda k: self.instances[k].last_used
+                # Calculate aggregate metrics in single pass
+                total_queue_size = 0
+                busy_time = 0.0
+                queue_count = len(self.instances)
+
+                for inst in self.instances.values():
+                    total_queue_size += inst.task_queue.qsize()
+                    busy_time += inst.busy_time
+
+                now = time.monotonic()
+                elapsed = now - self._last_scale_check
+                if elapsed > 0:
+                    sample = (busy_time - self._last_busy_time) / (
+                        elapsed * queue_count
                     )
-                    print(f"Scaling down: killing idle instance {oldest_id}")
-                    self._close_instance(oldest_id)
+                    sample = min(1.0, max(0.0, sample))
+                    self.utilization += _UTILIZATION_ALPHA * (
+                        sample - self.utilization
+                    )
+                self._last_scale_check = now
+                self._last_busy_time = busy_time
+
+                # Scale UP logic
+                if (
+                    self.utilization > self._scale_up_utilization
+                    and total_queue_size > 0
+                    and queue_count < self.max_instances
+                ):
+                    print(
+                        f"Scaling up: utilization {self.utilization:.0%}, "
+                        f"{total_queue_size} queued"
+                    )
+                    spawn = True
+
+                # Scale DOWN logic
+                if (
+                    total_queue_size == 0
+                    and self.utilization < self._scale_down_utilization
+                    and queue_count > self.min_instances
+                ):
+                    if self.queue_empty_since is None:
+                        self.queue_empty_since = now
+                    elif now - self.queue_empty_since > 10.0:
+                        # Kill oldest (least recently used) instance
+                        close_id = min(
+                            self.instances.keys(),
+                            key=lambda k: self.instances[k].last_used,
+                        )
+                        print(f"Scaling down: killing idle instance {close_id}")
+                        self.queue_empty_since = None
+                else:
                     self.queue_empty_since = None
-            else:
-                self.queue_empty_since = None
+
+        if spawn:
+            self._spawn_instance()
+        if close_id is not None:
+            self._close_instance(close_id)
+            # The closed instance's busy time leaves the total
+            with self.lock:
+                self._last_busy_time = sum(
+                    inst.busy_time for inst in self.instances.values()
+                )
 
     def get_stats(self) -> dict:
         """
@@ -527,6 +637,7 @@ class EnginePool:
         with self.lock:
             return {
                 "instance_count": len(self.instances),
+                "utilization": self.utilization,
                 "instances": {
                     inst_id: {
                         "queue_size": inst.task_queue.qsize(),
@@ -0,0 +1,189 @@
+"""
+Matchmaking queue with constant-time join, cancel and pairing.
+
+Waiting players are kept in an OrderedDict keyed by session_id, which is a
+hash map over a doubly linked list: a player can join, leave from anywhere
+in the queue, or be taken from the front without scanning. A Condition
+wakes the matchmaker as soon as two players are waiting, or when the queue
+is closed at shutdown, so it never polls.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class QueuedPlayer:
+    """
+    A player waiting for an opponent.
+
+    Attributes:
+        user_id (int): User's database ID
+        username (str): Display name at the time of the search
+        session_id (str): Session that started the search
+        joined_at (float): time.monotonic() when the player joined the queue
+    """
+
+    __slots__ = ("user_id", "username", "session_id", "joined_at")
+
+    def __init__(self, user_id: int, username: str, session_id: str):
+        self.user_id = user_id
+        self.username = username
+        self.session_id = session_id
+        self.joined_at = time.monotonic()
+
+
+class MatchmakingQueue:
+    """
+    FIFO of waiting players, indexed by session_id and user_id.
+
+    Thread Safety:
+        All methods hold the queue's Condition, so request threads can join
+        and cancel while the matchmaker waits for a pair.
+
+    Example:
+        >>> mm = MatchmakingQueue()
+        >>> mm.put(QueuedPlayer(1, "alice", "ab12..."))
+        True
+        >>> mm.remove("ab12...")
+        True
+        >>> pair = mm.wait_for_pair(timeout=1.0)  # None on timeout
+    """
+
+    __slots__ = ("_players", "_user_ids", "_cond", "_closed")
+
+    def __init__(self):
+        self._players: "OrderedDict[str, QueuedPlayer]" = OrderedDict()
+        # user_id -> session_id, so one user is never queued twice
+        self._user_ids: Dict[int, str] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def put(self, player: QueuedPlayer) -> bool:
+        """
+        Add a player to the back of the queue.
+
+        Args:
+            player: Player to queue
+
+        Returns:
+            bool: False if the same user is already waiting
+        """
+        with self._cond:
+            if player.user_id in self._user_ids:
+                return False
+            self._players[player.session_id] = player
+            self._user_ids[player.user_id] = player.session_id
+            if len(self._players) >= 2:
+                self._cond.notify()
+        return True
+
+    def push_front(self, player: QueuedPlayer) -> None:
+        """
+        Put a player back at the front, e.g. after a failed game creation.
+
+        Args:
+            player: Player previously taken from this queue
+        """
+        with self._cond:
+            if player.user_id in self._user_ids:
+                return
+            self._players[player.session_id] = player
+            self._players.move_to_end(player.session_id, last=False)
+            self._user_ids[player.user_id] = player.session_id
+            if len(self._players) >= 2:
+                self._cond.notify()
+
+    def remove(self, session_id: str) -> bool:
+        """
+        Remove a waiting player wherever they are in the queue.
+
+        Args:
+            session_id: Session that started the search
+
+        Returns:
+            bool: True if the player was waiting
+        """
+        with self._cond:
+            player = self._players.pop(session_id, None)
+            if player is None:
+                return False
+            self._user_ids.pop(player.user_id, None)
+        return True
+
+    def wait_for_pair(
+        self, timeout: float
+    ) -> Optional[Tuple[QueuedPlayer, QueuedPlayer]]:
+        """
+        Block until two players are waiting and take the two oldest.
+
+        Args:
+            timeout: Seconds to wait before giving up, or None to wait
+                until a pair arrives or the queue is closed
+
+        Returns:
+            Optional[tuple]: (first, second), or None if the wait timed out
+            or the queue was closed
+        """
+        players = self._players
+        with self._cond:
+            self._cond.wait_for(lambda: len(players) >= 2 or self._closed, timeout)
+            if self._closed or len(players) < 2:
+                return None
+            first = players.popitem(last=False)[1]
+            second = players.popitem(last=False)[1]
+            self._user_ids.pop(first.user_id, None)
+            self._user_ids.pop(second.user_id, None)
+        return first, second
+
+    def close(self) -> None:
+        """Wake every wait_for_pair() caller; later waits return at once."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def oldest_joined_at(self) -> Optional[float]:
+        """
+        Get when the longest-waiting player joined.
+
+        Returns:
+            Optional[float]: time.monotonic() of the front player's join,
+            or None if the queue is empty
+        """
+        with self._cond:
+            for player in self._players.values():
+                return player.joined_at
+        return None
+
+    def remove_older_than(self, cutoff: float) -> List[QueuedPlayer]:
+        """
+        Remove players who joined before cutoff, oldest first.
+
+        Players are queued in the order they joined and push_front only
+        returns the oldest players to the front, so the stale players are
+        always a prefix of the queue: this stops at the first recent one
+        and costs O(removed) rather than a scan of everyone waiting.
+
+        Args:
+            cutoff: time.monotonic() value; earlier joiners are removed
+
+        Returns:
+            List[QueuedPlayer]: Removed players, oldest first
+        """
+        removed: List[QueuedPlayer] = []
+        players = self._players
+        with self._cond:
+            while players:
+                session_id, player = next(iter(players.items()))
+                if player.joined_at >= cutoff:
+                    break
+                del players[session_id]
+                self._user_ids.pop(player.user_id, None)
+                removed.append(player)
+        return removed
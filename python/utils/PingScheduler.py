@@ -0,0 +1,105 @@
+"""
+Shared keep-alive scheduler for WebSocket connections.
+
+One daemon thread sends every connection's periodic ping. Connections are
+kept in a min-heap ordered by their next ping time, so the thread sleeps
+until the earliest deadline instead of each connection sleeping in a
+thread of its own. Entries hold weak references and are dropped once the
+connection closes or is garbage collected.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import heapq
+import itertools
+import threading
+import time
+import weakref
+from typing import Any, List, Optional, Tuple
+
+from utils.logger import log
+
+
+class PingScheduler:
+    """
+    Calls send_ping() on each registered connection every interval seconds.
+
+    A registered target must expose a truthy `connected` attribute while it
+    is open and a `send_ping()` method that does not block (e.g. one that
+    queues a frame for the connection's writer thread).
+
+    Thread Safety:
+        register() may be called from any thread. Pings are sent from the
+        scheduler thread outside its lock.
+
+    Example:
+        >>> scheduler = PingScheduler(interval=30.0)
+        >>> scheduler.register(handler)  # pinged every 30 s while connected
+    """
+
+    __slots__ = ("interval", "_heap", "_cond", "_seq", "_thread")
+
+    def __init__(self, interval: float):
+        """
+        Args:
+            interval: Seconds between pings to one connection
+        """
+        self.interval = interval
+        # (next ping time, tie-breaker, weak reference to the connection)
+        self._heap: List[Tuple[float, int, weakref.ref]] = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def register(self, target: Any) -> None:
+        """
+        Start pinging target one interval from now.
+
+        Args:
+            target: Open connection with `connected` and `send_ping()`
+        """
+        due = time.monotonic() + self.interval
+        entry = (due, next(self._seq), weakref.ref(target))
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="WebSocket Ping"
+                )
+                self._thread.start()
+            elif self._heap[0] is entry:
+                # New earliest deadline; re-arm the scheduler's wait
+                self._cond.notify()
+
+    def _run(self) -> None:
+        """Scheduler thread: ping whatever is due, then sleep until the next."""
+        heap = self._heap
+        cond = self._cond
+        while True:
+            with cond:
+                while not heap:
+                    cond.wait()
+                deadline = heap[0][0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    cond.wait(delay)
+                    continue
+                ref = heapq.heappop(heap)[2]
+
+            target = ref()
+            if target is None or not target.connected:
+                continue
+            try:
+                target.send_ping()
+            except Exception as e:
+                log(f"Ping error: {e}")
+                continue
+
+            # Keep the cadence from the deadline, not from when it was
+            # served, without bursting to catch up after a stall
+            due = max(deadline + self.interval, time.monotonic())
+            with cond:
+                heapq.heappush(heap, (due, next(self._seq), ref))
@@ -29,6 +29,9 @@ PATH_TRAVERSAL_PATTERN = re.compile(
     r"(\.\./)|(\.\.\\/)|(%2e%2e%2f)|(%2e%2e/)", re.IGNORECASE
 )
 
+# Session id Pattern: 32 lowercase hex characters (16 random bytes)
+SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
 
 def valid_utf8(string: str) -> bool:
     """
@@ -88,6 +91,24 @@ def valid_input(string: str) -> bool:
     return True
 
 
+def valid_session_id(session_id: str) -> bool:
+    """
+    Validate a session id taken from a cookie.
+
+    Session ids are generated server side as hex strings, so anything else
+    is rejected with one regex match instead of the full valid_input scan.
+
+    Args:
+        session_id: The session id to validate
+
+    Returns:
+        True if session_id has the expected format, False otherwise
+    """
+    if not isinstance(session_id, str):
+        return False
+    return SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
 def valid_username(username: str, min_length: int = 3, max_length: int = 32) -> bool:
     """
     Validate a username according to security best practices.
@@ -14,6 +14,8 @@ Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 from typing import Optional
 import threading
 
+from utils.logger import log
+
 
 class ServerState:
     """
@@ -76,9 +78,9 @@ class ServerState:
             reason: Human-readable reason for shutdown (logged to console)
 
         """
-        with self._lock:
-            print(f"Shutdown signal: {reason}")
-            self._shutdown_event.set()
+        # Event.set() is already thread-safe; no lock needed
+        self._shutdown_event.set()
+        log(f"Shutdown signal: {reason}")
 
     def signal_error(self, error_message: str):
         """
@@ -92,9 +94,9 @@ class ServerState:
         """
         with self._lock:
             self._error_message = error_message
-            self._error_event.set()
-            self._shutdown_event.set()  # Error implies shutdown
-            print(f"ERROR: {error_message}")
+        self._error_event.set()
+        self._shutdown_event.set()  # Error implies shutdown
+        log(f"ERROR: {error_message}")
 
     def should_shutdown(self) -> bool:
         """
@@ -139,7 +141,11 @@ class ServerState:
 
         This is an efficient blocking operation that uses minimal CPU while
         waiting. It's the recommended way to keep the main thread alive while
-        worker threads handle requests.
+        worker threads handle requests, and worker loops should use it in
+        place of time.sleep() so they wake as soon as shutdown is signaled:
+
+            while not state.wait_for_shutdown(timeout=5):
+                do_periodic_work()
 
         Args:
             timeout: Maximum time to wait in seconds (None = wait forever)
@@ -4,18 +4,84 @@ Efficient Session Manager using SQLite with LRU caching.
 This module provides a memory-efficient session management system that uses
 SQLite for persistent storage and LRU caching for fast lookups of active
 sessions. It uses user_id as the primary identifier instead of username,
-making it robust against username changes.
+making it robust against username changes. Usernames are not stored at all;
+callers resolve them from the users table when needed.
+
+Activity updates are buffered in memory and written behind by a background
+thread, so the request path never waits on a database commit.
 
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
+import os
+import queue
 import sqlite3
 import secrets
+import threading
 import time
-from functools import lru_cache
-from typing import Optional, Dict
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, Set
 from pathlib import Path
 
+from utils.logger import log
+
+
+# SQL statements are module-level constants so every call passes the same
+# string object and sqlite3's prepared-statement cache always hits.
+_SQL_INSERT = "INSERT INTO sessions VALUES (?, ?, ?, ?, ?)"
+_SQL_GET = "SELECT user_id, ip, last_active FROM sessions WHERE session_id = ?"
+_SQL_TOUCH = "UPDATE sessions SET last_active = ? WHERE session_id = ?"
+_SQL_DELETE = "DELETE FROM sessions WHERE session_id = ? RETURNING user_id"
+_SQL_DELETE_EXPIRED = (
+    "DELETE FROM sessions WHERE last_active < ? RETURNING session_id, user_id"
+)
+_SQL_COUNT = "SELECT COUNT(*) FROM sessions"
+_SQL_ACTIVE_SESSIONS = (
+    "SELECT user_id, session_id FROM sessions WHERE last_active >= ?"
+)
+_SQL_DELETE_USER = "DELETE FROM sessions WHERE user_id = ?"
+
+# Current Unix second, refreshed by the clock thread so session methods read
+# a list slot instead of making a time() call each
+_NOW_EPOCH = [int(time.time())]
+_CLOCK_INTERVAL = 0.1
+
+
+def _run_clock(stop: threading.Event) -> None:
+    """
+    Keep _NOW_EPOCH current until stop is set.
+
+    Args:
+        stop: Event that ends the loop
+    """
+    while not stop.wait(_CLOCK_INTERVAL):
+        _NOW_EPOCH[0] = int(time.time())
+
+
+# Stored in PRAGMA user_version; bump when adding a step to _migrate()
+_SCHEMA_VERSION = 2
+
+# Session ids are stored as 16 raw bytes and exposed as 32-char hex strings
+SESSION_ID_BYTES = 16
+
+
+def _session_key(session_id: str) -> Optional[bytes]:
+    """
+    Convert a hex session id from the API boundary into its BLOB key.
+
+    Args:
+        session_id: Hex-encoded session identifier
+
+    Returns:
+        Optional[bytes]: Raw key, or None if session_id is malformed
+    """
+    try:
+        key = bytes.fromhex(session_id)
+    except (ValueError, TypeError):
+        return None
+    return key if len(key) == SESSION_ID_BYTES else None
+
 
 class SessionManager:
     """
@@ -27,20 +93,27 @@ class SessionManager:
 
     Architecture:
         - SQLite database: Persistent storage for all sessions
-        - LRU cache: Fast in-memory lookups for active sessions
+        - LRU cache: Fast in-memory lookups for active sessions, filled on
+          create and updated in place on writes so one session's activity
+          never evicts another's
+        - User index: in-memory user_id -> session_ids map, so per-user
+          lookups never touch SQLite
+        - Write-behind buffer: last_active updates are batched and flushed
+          in a single transaction every flush_interval seconds
         - Automatic expiration: Sessions timeout after configured period
 
     Thread Safety:
-        SQLite connection uses check_same_thread=False, making it safe for
-        multi-threaded access. Cache operations are inherently thread-safe.
+        Reads borrow one of pool_size read-only connections, so concurrent
+        lookups run in parallel under WAL. All writes go through the single
+        writer connection, serialized by a lock. The activity buffer has its
+        own lock so request threads never contend with the flusher's commit.
 
     Attributes:
         db_path (Path): Path to the SQLite database file
         session_timeout (int): Session timeout in seconds
         max_cache_size (int): Maximum sessions to cache in memory
-        connection (sqlite3.Connection): Database connection
-        get_session: Cached method for retrieving session data
-        get_user_sessions: Cached method for retrieving user's sessions
+        connection (sqlite3.Connection): Writer database connection
+        get_session: LRU-cached lookup of session data
 
     Example:
         >>> manager = SessionManager(
@@ -48,10 +121,10 @@ class SessionManager:
         ...     session_timeout=600,
         ...     max_cache_size=1000
         ... )
-        >>> session_id = manager.create_session(user_id=1, username="alice", ip="127.0.0.1")
+        >>> session_id = manager.create_session(user_id=1, ip="127.0.0.1")
         >>> session = manager.get_session(session_id)
-        >>> print(session['username'])
-        'alice'
+        >>> print(session['user_id'])
+        1
     """
 
     __slots__ = (
@@ -59,9 +132,19 @@ class SessionManager:
         "session_timeout",
         "max_cache_size",
         "connection",
-        "get_session",
-        "get_user_sessions",
-        "_cursor",
+        "_cache",
+        "_user_index",
+        "_session_count",
+        "_cache_lock",
+        "_db_lock",
+        "_read_pool",
+        "_pending_activity",
+        "_pending_lock",
+        "_last_written",
+        "_flush_interval",
+        "_flush_stop",
+        "_flush_thread",
+        "_clock_thread",
     )
 
     def __init__(
@@ -69,7 +152,8 @@ class SessionManager:
         db_path: Path,
         session_timeout: int = 600,
         max_cache_size: int = 1000,
-        max_user_session_cache: int = 250,
+        flush_interval: float = 0.25,
+        pool_size: Optional[int] = None,
     ):
         """
         Initialize session manager with database and caching configuration.
@@ -78,109 +162,307 @@ class SessionManager:
             db_path: Path to SQLite database file (created if doesn't exist)
             session_timeout: Session expiration time in seconds (default: 10 minutes)
             max_cache_size: Maximum sessions to cache in memory (default: 1000)
-            max_user_session_cache: Maximum user session queries to cache (default: 250)
+            flush_interval: Seconds between activity flushes (default: 250 ms)
+            pool_size: Number of read-only connections (default: CPU count, min 2)
 
         """
         self.db_path = db_path
         self.session_timeout = session_timeout
         self.max_cache_size = max_cache_size
 
-        # Allow SQLite connection to be used across threads
-        self.connection = sqlite3.connect(db_path, check_same_thread=False)
-        self._cursor = self.connection.cursor()
-
-        # Create cached methods with configured sizes
-        # These are instance methods wrapped with lru_cache for optimal performance
-        self.get_session = lru_cache(maxsize=max_cache_size)(self._get_session_impl)
-        self.get_user_sessions = lru_cache(maxsize=max_user_session_cache)(
-            self._get_user_sessions_impl
+        # Allow SQLite connection to be used across threads. Autocommit mode
+        # means single statements need no explicit commit; the activity
+        # flusher opens its own transaction.
+        self.connection = sqlite3.connect(
+            db_path,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,
         )
+        self._db_lock = threading.RLock()
+
+        # Write-behind buffer for last_active updates: {session_id: timestamp}
+        self._pending_activity: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        # Last second queued per session; repeats within a second are no-ops
+        self._last_written: Dict[str, int] = {}
+        self._flush_interval = flush_interval
+        self._flush_stop = threading.Event()
+
+        # Session LRU: {session_id: session dict}, most recently used last.
+        # Entries are patched in place rather than invalidated on writes.
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Secondary index {user_id: {session_id, ...}}, guarded by _cache_lock
+        self._user_index: Dict[int, Set[str]] = {}
+
+        # Number of stored sessions, maintained on every insert and delete
+        self._session_count = 0
 
         self._create_table()
+        self._load_user_index()
+
+        # Read-only connections are opened after the schema exists since
+        # mode=ro cannot create the database file
+        if pool_size is None:
+            pool_size = max(2, os.cpu_count() or 2)
+        read_uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self._read_pool: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            reader = sqlite3.connect(
+                read_uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=256,
+                isolation_level=None,
+            )
+            reader.execute("PRAGMA query_only=1")
+            self._read_pool.put(reader)
+
+        self._flush_thread = threading.Thread(
+            target=self._flush_loop, name="Session Flush", daemon=True
+        )
+        self._flush_thread.start()
+
+        _NOW_EPOCH[0] = int(time.time())
+        self._clock_thread = threading.Thread(
+            target=_run_clock,
+            args=(self._flush_stop,),
+            name="Session Clock",
+            daemon=True,
+        )
+        self._clock_thread.start()
 
     def _create_table(self):
         """
         Create sessions table and indices if they don't exist.
 
         Schema:
-            session_id (TEXT PRIMARY KEY): Unique session identifier
+            session_id (BLOB PRIMARY KEY): 16-byte session identifier
             user_id (INTEGER NOT NULL): Immutable user database ID
-            username (TEXT NOT NULL): Mutable username (for display)
             ip (TEXT NOT NULL): User's IP address
             created_at (INTEGER NOT NULL): Unix timestamp of creation
             last_active (INTEGER NOT NULL): Unix timestamp of last activity
 
         """
+        # WAL lets readers proceed during the flusher's commit, and NORMAL
+        # sync only fsyncs at checkpoints instead of on every transaction
+        self.connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+        """)
+
+        self._migrate()
+
         # Use executescript for atomic schema creation
-        self._cursor.executescript("""
+        self.connection.executescript("""
             CREATE TABLE IF NOT EXISTS sessions (
-                session_id TEXT PRIMARY KEY,
+                session_id BLOB PRIMARY KEY,
                 user_id INTEGER NOT NULL,
-                username TEXT NOT NULL,
                 ip TEXT NOT NULL,
                 created_at INTEGER NOT NULL,
                 last_active INTEGER NOT NULL
             );
             
             CREATE INDEX IF NOT EXISTS idx_last_active ON sessions(last_active);
-            CREATE INDEX IF NOT EXISTS idx_user_id ON sessions(user_id);
-            CREATE INDEX IF NOT EXISTS idx_username ON sessions(username);
+            CREATE INDEX IF NOT EXISTS idx_user_active
+                ON sessions(user_id, last_active, session_id);
         """)
-        self.connection.commit()
 
-    def create_session(self, user_id: int, username: str, ip: str) -> str:
+        # Refresh planner statistics so range scans on last_active keep
+        # choosing the right index as the table grows and shrinks
+        self.connection.execute("ANALYZE sessions")
+
+    def _migrate(self):
+        """
+        Upgrade a sessions database written by an older version, once.
+
+        The applied version is recorded in PRAGMA user_version so later
+        startups skip the checks entirely.
+        """
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+
+        if version < 1:
+            # Older tables keyed sessions by 64-char hex TEXT and carried a
+            # username column with its own idx_username index. Those
+            # sessions cannot be converted, so the table is recreated and
+            # users simply log in again.
+            columns = {
+                row[1]: row[2]
+                for row in self.connection.execute("PRAGMA table_info(sessions)")
+            }
+            if columns and columns.get("session_id") != "BLOB":
+                self.connection.execute("DROP TABLE sessions")
+            self.connection.execute("DROP INDEX IF EXISTS idx_username")
+
+        if version < 2:
+            # idx_user_id is superseded by the covering idx_user_active,
+            # which answers per-user queries from the index alone
+            self.connection.execute("DROP INDEX IF EXISTS idx_user_id")
+
+        self.connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _load_user_index(self):
+        """
+        Populate the user_id -> session_ids index from active sessions and
+        take the initial stored-session count.
+        """
+        cutoff_time = _NOW_EPOCH[0] - self.session_timeout
+        with self._db_lock:
+            rows = self.connection.execute(
+                _SQL_ACTIVE_SESSIONS, (cutoff_time,)
+            ).fetchall()
+            self._session_count = self.connection.execute(_SQL_COUNT).fetchone()[0]
+        with self._cache_lock:
+            for user_id, key in rows:
+                self._user_index.setdefault(user_id, set()).add(key.hex())
+
+    def _unindex(self, session_id: str, user_id: int):
+        """
+        Remove a session from the user index. Caller holds _cache_lock.
+        """
+        sessions = self._user_index.get(user_id)
+        if sessions is not None:
+            sessions.discard(session_id)
+            if not sessions:
+                del self._user_index[user_id]
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a with-block as one write transaction on the writer connection.
+
+        Takes the write lock and the database RESERVED lock up front
+        (BEGIN IMMEDIATE), commits on success and rolls back on error, so a
+        bulk write costs a single commit.
+
+        Yields:
+            sqlite3.Connection: Writer connection inside the transaction
+        """
+        with self._db_lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                if self.connection.in_transaction:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    @contextmanager
+    def _reader(self):
+        """
+        Borrow a read-only connection from the pool for the duration of a
+        with-block, returning it afterwards.
+
+        Yields:
+            sqlite3.Connection: Read-only connection
+        """
+        conn = self._read_pool.get()
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    def create_session(self, user_id: int, ip: str) -> str:
         """
         Create a new session for a user.
 
         Args:
             user_id: User's database ID (immutable identifier)
-            username: Current username (mutable, for display only)
             ip: User's IP address
 
         Returns:
-            str: Unique session identifier (64-character hex string)
+            str: Unique session identifier (32-character hex string)
 
         """
-        session_id = secrets.token_hex(32)  # 256 bits of entropy
-        now = int(time.time())
+        key = secrets.token_bytes(SESSION_ID_BYTES)  # 128 bits of entropy
+        session_id = key.hex()
+        now = _NOW_EPOCH[0]
+
+        with self._db_lock:
+            self.connection.execute(_SQL_INSERT, (key, user_id, ip, now, now))
+            self._session_count += 1
+
+        # The login response is followed straight away by requests that use
+        # the new session, so cache it now rather than on the first miss
+        with self._cache_lock:
+            self._user_index.setdefault(user_id, set()).add(session_id)
+            self._cache[session_id] = {
+                "user_id": user_id,
+                "ip": ip,
+                "last_active": now,
+            }
+            if len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
 
-        self._cursor.execute(
-            "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
-            (session_id, user_id, username, ip, now, now),
-        )
-        self.connection.commit()
+        return session_id
 
-        # Clear caches to ensure next lookup gets fresh data
-        self._clear_caches()
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """
+        Retrieve session data, serving hot sessions from the in-memory LRU.
 
-        return session_id
+        Cached entries are checked for expiry on every hit, so a session
+        that stops being used still times out without a database read.
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            Optional[Dict]: Session data, or None if missing or expired
+        """
+        with self._cache_lock:
+            session = self._cache.get(session_id)
+            if session is not None:
+                self._cache.move_to_end(session_id)
+
+        if session is not None:
+            if _NOW_EPOCH[0] - session["last_active"] > self.session_timeout:
+                self.delete_session(session_id)
+                return None
+            return session
+
+        session = self._get_session_impl(session_id)
+        if session is not None:
+            with self._cache_lock:
+                self._cache[session_id] = session
+                if len(self._cache) > self.max_cache_size:
+                    self._cache.popitem(last=False)
+        return session
 
     def _get_session_impl(self, session_id: str) -> Optional[Dict]:
         """
-        Internal implementation of session retrieval (cached via lru_cache).
+        Load a session from the database on a cache miss.
 
         Args:
             session_id: Session identifier
         """
-        self._cursor.execute(
-            "SELECT user_id, username, ip, last_active FROM sessions WHERE session_id = ?",
-            (session_id,),
-        )
+        key = _session_key(session_id)
+        if key is None:
+            return None
+
+        with self._reader() as conn:
+            row = conn.execute(_SQL_GET, (key,)).fetchone()
 
-        row = self._cursor.fetchone()
         if not row:
             return None
 
-        user_id, username, ip, last_active = row
+        user_id, ip, last_active = row
+        # A buffered activity update is newer than what is on disk
+        last_active = self._pending_activity.get(session_id, last_active)
 
         # Check expiration and auto-cleanup expired sessions
-        if time.time() - last_active > self.session_timeout:
+        if _NOW_EPOCH[0] - last_active > self.session_timeout:
             self.delete_session(session_id)
             return None
 
         return {
             "user_id": user_id,
-            "username": username,
             "ip": ip,
             "last_active": last_active,
         }
@@ -190,51 +472,82 @@ class SessionManager:
         Update the last_active timestamp for a session.
 
         This should be called on each request to prevent session expiration
-        during active use.
+        during active use. The timestamp is only buffered here; the flush
+        thread writes it to the database in the next batch.
 
         Args:
             session_id: Session identifier
 
         Returns:
-            bool: True if session was updated, False if session not found
+            bool: True once the update has been queued, False if the
+                session id is malformed
         """
-        self._cursor.execute(
-            "UPDATE sessions SET last_active = ? WHERE session_id = ?",
-            (int(time.time()), session_id),
-        )
-        self.connection.commit()
-
-        # Only clear caches if we actually updated something
-        if self._cursor.rowcount > 0:
-            self._clear_caches()
+        # last_active has one-second resolution, so further requests in the
+        # same second would write an identical value
+        now = _NOW_EPOCH[0]
+        if self._last_written.get(session_id) == now:
             return True
-        return False
 
-    def update_username_in_sessions(self, user_id: int, new_username: str) -> int:
-        """
-        Update username in all sessions when a user changes their username.
+        if _session_key(session_id) is None:
+            return False
 
-        This method uses user_id to find sessions, ensuring we update the
-        correct user even if their old username has already been taken by
-        someone else.
+        with self._pending_lock:
+            self._pending_activity[session_id] = now
+            self._last_written[session_id] = now
+
+        session = self._cache.get(session_id)
+        if session is not None:
+            session["last_active"] = now
+        return True
+
+    def _forget_activity(self, session_ids):
+        """
+        Drop buffered and last-written activity for deleted sessions.
 
         Args:
-            user_id: User's database ID (immutable identifier)
-            new_username: New username to set in all user's sessions
+            session_ids: Iterable of hex session identifiers
+        """
+        with self._pending_lock:
+            for sid in session_ids:
+                self._pending_activity.pop(sid, None)
+                self._last_written.pop(sid, None)
+
+    def _flush_loop(self):
+        """
+        Background loop that writes buffered activity updates every
+        flush_interval seconds until close() is called.
+        """
+        while not self._flush_stop.wait(self._flush_interval):
+            try:
+                self.flush_activity()
+            except sqlite3.Error as e:
+                log(f"Session activity flush failed: {e}")
+
+    def flush_activity(self) -> int:
+        """
+        Write all buffered last_active updates in a single transaction.
 
         Returns:
             int: Number of sessions updated
         """
-        self._cursor.execute(
-            "UPDATE sessions SET username = ? WHERE user_id = ?",
-            (new_username, user_id),
-        )
-        self.connection.commit()
-
-        count = self._cursor.rowcount
-        if count > 0:
-            self._clear_caches()
-            print(f"Updated username in {count} sessions for user_id {user_id}")
+        with self._pending_lock:
+            if not self._pending_activity:
+                return 0
+            pending = self._pending_activity
+            self._pending_activity = {}
+
+        try:
+            with self._transaction() as conn:
+                count = conn.executemany(
+                    _SQL_TOUCH,
+                    [(ts, bytes.fromhex(sid)) for sid, ts in pending.items()],
+                ).rowcount
+        except sqlite3.Error:
+            # Put the updates back unless newer ones arrived meanwhile
+            with self._pending_lock:
+                for sid, ts in pending.items():
+                    self._pending_activity.setdefault(sid, ts)
+            raise
 
         return count
 
@@ -248,13 +561,27 @@ class SessionManager:
         Returns:
             bool: True if session was deleted, False if not found
         """
-        self._cursor.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
-        self.connection.commit()
+        self._forget_activity((session_id,))
+        with self._cache_lock:
+            session = self._cache.pop(session_id, None)
+            if session is not None:
+                self._unindex(session_id, session["user_id"])
 
-        if self._cursor.rowcount > 0:
-            self._clear_caches()
-            return True
-        return False
+        key = _session_key(session_id)
+        if key is None:
+            return False
+
+        with self._db_lock:
+            rows = self.connection.execute(_SQL_DELETE, (key,)).fetchall()
+            self._session_count -= len(rows)
+
+        # An uncached session is still indexed; the deleted row names its
+        # owner, so it is unindexed without searching the index
+        if rows and session is None:
+            with self._cache_lock:
+                self._unindex(session_id, rows[0][0])
+
+        return bool(rows)
 
     def cleanup_expired_sessions(self) -> int:
         """
@@ -271,17 +598,29 @@ class SessionManager:
             >>> deleted = manager.cleanup_expired_sessions()
             >>> print(f"Cleaned up {deleted} expired sessions")
         """
-        cutoff_time = int(time.time()) - self.session_timeout
-        self._cursor.execute(
-            "DELETE FROM sessions WHERE last_active < ?",
-            (cutoff_time,),
-        )
-        self.connection.commit()
+        # Flush first so recently active sessions are not treated as expired
+        self.flush_activity()
+
+        cutoff_time = _NOW_EPOCH[0] - self.session_timeout
+        with self._transaction() as conn:
+            expired = conn.execute(_SQL_DELETE_EXPIRED, (cutoff_time,)).fetchall()
+            self._session_count -= len(expired)
 
-        deleted = self._cursor.rowcount
+        deleted = len(expired)
         if deleted > 0:
-            self._clear_caches()
-            print(f"Cleaned up {deleted} expired sessions")
+            expired_ids = []
+            with self._cache_lock:
+                for key, user_id in expired:
+                    sid = key.hex()
+                    self._cache.pop(sid, None)
+                    self._unindex(sid, user_id)
+                    expired_ids.append(sid)
+            self._forget_activity(expired_ids)
+            log(f"Cleaned up {deleted} expired sessions")
+
+            # Reclaim WAL space now that a batch of pages has been freed
+            with self._db_lock:
+                self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
         return deleted
 
@@ -289,35 +628,30 @@ class SessionManager:
         """
         Get the count of currently active (non-expired) sessions.
 
+        This reads a counter maintained by every insert and delete, so it
+        costs no SQL. Sessions that expired since the last
+        cleanup_expired_sessions() run are still counted until that run.
+
         Returns:
             int: Number of active sessions
 
         """
-        cutoff_time = int(time.time()) - self.session_timeout
-        self._cursor.execute(
-            "SELECT COUNT(*) FROM sessions WHERE last_active >= ?",
-            (cutoff_time,),
-        )
-        return self._cursor.fetchone()[0]
+        return self._session_count
 
-    def _get_user_sessions_impl(self, user_id: int) -> tuple:
+    def get_user_sessions(self, user_id: int) -> tuple:
         """
-        Internal implementation for retrieving all active sessions for a user.
+        Retrieve all sessions for a user from the in-memory index.
 
         Args:
             user_id: User's database ID
 
         Returns:
-            tuple: Tuple of active session_ids for the user
+            tuple: Tuple of session_ids for the user
 
         """
-        cutoff_time = int(time.time()) - self.session_timeout
-        self._cursor.execute(
-            "SELECT session_id FROM sessions WHERE user_id = ? AND last_active >= ?",
-            (user_id, cutoff_time),
-        )
-        # Return tuple for immutability and cache efficiency
-        return tuple(row[0] for row in self._cursor.fetchall())
+        with self._cache_lock:
+            # Return tuple so callers can delete sessions while iterating
+            return tuple(self._user_index.get(user_id, ()))
 
     def logout_all_user_sessions(self, user_id: int) -> int:
         """
@@ -332,31 +666,41 @@ class SessionManager:
         Returns:
             int: Number of sessions deleted
         """
-        self._cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
-        self.connection.commit()
+        with self._transaction() as conn:
+            count = conn.execute(_SQL_DELETE_USER, (user_id,)).rowcount
+            self._session_count -= count
+
+        with self._cache_lock:
+            user_sessions = self._user_index.pop(user_id, ())
+            for sid in user_sessions:
+                self._cache.pop(sid, None)
+        self._forget_activity(user_sessions)
 
-        count = self._cursor.rowcount
         if count > 0:
-            self._clear_caches()
-            print(f"Logged out {count} sessions for user_id {user_id}")
+            log(f"Logged out {count} sessions for user_id {user_id}")
 
         return count
 
-    def _clear_caches(self):
-        """
-        Clear all LRU caches in a single operation.
-
-        This must be called after any database modification to ensure
-        cached data doesn't become stale.
-        """
-        self.get_session.cache_clear()
-        self.get_user_sessions.cache_clear()
-
     def close(self):
         """
-        Close the database connection.
+        Close the writer and all pooled read connections.
 
         Should be called on server shutdown to ensure all data is flushed
-        and the database file is properly closed.
+        and the database file is properly closed. Any buffered activity
+        updates are drained before the connection is closed.
         """
-        self.connection.close()
+        self._flush_stop.set()
+        self._flush_thread.join(timeout=self._flush_interval * 4)
+        try:
+            self.flush_activity()
+        except sqlite3.Error as e:
+            log(f"Session activity flush failed: {e}")
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._db_lock:
+            # Let SQLite re-analyze anything whose statistics went stale
+            self.connection.execute("PRAGMA optimize")
+            self.connection.close()
@@ -0,0 +1,181 @@
+"""
+SQLite connection pool with concurrent readers and a single writer.
+
+In WAL mode SQLite lets any number of readers run alongside one writer, so
+this pool keeps several read-only connections that threads borrow for
+queries, plus one writer connection serialized by a lock. Each write block
+runs as a single transaction.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+# Reader connections beyond this add memory without adding throughput
+MAX_READERS = 8
+
+# Applied to every connection when it is opened
+DEFAULT_PRAGMAS: Tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+class SqlitePool:
+    """
+    Reader pool plus single writer for one SQLite database.
+
+    Thread Safety:
+        Reader connections are handed out through a queue.Queue, so each is
+        used by one thread at a time. The writer is guarded by a lock and
+        every write() block is wrapped in BEGIN IMMEDIATE ... COMMIT.
+
+    Attributes:
+        db_path (Path): Path to the SQLite database file
+
+    Example:
+        >>> pool = SqlitePool(Path("game.db"))
+        >>> with pool.write() as cur:
+        ...     cur.execute("UPDATE users SET elo = ? WHERE user_id = ?", (510, 1))
+        >>> with pool.read() as cur:
+        ...     cur.execute("SELECT elo FROM users WHERE user_id = ?", (1,))
+        ...     row = cur.fetchone()
+    """
+
+    __slots__ = ("db_path", "_writer", "_write_lock", "_readers", "_pragmas")
+
+    def __init__(
+        self,
+        db_path: Path,
+        readers: Optional[int] = None,
+        pragmas: Tuple[str, ...] = DEFAULT_PRAGMAS,
+    ):
+        """
+        Open the writer connection and the pool of readers.
+
+        Args:
+            db_path: Path to SQLite database file (created if doesn't exist)
+            readers: Number of read-only connections (default: CPU count,
+                between 2 and MAX_READERS)
+            pragmas: PRAGMA statements run on each new connection
+        """
+        self.db_path = Path(db_path)
+        self._pragmas = pragmas
+
+        # The writer is opened first so the file exists for mode=ro readers
+        self._writer = self._connect(str(self.db_path), uri=False)
+        self._write_lock = threading.Lock()
+
+        if readers is None:
+            readers = min(MAX_READERS, max(2, os.cpu_count() or 2))
+        read_uri = self.db_path.resolve().as_uri() + "?mode=ro"
+        self._readers: queue.Queue = queue.Queue()
+        for _ in range(readers):
+            reader = self._connect(read_uri, uri=True)
+            reader.execute("PRAGMA query_only=1")
+            self._readers.put(reader)
+
+    def _connect(self, database: str, uri: bool) -> sqlite3.Connection:
+        """
+        Open a connection in autocommit mode and apply the pool's pragmas.
+
+        Args:
+            database: File path or URI
+            uri: Whether database is a URI
+
+        Returns:
+            sqlite3.Connection: Configured connection
+        """
+        conn = sqlite3.connect(
+            database,
+            uri=uri,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,
+        )
+        for pragma in self._pragmas:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Borrow a read-only connection for the duration of a with-block.
+
+        Yields:
+            sqlite3.Cursor: Cursor on a read-only connection
+        """
+        conn = self._readers.get()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run a with-block as one transaction on the writer connection.
+
+        Commits when the block exits normally and rolls back if it raises.
+
+        Yields:
+            sqlite3.Cursor: Cursor on the writer connection
+        """
+        with self._write_lock:
+            cursor = self._writer.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.execute("ROLLBACK")
+                raise
+            else:
+                self._writer.execute("COMMIT")
+            finally:
+                cursor.close()
+
+    def checkpoint(self, mode: str = "TRUNCATE") -> Tuple[int, int, int]:
+        """
+        Copy the WAL back into the database file and reset it.
+
+        Runs on the writer connection outside any transaction, so it waits
+        for in-flight writes but never blocks readers for long: if a
+        reader still needs the WAL after busy_timeout, SQLite reports busy
+        and the WAL is left for the next checkpoint.
+
+        Args:
+            mode: PASSIVE, FULL, RESTART or TRUNCATE
+
+        Returns:
+            tuple: (busy, wal_frames, checkpointed_frames) as reported by
+                PRAGMA wal_checkpoint
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        with self._write_lock:
+            return self._writer.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+    def close(self):
+        """
+        Close the writer and every idle reader connection.
+        """
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            self._writer.close()
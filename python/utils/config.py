@@ -3,7 +3,12 @@ Configuration file loader and path resolver.
 
 This module provides utilities for loading the server configuration from
 an ini file and safely resolving file paths relative to the application
-directory.
+directory. The ini file is parsed by a small built-in reader rather than
+configparser, which is a comparatively heavy import for a short file.
+
+Classes:
+    ConfigSection: One [section] of the config with typed getters
+    Config: Mapping of section name to ConfigSection
 
 Functions:
     load_config: Load and parse the server.ini configuration file
@@ -12,8 +17,10 @@ Functions:
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
-import configparser
+import os
+from functools import lru_cache
 from pathlib import Path
+from typing import Dict, Optional
 
 # Configuration file must be in the same directory as the base class
 CONFIG_FILE = "server.ini"
@@ -31,8 +38,152 @@ class ConfigError(RuntimeError):
         ...     raise ConfigError("server.ini not found")
     """
 
+    __slots__ = ()
+
+
+# Accepted spellings for boolean values (same as configparser)
+_BOOLEAN_STATES = {
+    "1": True,
+    "yes": True,
+    "true": True,
+    "on": True,
+    "0": False,
+    "no": False,
+    "false": False,
+    "off": False,
+}
 
-def load_config() -> configparser.ConfigParser:
+
+class ConfigSection(dict):
+    """
+    Key/value pairs of one config section with typed getters.
+
+    Mirrors the parts of configparser's SectionProxy used by the server:
+    item access, get(), getint() and getboolean(), each with a fallback.
+
+    Example:
+        >>> section = ConfigSection(port="5000", enabled="false")
+        >>> section.getint("port", 80)
+        5000
+        >>> section.getboolean("enabled")
+        False
+    """
+
+    __slots__ = ()
+
+    def get(self, key: str, fallback: Optional[str] = None) -> Optional[str]:
+        """
+        Get a raw string value.
+
+        Args:
+            key: Option name (case-insensitive)
+            fallback: Value returned if the option is missing
+
+        Returns:
+            str: Option value, or fallback
+        """
+        return dict.get(self, key.lower(), fallback)
+
+    def getint(self, key: str, fallback: Optional[int] = None) -> Optional[int]:
+        """
+        Get a value converted to int.
+
+        Args:
+            key: Option name (case-insensitive)
+            fallback: Value returned if the option is missing
+
+        Returns:
+            int: Parsed value, or fallback
+
+        Raises:
+            ValueError: If the value is not an integer
+        """
+        value = self.get(key)
+        return fallback if value is None else int(value)
+
+    def getboolean(
+        self, key: str, fallback: Optional[bool] = None
+    ) -> Optional[bool]:
+        """
+        Get a value converted to bool (1/yes/true/on or 0/no/false/off).
+
+        Args:
+            key: Option name (case-insensitive)
+            fallback: Value returned if the option is missing
+
+        Returns:
+            bool: Parsed value, or fallback
+
+        Raises:
+            ValueError: If the value is not a recognised boolean
+        """
+        value = self.get(key)
+        if value is None:
+            return fallback
+        try:
+            return _BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(f"Not a boolean: {value}") from None
+
+
+class Config(Dict[str, ConfigSection]):
+    """
+    Parsed configuration: section name -> ConfigSection.
+
+    Supports the ini subset used by server.ini: [section] headers,
+    "key = value" or "key: value" options, indented continuation lines
+    (joined with newlines) and full-line comments starting with # or ;.
+    """
+
+    __slots__ = ()
+
+    def read_string(self, text: str, source: str = "<string>") -> None:
+        """
+        Parse ini text into this config.
+
+        Args:
+            text: Contents of an ini file
+            source: Name used in error messages
+
+        Raises:
+            ConfigError: If a line cannot be parsed
+        """
+        section: Optional[ConfigSection] = None
+        key: Optional[str] = None
+
+        for lineno, raw in enumerate(text.splitlines(), start=1):
+            stripped = raw.strip()
+
+            # Blank lines and comments
+            if not stripped or stripped[0] in "#;":
+                continue
+
+            # Continuation of the previous option's value
+            if raw[0].isspace() and key is not None:
+                previous = section[key]
+                section[key] = f"{previous}\n{stripped}" if previous else stripped
+                continue
+
+            if stripped[0] == "[" and stripped[-1] == "]":
+                section = self.setdefault(stripped[1:-1].strip(), ConfigSection())
+                key = None
+                continue
+
+            if section is None:
+                raise ConfigError(f"{source}:{lineno}: option outside a section")
+
+            sep = min(
+                (i for i in (stripped.find("="), stripped.find(":")) if i > 0),
+                default=-1,
+            )
+            if sep < 0:
+                raise ConfigError(f"{source}:{lineno}: expected 'key = value'")
+
+            key = stripped[:sep].strip().lower()
+            section[key] = stripped[sep + 1 :].strip()
+
+
+def load_config() -> Config:
     """
     Load and parse the server configuration file.
 
@@ -41,10 +192,10 @@ def load_config() -> configparser.ConfigParser:
     a ConfigError with a descriptive message.
 
     Returns:
-        configparser.ConfigParser: Parsed configuration object with all sections
+        Config: Parsed configuration object with all sections
 
     Raises:
-        ConfigError: If config file doesn't exist or can't be read
+        ConfigError: If config file doesn't exist, can't be read or is malformed
 
     Example:
         >>> config = load_config()
@@ -62,16 +213,18 @@ def load_config() -> configparser.ConfigParser:
         timeout = 600
         ```
     """
-    config = configparser.ConfigParser()
-
-    # read() returns a list of successfully read files
-    # If the list is empty, the file wasn't found or couldn't be read
-    if not config.read(CONFIG_FILE):
-        raise ConfigError(f"Config file not found: {CONFIG_FILE}")
+    try:
+        with open(CONFIG_FILE, encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        raise ConfigError(f"Config file not found: {CONFIG_FILE}") from None
 
+    config = Config()
+    config.read_string(text, CONFIG_FILE)
     return config
 
 
+@lru_cache(maxsize=256)
 def resolve_path(base: Path, value: str) -> Path:
     """
     Resolve a path safely relative to a base directory.
@@ -102,12 +255,13 @@ def resolve_path(base: Path, value: str) -> Path:
     Note:
         Using resolve() ensures that symbolic links are followed and
         the path is normalized (e.g., "../dir" becomes the actual parent).
+        Results are memoized per (base, value), so repeated lookups cost
+        no filesystem calls.
     """
-    p = Path(value)
-
-    # Absolute paths are returned unchanged
-    if p.is_absolute():
-        return p
+    # Absolute paths are returned unchanged; check the string directly
+    # rather than building a throwaway Path
+    if os.path.isabs(value):
+        return Path(value)
 
     # Relative paths are joined with base and fully resolved
-    return (base / p).resolve()
+    return (base / value).resolve()
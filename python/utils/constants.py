@@ -6,6 +6,7 @@ Global Components:
     - SESSION_MANAGER: SQLite-backed session manager
     - COMPRESSION_CACHE: Cached gzip compression for static files
     - ENGINE_POOL: Pool of game engine instances (initialized later)
+    - DB_POOL: Reader/writer SQLite pool for the main database (initialized later)
 
 Configuration Sections:
     - Server: Host, port, timeout settings
@@ -15,22 +16,24 @@ Configuration Sections:
     - Handler: Game engine configuration
     - Database: Database file paths
     - Session: Session management settings
+    - CPU: Optional core split between HTTP threads and engines
 
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
+import os
 import sys
-import sqlite3
 import threading
-import queue
 from pathlib import Path
-from typing import Optional
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from .SessionManager import SessionManager
 from .ServerState import ServerState
-from .config import load_config, resolve_path
+from .config import ConfigSection, load_config, resolve_path
 from .EngineHandler import EnginePool
 from .CompressionPool import SimpleCachedCompressor
+from .SqlitePool import SqlitePool
+from .MatchmakingQueue import MatchmakingQueue
 
 config = load_config()
 
@@ -41,6 +44,8 @@ _icons_cfg = config["icons"]
 _handler_cfg = config["handler"]
 _database_cfg = config["database"]
 _session_cfg = config["session"]
+# Optional; servers configured before it existed simply run unpinned
+_cpu_cfg = config.get("cpu") or ConfigSection()
 
 SCRIPT_DIR = Path(__file__).resolve().parent.parent
 
@@ -71,6 +76,46 @@ if not HANDLER_BIN.is_file():
 
 GAME_HANDLER = f"{HANDLER_BIN} {HANDLER_ARGS}"
 
+# Engine instances started before the server accepts connections and kept
+# running while idle (the pool's min_instances)
+ENGINE_PREWARM = max(1, _handler_cfg.getint("prewarm", 1))
+
+
+def _parse_cores(value: Optional[str]) -> FrozenSet[int]:
+    """
+    Parse a core list such as "0,1" or "2-7" into a set of core numbers.
+
+    Args:
+        value: Comma-separated core numbers and inclusive ranges
+
+    Returns:
+        FrozenSet[int]: Cores, empty if value is empty or missing
+    """
+    cores = set()
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cores.update(range(int(first), int(last or first) + 1))
+    return frozenset(cores)
+
+
+# CPU cores for the HTTP accept loop (and the request threads it starts,
+# which inherit its affinity) and for the engine subprocesses. Pinning keeps
+# engine compute from evicting the request threads' caches. Empty sets mean
+# no pinning, which is also the case where sched_setaffinity is unavailable
+HTTP_CORES: FrozenSet[int] = frozenset()
+ENGINE_CORES: FrozenSet[int] = frozenset()
+
+if hasattr(os, "sched_setaffinity"):
+    _available_cores = frozenset(os.sched_getaffinity(0))
+    HTTP_CORES = _parse_cores(_cpu_cfg.get("http_cores")) & _available_cores
+    ENGINE_CORES = _parse_cores(_cpu_cfg.get("engine_cores")) & _available_cores
+    if HTTP_CORES and not ENGINE_CORES:
+        # Engines default to every core the HTTP threads do not use
+        ENGINE_CORES = _available_cores - HTTP_CORES
+
 # Main database file (users, games, stats)
 ACTIVE_DB = _database_cfg["main"]
 
@@ -108,19 +153,27 @@ MAX_POST_SIZE = _handler_cfg.getint("max_post_request_kb", 64) * 1000
 # Active games dictionary: {game_id: game_state}
 ACTIVE_GAMES = {}
 
-# Queue for matchmaking requests (FIFO)
-MATCHMAKING_QUEUE = queue.Queue()
+# Index of player session_id -> game_id for ACTIVE_GAMES
+# Both are kept in step by game.registry under GAMES_LOCK
+SESSION_TO_GAME: Dict[str, str] = {}
+GAMES_LOCK = threading.Lock()
+
+# Min-heap of (last_move_at, game_id), one entry per active game, used to
+# find idle games without scanning ACTIVE_GAMES; also guarded by GAMES_LOCK
+GAME_DEADLINES: List[Tuple[float, str]] = []
 
-# Track players waiting for matchmaking results
-# Format: {session_id: {"game_id": str, "notified": bool}}
-# This ensures players can poll for their game_id after matchmaking
-MATCHMAKING_RESULTS = {}
+# Players waiting for a match (FIFO, cancellable by session_id)
+MATCHMAKING_QUEUE = MatchmakingQueue()
 
-# Global database connection and cursor (protected by DB_LOCK)
-# These are initialized later by the main application
-DB_CONNECTION: Optional[sqlite3.Connection] = None
-DB_CURSOR: Optional[sqlite3.Cursor] = None
-DB_LOCK = threading.Lock()  # Ensures thread-safe database access
+# Players currently waiting for a match
+# Format: {session_id: ([game_id or None], threading.Event)}
+# The search request blocks on the event; the matchmaker stores the game_id
+# in the one-element holder list and sets the event to wake it
+MATCHMAKING_RESULTS: Dict[str, Tuple[List[Optional[str]], threading.Event]] = {}
+
+# Main database pool: concurrent read-only connections plus one writer
+# Initialized later by the main application (see database.init_database)
+DB_POOL: Optional[SqlitePool] = None
 
 # Global reference to HTTP server instance (set by main application)
 HTTPD = None
@@ -137,15 +190,38 @@ STATS_HTML = FRONTEND_DIR / _frontend_cfg["stats"]
 HOME_HTML = FRONTEND_DIR / _frontend_cfg["home"]
 PROFILE_HTML = FRONTEND_DIR / _frontend_cfg["profile"]
 
+
+def _files_in(directory: Path) -> frozenset:
+    """Names of the regular files in directory, read with one scandir pass."""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(e.name for e in entries if e.is_file())
+    except OSError:
+        return frozenset()
+
+
 # Warn about missing critical files (don't fail - allows partial functionality)
+_frontend_files = _files_in(FRONTEND_DIR)
 for path in (LOGIN_HTML, REGISTER_HTML):
-    if not path.is_file():
+    found = (
+        path.name in _frontend_files if path.parent == FRONTEND_DIR else path.is_file()
+    )
+    if not found:
         print(f"WARNING: Missing file: {path}")
 
 # Directory containing favicon files
 # These are typically in /icons but accessed as /favicon.ico, /apple-touch-icon.png, etc.
 ICONS_DIRECTORY = resolve_path(SCRIPT_DIR, _icons_cfg["directory"])
 
+# Request paths of the icons, interned so lookups compare by identity first
 ICON_FILES = frozenset(
-    "/" + name for name in (n.strip() for n in _icons_cfg["files"].split(",")) if name
+    sys.intern("/" + name)
+    for name in (n.strip() for n in _icons_cfg["files"].split(","))
+    if name
 )
+
+# Warn about configured icons that are not on disk
+_icon_files = _files_in(ICONS_DIRECTORY)
+for _icon in sorted(ICON_FILES):
+    if _icon[1:] not in _icon_files:
+        print(f"WARNING: Missing icon: {ICONS_DIRECTORY / _icon[1:]}")
@@ -7,16 +7,56 @@ Exception Hierarchy:
     - DBException: Database operation failures
     - ProcessingError: Client-facing errors with HTTP codes
     - MajorThreadedHttpServerException: HTTP server initialization errors
-    - NoDataException: Missing data in file reads
+    - HandlerException: Generic handler errors (kind=KIND_HANDLER)
+        - NoDataException: Missing data in file reads (KIND_NODATA)
+        - LengthException: Missing or invalid length headers (KIND_LENGTH)
+        - DecodeException: Data decoding/deserialization errors (KIND_DECODE)
     - WebSocketError: WebSocket connection errors
-    - LengthException: Missing or invalid length headers
-    - HandlerException: Generic handler errors
-    - DecodeException: Data decoding/deserialization errors
     - InstanceInoperable: Engine instance throws an error
 
+Throw helpers:
+    bad_request, unauthorized, not_found, conflict and server_error each
+    raise a ProcessingError with the matching HTTP code. Handlers call them
+    on their error branches so the raise sequence lives out of line. The
+    messages passed are constants, so the helpers raise cached instances.
+
+    make_validator builds a check function for a predicate and a fixed
+    error, so a validation rule is one call on the handler's happy path.
+
+    wrap_db turns a database driver error into a chained DBException.
+
+Debugging:
+    Handlers log errors they recover from with log_exception, which queues
+    "message: error" on the background logger as one entry and appends the
+    full traceback only when CHESS_DEBUG_TB=1 is set.
+
 Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
 """
 
+import json
+import os
+import sys
+import traceback
+from http import HTTPStatus
+from typing import Any, Callable, Dict, NoReturn, Tuple
+
+from utils.logger import log
+
+# Reason phrases for status lines, encoded once at import
+_REASON: Dict[int, bytes] = {s.value: s.phrase.encode("latin-1") for s in HTTPStatus}
+
+# Upper bound on distinct (code, message) pairs kept by ProcessingError.cached
+_CACHE_MAX = 256
+
+# Set CHESS_DEBUG_TB=1 to print full tracebacks for errors the handlers catch
+DEBUG_TRACEBACKS = os.environ.get("CHESS_DEBUG_TB") == "1"
+
+# HandlerException.kind discriminators
+KIND_LENGTH = 1
+KIND_DECODE = 2
+KIND_NODATA = 3
+KIND_HANDLER = 4
+
 
 class InactivityTimeoutException(Exception):
     """
@@ -30,6 +70,8 @@ class InactivityTimeoutException(Exception):
         ...     raise InactivityTimeoutException("No activity for 5 minutes")
     """
 
+    __slots__ = ()
+
 
 class MajorServerSideException(Exception):
     """
@@ -44,6 +86,8 @@ class MajorServerSideException(Exception):
         ...     raise MajorServerSideException("Game engine crashed")
     """
 
+    __slots__ = ()
+
 
 class DBException(Exception):
     """
@@ -59,6 +103,32 @@ class DBException(Exception):
         ...     raise DBException(f"Database error: {e}") from e
     """
 
+    __slots__ = ()
+
+
+def wrap_db(error: BaseException) -> DBException:
+    """
+    Wrap a driver error (e.g. sqlite3.Error) in a DBException.
+
+    The wrapper reuses the original message and skips __init__ and any
+    string formatting; the original stays reachable as __cause__.
+
+    Args:
+        error: Exception raised by the database driver
+
+    Returns:
+        DBException: Chained wrapper, ready to raise
+
+    Example:
+        >>> except sqlite3.Error as e:
+        ...     raise wrap_db(e)
+    """
+    wrapped = DBException.__new__(DBException)
+    wrapped.args = (error.args[0],) if error.args else ()
+    wrapped.__cause__ = error
+    wrapped.__suppress_context__ = True
+    return wrapped
+
 
 class ProcessingError(Exception):
     """
@@ -71,6 +141,8 @@ class ProcessingError(Exception):
     Attributes:
         code (int): HTTP status code (default: 400)
         message (str): User-friendly error message
+        status_line (bytes): Status code and reason, e.g. b"400 Bad Request"
+        body (bytes): Encoded JSON error body sent to the client
 
     Example:
         >>> if not valid_username(username):
@@ -78,8 +150,22 @@ class ProcessingError(Exception):
         >>>
         >>> if not authenticated:
         ...     raise ProcessingError("Authentication required", code=401)
+        >>>
+        >>> # Recurring errors can reuse one shared instance
+        >>> raise ProcessingError.cached("Not authenticated", 401)
+        >>>
+        >>> match error:
+        ...     case ProcessingError(_, 401):
+        ...         redirect_to_login()
     """
 
+    __slots__ = ("code", "message", "_str", "status_line", "body")
+
+    # Positional patterns: case ProcessingError(message, code)
+    __match_args__ = ("message", "code")
+
+    _cache: Dict[Tuple[int, str], "ProcessingError"] = {}
+
     def __init__(self, message: str, code: int = 400):
         """
         Initialize a processing error.
@@ -90,8 +176,16 @@ class ProcessingError(Exception):
         """
         self.code = code
         self.message = message
-        # Call the base class constructor with the message
-        super().__init__(self.message)
+        # Format once here so str() and logging never re-format
+        self._str = f"[{code}] {message}"
+        # BaseException.__new__ already stored (message, code) in args;
+        # replace it directly instead of going through Exception.__init__
+        self.args = (self._str,)
+        # Response pieces are encoded once; handlers write them as-is
+        self.status_line = b"%d %s" % (code, _REASON.get(code, b"Error"))
+        self.body = json.dumps({"success": False, "message": message}).encode(
+            "utf-8"
+        )
 
     def __str__(self):
         """
@@ -104,7 +198,115 @@ class ProcessingError(Exception):
             >>> str(ProcessingError("Bad input", 400))
             '[400] Bad input'
         """
-        return f"[{self.code}] {self.message}"
+        return self._str
+
+    def __reduce__(self):
+        """
+        Pickle as a plain constructor call.
+
+        args holds the formatted string, so the default reduction would
+        rebuild the error with "[CODE] message" as its message.
+
+        Returns:
+            tuple: (class, (message, code))
+        """
+        return (self.__class__, (self.message, self.code))
+
+    @classmethod
+    def cached(cls, message: str, code: int = 400) -> "ProcessingError":
+        """
+        Return a shared instance for a recurring (message, code) pair.
+
+        Only use this for constant messages. The instance is shared between
+        threads, so callers must not mutate it.
+
+        Args:
+            message: User-friendly error message
+            code: HTTP status code (default: 400 Bad Request)
+
+        Returns:
+            ProcessingError: Shared instance with its traceback cleared
+        """
+        key = (code, message)
+        error = cls._cache.get(key)
+        if error is None:
+            error = cls(message, code)
+            if len(cls._cache) < _CACHE_MAX:
+                cls._cache[key] = error
+        # Raising an instance that still carries a traceback would extend it
+        return error.with_traceback(None)
+
+
+def bad_request(message: str) -> NoReturn:
+    """Raise a 400 ProcessingError."""
+    raise ProcessingError.cached(message, 400)
+
+
+def unauthorized(message: str) -> NoReturn:
+    """Raise a 401 ProcessingError."""
+    raise ProcessingError.cached(message, 401)
+
+
+def not_found(message: str) -> NoReturn:
+    """Raise a 404 ProcessingError."""
+    raise ProcessingError.cached(message, 404)
+
+
+def conflict(message: str) -> NoReturn:
+    """Raise a 409 ProcessingError."""
+    raise ProcessingError.cached(message, 409)
+
+
+def server_error(message: str) -> NoReturn:
+    """Raise a 500 ProcessingError."""
+    raise ProcessingError.cached(message, 500)
+
+
+def make_validator(
+    predicate: Callable[[Any], bool], message: str, code: int = 400
+) -> Callable[[Any], None]:
+    """
+    Build a check that raises a fixed ProcessingError when predicate fails.
+
+    The error is built once here, so a failing check re-raises the shared
+    instance without constructing anything.
+
+    Args:
+        predicate: Returns True for valid values
+        message: User-friendly error message
+        code: HTTP status code (default: 400 Bad Request)
+
+    Returns:
+        Callable: check(value) that returns None or raises ProcessingError
+
+    Example:
+        >>> check_username = make_validator(valid_username, "Invalid username")
+        >>> check_username("alice")
+    """
+    error = ProcessingError.cached(message, code)
+
+    def check(value: Any) -> None:
+        if not predicate(value):
+            raise error.with_traceback(None) from None
+
+    return check
+
+
+def log_exception(message: str) -> None:
+    """
+    Log message and the exception being handled as a single entry.
+
+    Call from an except block. The entry reads "message: error" and goes
+    through the queued logger, so the handler thread never writes to
+    stdout itself; the traceback is added only in debug mode.
+
+    Args:
+        message: What was being done when the error was raised
+    """
+    text = f"{message}: {sys.exc_info()[1]}"
+    if DEBUG_TRACEBACKS:
+        text += "\n" + traceback.format_exc().rstrip()
+    log(text)
 
 
 class MajorThreadedHttpServerException(Exception):
@@ -123,8 +325,43 @@ class MajorThreadedHttpServerException(Exception):
         ...     ) from e
     """
 
+    __slots__ = ()
+
+
+class HandlerException(Exception):
+    """
+    Generic exception for HTTP request handler errors.
+
+    This is the base of the handler-level flow-control errors (NoData,
+    Length and Decode). They are raised once per malformed request and
+    caught in the same handler, so a single "except HandlerException" can
+    catch all of them and branch on the integer kind instead of stacking
+    one except clause per class. The implicit exception context is
+    suppressed because it never explains a bad request.
+
+    Attributes:
+        kind (int): One of the KIND_* constants, fixed per class
+
+    Example:
+        >>> if unsupported_http_method:
+        ...     raise HandlerException("Method not allowed")
+        >>>
+        >>> try:
+        ...     data = read_body()
+        ... except HandlerException as e:
+        ...     status = STATUS_FOR_KIND[e.kind]
+    """
+
+    __slots__ = ()
+
+    kind: int = KIND_HANDLER
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.__suppress_context__ = True
 
-class NoDataException(Exception):
+
+class NoDataException(HandlerException):
     """
     Raised when no data can be read from an expected source.
 
@@ -136,6 +373,10 @@ class NoDataException(Exception):
         ...     raise NoDataException("HTML file is empty")
     """
 
+    __slots__ = ()
+
+    kind = KIND_NODATA
+
 
 class WebSocketError(Exception):
     """
@@ -149,8 +390,10 @@ class WebSocketError(Exception):
         ...     raise WebSocketError("Invalid WebSocket key in handshake")
     """
 
+    __slots__ = ()
 
-class LengthException(Exception):
+
+class LengthException(HandlerException):
     """
     Raised when content length cannot be determined or is invalid.
 
@@ -162,22 +405,12 @@ class LengthException(Exception):
         ...     raise LengthException("Missing Content-Length header")
     """
 
+    __slots__ = ()
 
-class HandlerException(Exception):
-    """
-    Generic exception for HTTP request handler errors.
+    kind = KIND_LENGTH
 
-    This is a catch-all for various handler-level errors that don't fit
-    into more specific categories. It helps reduce the number of exception
-    types while still providing meaningful error information.
 
-    Example:
-        >>> if unsupported_http_method:
-        ...     raise HandlerException("Method not allowed")
-    """
-
-
-class DecodeException(Exception):
+class DecodeException(HandlerException):
     """
     Raised when data cannot be decoded or deserialized.
 
@@ -191,6 +424,12 @@ class DecodeException(Exception):
         ...     raise DecodeException("Invalid JSON") from e
     """
 
+    __slots__ = ()
+
+    kind = KIND_DECODE
+
 
 class InstanceInoperable(Exception):
     """Raised when an engine instance becomes unresponsive or crashes."""
+
+    __slots__ = ()
@@ -0,0 +1,40 @@
+"""
+JSON encoding for the request and WebSocket hot paths.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise, so the server still runs without external packages. Either way
+dumps returns UTF-8 bytes ready to frame or write, and decode errors are
+raised as JSONDecodeError.
+
+Note: orjson writes compact JSON (no spaces after separators); clients
+parse both forms the same.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USING_ORJSON = orjson is not None
+
+dumps: Callable[[Any], bytes]
+loads: Callable[[str | bytes], Any]
+
+if USING_ORJSON:
+    dumps = orjson.dumps
+    loads = orjson.loads
+    # Subclass of json.JSONDecodeError
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+
+    def dumps(obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON bytes."""
+        return json.dumps(obj).encode("utf-8")
+
+    loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
@@ -0,0 +1,115 @@
+"""
+Non-blocking console logger.
+
+Messages are pushed onto a bounded queue and written to stdout by a single
+daemon thread, so callers never perform terminal I/O while holding a lock.
+At interpreter exit an atexit hook lets the logger thread finish writing
+everything queued, including a batch it is in the middle of.
+Output can be held for a stretch of logging (e.g. server startup) and is
+then written with a single write when released.
+
+Author: Renier Barnard (renier52147@gmail.com/ renierb@axxess.co.za)
+"""
+
+import atexit
+import queue
+import sys
+import threading
+
+# Drop messages rather than block the caller if stdout cannot keep up
+_LOG_QUEUE_SIZE = 10000
+
+_log_q: queue.Queue = queue.Queue(maxsize=_LOG_QUEUE_SIZE)
+
+# Queued by the exit hook; the logger thread stops after writing what precedes it
+_STOP = object()
+
+# Cleared while output is held; the logger thread waits on it before writing
+_released = threading.Event()
+_released.set()
+
+
+def log(message: str) -> None:
+    """
+    Queue a message for the logger thread (never blocks).
+
+    Args:
+        message: Text to write, without trailing newline
+    """
+    try:
+        _log_q.put_nowait(message)
+    except queue.Full:
+        pass
+
+
+def hold_output() -> None:
+    """
+    Keep queued messages unwritten until release_output() is called.
+
+    Messages logged in between go out in one batch (the logger thread
+    may already be waiting for the first of them, which is then written
+    on its own). Anything still held when the interpreter exits is
+    written by the atexit hook.
+    """
+    _released.clear()
+
+
+def release_output() -> None:
+    """Write everything logged since hold_output() and resume normal output."""
+    _released.set()
+
+
+def _drain(first) -> bool:
+    """
+    Write one message plus everything else already queued in a single batch.
+
+    Args:
+        first: Message already taken off the queue
+
+    Returns:
+        bool: False once the exit hook's stop marker has been reached
+    """
+    batch = []
+    item = first
+    while item is not _STOP:
+        batch.append(item)
+        try:
+            item = _log_q.get_nowait()
+        except queue.Empty:
+            break
+    if batch:
+        sys.stdout.write("\n".join(batch) + "\n")
+        sys.stdout.flush()
+    return item is not _STOP
+
+
+def _log_worker() -> None:
+    """Logger thread: block for a message, then write a batch."""
+    while True:
+        # Wait before taking a message, so held output stays in the queue
+        # where the exit hook can still write it
+        _released.wait()
+        if not _drain(_log_q.get()):
+            return
+
+
+def _flush_at_exit() -> None:
+    """
+    Write everything logged before the interpreter exits.
+
+    Draining the queue here could miss a batch the logger thread has
+    already taken but not yet written (e.g. on a sys.exit right after a
+    startup error). Instead the thread is released, sent a stop marker
+    behind the last message and joined, so it writes everything in order.
+    """
+    _released.set()
+    try:
+        _log_q.put(_STOP, timeout=1.0)
+    except queue.Full:
+        return
+    _log_thread.join(timeout=2.0)
+
+
+_log_thread = threading.Thread(target=_log_worker, name="Logger", daemon=True)
+_log_thread.start()
+atexit.register(_flush_at_exit)